@@ -0,0 +1,473 @@
+"""
+Vectorized historical backtester for the final signal score
+
+Every rule in ComprehensiveAnalyzer._generate_final_signal is rebuilt as a
+boolean feature column over all bars, using only data available at each
+bar's close. The confidence score of every bar is then one matrix-vector
+product, and trades are simulated on the next bar's open with the stop
+and target the risk layer would quote at the signal bar: the support-based
+technical stop and the best raw R:R target (see `risk_levels`).
+"""
+
+import asyncio
+import numpy as np
+import pandas as pd
+import ta
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, List, Sequence, Tuple
+
+from analysis_engine.swing_detector import find_pivots, average_true_range
+from analysis_engine.signal_params import DEFAULT_SIGNAL_PARAMS
+from analysis_engine.regime import REGIMES, regime_features, classify_regimes, scale_weights
+
+# Rules of _generate_final_signal that are modelled per bar. The ADX rule
+# is not: _get_adx_strength always reports "weak", so it contributes
+# nothing live.
+FEATURES = [
+    "active_patterns",
+    "rsi_oversold",
+    "rsi_overbought",
+    "macd_bullish",
+    "golden_cross",
+    "death_cross",
+    "fibonacci_level",
+    "uptrend",
+    "downtrend",
+    "extreme_fear",
+    "extreme_greed",
+    "rr_excellent",
+    "rr_good",
+]
+RSI_COLUMNS = (FEATURES.index("rsi_oversold"), FEATURES.index("rsi_overbought"))
+
+FIB_RATIOS = np.array([0.0, 0.236, 0.382, 0.5, 0.618, 0.786, 1.0, 1.272, 1.618, 2.618])
+
+
+def _shift(values: np.ndarray, periods: int, fill=np.nan) -> np.ndarray:
+    out = np.empty_like(values, dtype=float)
+    out[:periods] = fill
+    out[periods:] = values[:-periods]
+    return out
+
+
+def _ffill_at(n: int, positions: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Series that takes `values[k]` from bar `positions[k]` onwards"""
+    out = np.full(n, np.nan)
+    valid = positions < n
+    positions, values = positions[valid], values[valid]
+    if len(positions) == 0:
+        return out
+    marker = np.full(n, -1)
+    marker[positions] = np.arange(len(positions))
+    marker = np.maximum.accumulate(marker)
+    has = marker >= 0
+    out[has] = values[marker[has]]
+    return out
+
+
+def _confirmed_swings(high: np.ndarray, low: np.ndarray,
+                      swing_strength: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Latest swing high and low at each bar, once `swing_strength` bars confirm them"""
+    n = len(high)
+    pivot_high, pivot_low = find_pivots(high, low, swing_strength, swing_strength)
+    hi_idx, lo_idx = np.flatnonzero(pivot_high), np.flatnonzero(pivot_low)
+    return (_ffill_at(n, hi_idx + swing_strength, high[hi_idx]),
+            _ffill_at(n, lo_idx + swing_strength, low[lo_idx]))
+
+
+def _fib_levels(swing_high: np.ndarray, swing_low: np.ndarray) -> np.ndarray:
+    return swing_low[:, None] + (swing_high - swing_low)[:, None] * FIB_RATIOS[None, :]
+
+
+def _stop_and_targets(close_series: pd.Series, high: np.ndarray, low: np.ndarray,
+                      swing_high: np.ndarray, swing_low: np.ndarray,
+                      levels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Technical stop and candidate targets at each bar's close
+
+    As _calculate_stop_loss_levels and _analyze_risk_reward: the stop sits
+    below the last swing low (standing in for support) unless that is over
+    4 ATR away, then 2 ATR below the close; targets are the upper Bollinger
+    band, the Fibonacci extensions and the last swing high (standing in for
+    resistance).
+
+    Returns:
+        (stop, targets) with targets as a (bars x candidates) matrix
+    """
+    close = close_series.to_numpy(dtype=float)
+    atr = average_true_range(high, low, close)
+    bb_upper = ta.volatility.BollingerBands(close=close_series).bollinger_hband().to_numpy()
+    support_stop = swing_low - 0.25 * atr
+    with np.errstate(invalid='ignore'):
+        use_support = (support_stop < close) & (support_stop >= close - 4 * atr)
+    stop = np.where(use_support, support_stop, close - 2 * atr)
+    targets = np.column_stack((bb_upper, levels[:, FIB_RATIOS > 1], swing_high))
+    return stop, targets
+
+
+def _reward_risk(close: np.ndarray, stop: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """R:R of every target, 0 where it is not above the close or the stop not below"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rr = (targets - close[:, None]) / (close - stop)[:, None]
+    rr = np.where(rr > 0, rr, 0.0)
+    return np.where((close > stop)[:, None], rr, 0.0)
+
+
+def risk_levels(data: pd.DataFrame, swing_strength: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stop and target the risk layer would quote at each bar's close
+
+    The stop is the technical stop of `_stop_and_targets` and the target
+    the candidate with the best raw R:R, as _analyze_risk_reward picks
+    when its target simulation is unavailable. The target is NaN where no
+    candidate lies above the close.
+
+    Returns:
+        (stop, target) arrays aligned with the bars
+    """
+    close_series = data['Close'].astype(float)
+    close = close_series.to_numpy()
+    high = data['High'].to_numpy(dtype=float)
+    low = data['Low'].to_numpy(dtype=float)
+
+    swing_high, swing_low = _confirmed_swings(high, low, swing_strength)
+    stop, targets = _stop_and_targets(close_series, high, low, swing_high, swing_low,
+                                      _fib_levels(swing_high, swing_low))
+    rr = _reward_risk(close, stop, targets)
+    best = rr.argmax(axis=1)
+    target = np.where(rr.max(axis=1) > 0, targets[np.arange(len(close)), best], np.nan)
+    return stop, target
+
+
+def signal_features(data: pd.DataFrame, rsi_overbought: float = 70,
+                    rsi_oversold: float = 30, swing_strength: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Causal feature matrix (bars x FEATURES) behind the final signal
+
+    Each column is 1.0 where the matching rule of _generate_final_signal
+    fires at that bar's close. Fibonacci swings use pivots only once they
+    are confirmed `swing_strength` bars later, so there is no look-ahead.
+
+    Returns:
+        (features, rsi) so callers can re-derive the RSI columns for other
+        overbought/oversold levels with `set_rsi_levels`
+    """
+    close = data['Close'].to_numpy(dtype=float)
+    open_ = data['Open'].to_numpy(dtype=float)
+    high = data['High'].to_numpy(dtype=float)
+    low = data['Low'].to_numpy(dtype=float)
+    volume = data['Volume'].to_numpy(dtype=float)
+
+    # Price action: doji, hammer and engulfing, as in the _detect_* helpers
+    body = np.abs(close - open_)
+    candle_range = high - low
+    with np.errstate(divide='ignore', invalid='ignore'):
+        doji = (candle_range > 0) & (body / candle_range < 0.1)
+    lower_shadow = np.minimum(close, open_) - low
+    upper_shadow = high - np.maximum(close, open_)
+    hammer = (lower_shadow > body * 2) & (upper_shadow < body * 0.3) & (close > open_)
+    prev_close, prev_open = _shift(close, 1), _shift(open_, 1)
+    engulfing = (
+        ((prev_close < prev_open) & (close > open_) & (open_ <= prev_close) & (close >= prev_open))
+        | ((prev_close > prev_open) & (close < open_) & (open_ >= prev_close) & (close <= prev_open))
+    )
+    patterns = doji | hammer | engulfing
+
+    # Momentum and trend
+    close_series = data['Close'].astype(float)
+    rsi = ta.momentum.RSIIndicator(close=close_series, window=14).rsi().to_numpy()
+    macd = ta.trend.MACD(close=close_series)
+    macd_bullish = macd.macd().to_numpy() > macd.macd_signal().to_numpy()
+    sma_20 = close_series.rolling(20).mean().to_numpy()
+    sma_50 = close_series.rolling(50).mean().to_numpy()
+    sma_200 = close_series.rolling(200).mean().to_numpy()
+
+    # Fibonacci: latest confirmed swing high/low at each bar
+    swing_high, swing_low = _confirmed_swings(high, low, swing_strength)
+    levels = _fib_levels(swing_high, swing_low)
+    with np.errstate(invalid='ignore'):
+        near_fib = (np.abs(close[:, None] - levels) / close[:, None] < 0.01).any(axis=1)
+
+    # Best reward/risk, as in _analyze_risk_reward by raw R:R
+    stop, targets = _stop_and_targets(close_series, high, low, swing_high, swing_low, levels)
+    best_rr = _reward_risk(close, stop, targets).max(axis=1)
+
+    # Sentiment score, as in _analyze_sentiment
+    past = _shift(close, 4)
+    price_change = np.where(np.isnan(past), 0.0, (close - past) / past * 100)
+    avg_volume = pd.Series(volume).rolling(20).mean().to_numpy()
+    sentiment = (
+        50
+        + 20 * (price_change > 5) - 20 * (price_change < -5)
+        + 10 * (volume > avg_volume * 1.5)
+        - 15 * (rsi < 30) + 15 * (rsi > 70)
+    )
+
+    columns = {
+        "active_patterns": patterns,
+        "rsi_oversold": rsi < rsi_oversold,
+        "rsi_overbought": rsi > rsi_overbought,
+        "macd_bullish": macd_bullish,
+        "golden_cross": sma_50 > sma_200,
+        "death_cross": sma_50 < sma_200,
+        "fibonacci_level": near_fib,
+        "uptrend": (close > sma_20) & (sma_20 > sma_50),
+        "downtrend": (close < sma_20) & (sma_20 < sma_50),
+        "extreme_fear": sentiment < 30,
+        "extreme_greed": sentiment >= 70,
+        "rr_excellent": best_rr >= 3,
+        "rr_good": (best_rr >= 2) & (best_rr < 3),
+    }
+    features = np.column_stack([columns[name] for name in FEATURES]).astype(float)
+    return features, rsi
+
+
+def set_rsi_levels(features: np.ndarray, rsi: np.ndarray,
+                   rsi_overbought: float, rsi_oversold: float) -> np.ndarray:
+    """Copy of `features` with the RSI rule columns for other levels"""
+    features = features.copy()
+    features[:, RSI_COLUMNS[0]] = rsi < rsi_oversold
+    features[:, RSI_COLUMNS[1]] = rsi > rsi_overbought
+    return features
+
+
+def signal_regimes(data: pd.DataFrame) -> np.ndarray:
+    """Market regime code (index into regime.REGIMES) of every bar"""
+    return classify_regimes(regime_features(data['Close'].to_numpy(dtype=float)))
+
+
+def confidence_scores(features: np.ndarray, weights: Dict[str, float] = None,
+                      regimes: np.ndarray = None) -> np.ndarray:
+    """
+    Confidence score of every bar: features @ weights
+
+    With `regimes`, each bar uses the weights scaled for its regime, as
+    the live final signal does.
+    """
+    weights = weights or DEFAULT_SIGNAL_PARAMS["weights"]
+    if regimes is None:
+        return features @ np.array([weights.get(name, 0) for name in FEATURES], dtype=float)
+
+    scores = np.zeros(len(features))
+    for code, regime in enumerate(REGIMES):
+        rows = regimes == code
+        if rows.any():
+            scaled = scale_weights(weights, regime)
+            scores[rows] = features[rows] @ np.array([scaled.get(name, 0) for name in FEATURES], dtype=float)
+    return scores
+
+
+def decisions(scores: np.ndarray, thresholds: Dict[str, float] = None) -> np.ndarray:
+    """Map scores to STRONG_BUY..STRONG_SELL labels"""
+    thresholds = thresholds or DEFAULT_SIGNAL_PARAMS["thresholds"]
+    labels = np.full(len(scores), "STRONG_SELL", dtype=object)
+    for label in ("SELL", "HOLD", "BUY", "STRONG_BUY"):
+        labels[scores >= thresholds[label]] = label
+    return labels
+
+
+def simulate_trades(open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+                    close: np.ndarray, atr: np.ndarray, entries: np.ndarray,
+                    stop_atr: float = 2.0, reward_risk: float = 2.0,
+                    max_bars: int = 168, chunk: int = 4096,
+                    stops: np.ndarray = None, targets: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """
+    Long trades entered on the open after each signal bar
+
+    `stops` and `targets` are per-bar levels known at the signal bar's
+    close, normally from `risk_levels`. Where they are missing, or a gap
+    puts the entry beyond them, the stop sits `stop_atr` ATRs below entry
+    and the target `reward_risk` times that distance above. Exits are
+    found by scanning a (signals x max_bars) window matrix; a bar that
+    touches both levels counts as a stop. Only one position is open at a
+    time.
+
+    Returns:
+        Arrays per trade: entry_bar, exit_bar, entry, exit, stop, outcome
+    """
+    n = len(close)
+    signal = np.flatnonzero(entries[:-1])
+    signal = signal[np.isfinite(atr[signal]) & (atr[signal] > 0)]
+    entry_bar = signal + 1
+    entry = open_[entry_bar]
+    stop = entry - stop_atr * atr[signal]
+    if stops is not None:
+        level = stops[signal]
+        with np.errstate(invalid='ignore'):
+            stop = np.where(level < entry, level, stop)
+    target = entry + reward_risk * (entry - stop)
+    if targets is not None:
+        level = targets[signal]
+        with np.errstate(invalid='ignore'):
+            target = np.where(level > entry, level, target)
+
+    pad = np.full(max_bars, np.nan)
+    high_windows = sliding_window_view(np.concatenate((high, pad)), max_bars)
+    low_windows = sliding_window_view(np.concatenate((low, pad)), max_bars)
+
+    exit_offset = np.empty(len(signal), dtype=np.int64)
+    outcome = np.empty(len(signal), dtype=object)
+    for start in range(0, len(signal), chunk):
+        part = slice(start, start + chunk)
+        bars = entry_bar[part]
+        hit_stop = low_windows[bars] <= stop[part, None]
+        hit_target = high_windows[bars] >= target[part, None]
+        first_stop = np.where(hit_stop.any(axis=1), hit_stop.argmax(axis=1), max_bars)
+        first_target = np.where(hit_target.any(axis=1), hit_target.argmax(axis=1), max_bars)
+
+        stopped = (first_stop <= first_target) & (first_stop < max_bars)
+        targeted = (first_target < first_stop)
+        exit_offset[part] = np.where(stopped, first_stop,
+                                     np.where(targeted, first_target, max_bars - 1))
+        outcome[part] = np.where(stopped, "stop", np.where(targeted, "target", "timeout"))
+
+    exit_bar = entry_bar + exit_offset
+    # Timeouts that run past the data are still open: drop them
+    closed = exit_bar < n
+    exit_price = np.where(outcome == "stop", stop,
+                          np.where(outcome == "target", target,
+                                   close[np.minimum(exit_bar, n - 1)]))
+
+    # One position at a time: hop from each exit to the next signal
+    chosen = []
+    i = 0
+    candidates = np.flatnonzero(closed)
+    candidate_signal = signal[candidates]
+    while i < len(candidates):
+        k = candidates[i]
+        chosen.append(k)
+        i = int(np.searchsorted(candidate_signal, exit_bar[k], side='left'))
+    chosen = np.array(chosen, dtype=np.int64)
+
+    return {
+        "entry_bar": entry_bar[chosen],
+        "exit_bar": exit_bar[chosen],
+        "entry": entry[chosen],
+        "exit": exit_price[chosen],
+        "stop": stop[chosen],
+        "outcome": outcome[chosen],
+    }
+
+
+def trade_statistics(trades: Dict[str, np.ndarray]) -> Dict:
+    """Hit rate, expectancy and drawdown of a set of trades"""
+    count = len(trades["entry"])
+    if count == 0:
+        return {"trades": 0}
+
+    risk = trades["entry"] - trades["stop"]
+    r_multiple = (trades["exit"] - trades["entry"]) / risk
+    returns = trades["exit"] / trades["entry"] - 1
+
+    equity = np.cumprod(1 + returns)
+    peak = np.maximum.accumulate(np.concatenate(([1.0], equity)))[1:]
+    r_curve = np.cumsum(r_multiple)
+    r_peak = np.maximum.accumulate(np.concatenate(([0.0], r_curve)))[1:]
+
+    return {
+        "trades": int(count),
+        "hit_rate": float(np.mean(trades["outcome"] == "target") * 100),
+        "win_rate": float(np.mean(returns > 0) * 100),
+        "stop_rate": float(np.mean(trades["outcome"] == "stop") * 100),
+        "expectancy_r": float(r_multiple.mean()),
+        "expectancy_percent": float(returns.mean() * 100),
+        "total_return_percent": float((equity[-1] - 1) * 100),
+        "max_drawdown_percent": float(np.max(1 - equity / peak) * 100),
+        "max_drawdown_r": float(np.max(r_peak - r_curve)),
+        "avg_bars_held": float(np.mean(trades["exit_bar"] - trades["entry_bar"] + 1)),
+    }
+
+
+class SignalBacktester:
+    """
+    Backtest the final signal on one or more symbols' OHLCV histories
+
+    Trades use the risk layer's stop and target at each signal bar;
+    `stop_atr` and `reward_risk` only cover signals where it has none.
+    """
+
+    def __init__(self, entry_decisions: Sequence[str] = ("STRONG_BUY",),
+                 params: Dict = None, stop_atr: float = 2.0, reward_risk: float = 2.0,
+                 max_bars: int = 168, warmup: int = 200):
+        self.entry_decisions = tuple(entry_decisions)
+        self.params = params or DEFAULT_SIGNAL_PARAMS
+        self.stop_atr = stop_atr
+        self.reward_risk = reward_risk
+        self.max_bars = max_bars
+        self.warmup = warmup
+
+    def run(self, symbol: str, data: pd.DataFrame) -> Dict:
+        """Backtest one symbol"""
+        if len(data) <= self.warmup + 1:
+            return {"symbol": symbol, "error": "Insufficient data"}
+
+        features, _ = signal_features(
+            data, self.params["rsi_overbought"], self.params["rsi_oversold"]
+        )
+        scores = confidence_scores(features, self.params["weights"], signal_regimes(data))
+        labels = decisions(scores, self.params["thresholds"])
+        entries = np.isin(labels, self.entry_decisions)
+        entries[:self.warmup] = False
+
+        high = data['High'].to_numpy(dtype=float)
+        low = data['Low'].to_numpy(dtype=float)
+        close = data['Close'].to_numpy(dtype=float)
+        atr = average_true_range(high, low, close)
+        stops, targets = risk_levels(data)
+
+        trades = simulate_trades(
+            data['Open'].to_numpy(dtype=float), high, low, close, atr, entries,
+            stop_atr=self.stop_atr, reward_risk=self.reward_risk, max_bars=self.max_bars,
+            stops=stops, targets=targets
+        )
+
+        values, counts = np.unique(labels[self.warmup:], return_counts=True)
+        return {
+            "symbol": symbol,
+            "bars": int(len(data)),
+            "start": str(data.index[0]),
+            "end": str(data.index[-1]),
+            "entry_decisions": list(self.entry_decisions),
+            "signal_counts": {str(v): int(c) for v, c in zip(values, counts)},
+            **trade_statistics(trades)
+        }
+
+    def run_many(self, datasets: Dict[str, pd.DataFrame]) -> List[Dict]:
+        """Backtest several symbols"""
+        return [self.run(symbol, data) for symbol, data in datasets.items()]
+
+
+async def _fetch_and_run(symbols: List[str], period: str, interval: str,
+                         entry_decisions: List[str], params: Dict = None) -> List[Dict]:
+    from analysis_engine.data_fetchers.universal_client import UniversalDataClient
+
+    client = UniversalDataClient()
+    backtester = SignalBacktester(entry_decisions=entry_decisions, params=params)
+    results = []
+    for symbol in symbols:
+        data = await client.fetch_data(symbol, period=period, interval=interval)
+        if data is None or data.empty:
+            results.append({"symbol": symbol, "error": "No data"})
+            continue
+        results.append(backtester.run(symbol, data))
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    from analysis_engine.signal_params import load_signal_params
+
+    parser = argparse.ArgumentParser(description="Backtest the final signal")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--period", default="1y")
+    parser.add_argument("--interval", default="1h")
+    parser.add_argument("--entry", nargs="+", default=["STRONG_BUY"])
+    parser.add_argument("--params", help="Signal parameters JSON (defaults if omitted)")
+    args = parser.parse_args()
+
+    params = load_signal_params(args.params)
+    print(json.dumps(
+        asyncio.run(_fetch_and_run(args.symbols, args.period, args.interval, args.entry, params)),
+        indent=2
+    ))
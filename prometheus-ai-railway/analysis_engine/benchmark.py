@@ -0,0 +1,216 @@
+"""
+Benchmark suite for ComprehensiveAnalyzer on seeded synthetic OHLCV
+
+Times analyze() per analysis type and per layer/indicator (via the
+analyzer's built-in profiling) at several history lengths, writes the
+results as JSON and can compare them against a saved baseline.
+
+    python -m analysis_engine.benchmark --output bench.json
+    python -m analysis_engine.benchmark --compare bench.json
+"""
+
+import json
+import platform
+import time
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from analysis_engine.comprehensive_analyzer import ComprehensiveAnalyzer
+
+SIZES = (100, 1000, 10000, 100000)
+ANALYSIS_TYPES = ("full", "quick", "risk")
+
+# Per-bar (drift, volatility, mean reversion) of the generator's regimes
+REGIME_DYNAMICS = {
+    "uptrend": (0.0006, 0.006, 0.0),
+    "downtrend": (-0.0006, 0.007, 0.0),
+    "range": (0.0, 0.004, 0.05),
+    "high_volatility": (0.0, 0.018, 0.0),
+}
+
+
+def synthetic_ohlcv(bars: int, seed: int = 0, start: str = "2024-01-01",
+                    freq: str = "1h", mean_regime_bars: int = 200) -> pd.DataFrame:
+    """
+    Regime-switching random walk with OHLCV columns
+
+    Regimes last a geometric number of bars (mean `mean_regime_bars`) and
+    each has its own drift and volatility; ranges also pull back towards
+    the level at which they started. The same seed always gives the same
+    frame.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(REGIME_DYNAMICS)
+
+    lengths = rng.geometric(1 / mean_regime_bars, size=bars // mean_regime_bars * 3 + 3)
+    while lengths.sum() < bars:
+        lengths = np.concatenate((lengths, rng.geometric(1 / mean_regime_bars, size=len(lengths))))
+    lengths = lengths[:np.searchsorted(np.cumsum(lengths), bars) + 1]
+    regime = np.repeat(rng.integers(len(names), size=len(lengths)), lengths)[:bars]
+    drift, vol, pull = (np.array([REGIME_DYNAMICS[n][k] for n in names])[regime] for k in range(3))
+
+    shocks = drift + vol * rng.standard_normal(bars)
+    log_close = np.empty(bars)
+    level, anchor = np.log(100.0), np.log(100.0)
+    for i in range(bars):
+        if i == 0 or regime[i] != regime[i - 1]:
+            anchor = level
+        level += shocks[i] - pull[i] * (level - anchor)
+        log_close[i] = level
+
+    close = np.exp(log_close)
+    open_ = np.exp(np.concatenate(([log_close[0]], log_close[:-1])))
+    wick = np.abs(rng.standard_normal((2, bars))) * vol * 0.5
+    high = np.maximum(open_, close) * np.exp(wick[0])
+    low = np.minimum(open_, close) * np.exp(-wick[1])
+    volume = rng.lognormal(10, 0.4, bars) * (1 + 50 * np.abs(np.log(close / open_)))
+
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+        index=pd.date_range(start, periods=bars, freq=freq)
+    )
+
+
+def run_benchmark(sizes: Sequence[int] = SIZES, analysis_types: Sequence[str] = ANALYSIS_TYPES,
+                  repeat: int = 5, budget: float = 30.0, seed: int = 0) -> Dict:
+    """
+    Median wall/CPU time of analyze() and of every profiled section
+
+    Every run uses a fresh analyzer so per-series caches (levels, wave
+    counts, volume profiles) do not flatter repeated runs. A case stops
+    repeating once it has used `budget` seconds, after at least one run.
+    """
+    # Warm imports, lazy initializers and allocator pools
+    ComprehensiveAnalyzer().analyze("BENCH", synthetic_ohlcv(500, seed), "full")
+
+    cases = []
+    for bars in sizes:
+        data = synthetic_ohlcv(bars, seed)
+        for analysis_type in analysis_types:
+            walls, cpus, sections = [], [], {}
+            started = time.perf_counter()
+            for _ in range(repeat):
+                analyzer = ComprehensiveAnalyzer(profile=True)
+                wall, cpu = time.perf_counter(), time.process_time()
+                result = analyzer.analyze("BENCH", data, analysis_type)
+                walls.append((time.perf_counter() - wall) * 1000)
+                cpus.append((time.process_time() - cpu) * 1000)
+                for name, timing in result.timings.items():
+                    sections.setdefault(name, []).append(timing["wall_ms"])
+                if time.perf_counter() - started > budget:
+                    break
+
+            cases.append({
+                "bars": bars,
+                "analysis_type": analysis_type,
+                "runs": len(walls),
+                "wall_ms": _summary(walls),
+                "cpu_ms": _summary(cpus),
+                "sections": {name: round(float(np.median(v)), 3) for name, v in sections.items()},
+            })
+    return {"meta": _environment(seed, repeat), "cases": cases}
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = 0.25,
+            min_delta_ms: float = 2.0) -> List[Dict]:
+    """
+    Slowdowns of the current run against a baseline
+
+    A case total or a section is flagged when its median is more than
+    `threshold` (relative) and `min_delta_ms` (absolute) slower than in
+    the baseline; the absolute floor keeps sub-millisecond sections from
+    flagging on noise.
+    """
+    reference = {(c["bars"], c["analysis_type"]): c for c in baseline.get("cases", [])}
+    regressions = []
+    for case in current["cases"]:
+        base = reference.get((case["bars"], case["analysis_type"]))
+        if base is None:
+            continue
+        pairs = [("total", case["wall_ms"]["median"], base["wall_ms"]["median"])]
+        pairs += [(name, value, base["sections"][name])
+                  for name, value in case["sections"].items() if name in base["sections"]]
+        for name, now, before in pairs:
+            if now - before > min_delta_ms and now > before * (1 + threshold):
+                regressions.append({
+                    "bars": case["bars"],
+                    "analysis_type": case["analysis_type"],
+                    "section": name,
+                    "baseline_ms": before,
+                    "current_ms": now,
+                    "ratio": round(now / before, 3) if before > 0 else None,
+                })
+    return regressions
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "median": round(float(np.median(values)), 3),
+        "min": round(float(np.min(values)), 3),
+        "max": round(float(np.max(values)), 3),
+    }
+
+
+def _environment(seed: int, repeat: int) -> Dict:
+    return {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "seed": seed,
+        "repeat": repeat,
+    }
+
+
+def _print_table(report: Dict, top: int = 5) -> None:
+    for case in report["cases"]:
+        layers = [(n, v) for n, v in case["sections"].items() if "/" not in n]
+        layers.sort(key=lambda item: -item[1])
+        slowest = ", ".join(f"{n} {v:.1f}" for n, v in layers[:top])
+        print(f"{case['bars']:>7} bars  {case['analysis_type']:<6} "
+              f"{case['wall_ms']['median']:>10.1f} ms  ({case['runs']} runs)  {slowest}")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--types", nargs="+", default=list(ANALYSIS_TYPES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=30.0, help="Seconds per case before repeats stop")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Relative slowdown to flag")
+    parser.add_argument("--min-delta", type=float, default=2.0, help="Absolute slowdown (ms) to flag")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.sizes, args.types, args.repeat, args.budget, args.seed)
+    _print_table(report)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_delta)
+        report["comparison"] = {
+            "baseline": args.compare,
+            "threshold": args.threshold,
+            "min_delta_ms": args.min_delta,
+            "regressions": regressions,
+        }
+        for r in regressions:
+            print(f"SLOWER {r['bars']} bars {r['analysis_type']} {r['section']}: "
+                  f"{r['baseline_ms']:.1f} -> {r['current_ms']:.1f} ms (x{r['ratio']})")
+        print(f"{len(regressions)} regression(s) against {args.compare}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {args.output}")
+    raise SystemExit(1 if regressions else 0)
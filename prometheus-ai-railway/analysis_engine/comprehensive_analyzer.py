@@ -3,78 +3,229 @@ Comprehensive 7-Layer Analysis Engine
 Integrates PROMETHEUS AI v6.0 and Efsanevi Yatırım Yeteneği systems
 """
 
+import threading
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 import ta
 import pandas_ta as ta2
-from datetime import datetime, timedelta
+from datetime import datetime
+from cachetools import LRUCache
+
+from analysis_engine.swing_detector import (
+    zigzag, last_swing, scan_divergences, active_divergence, average_true_range, parabolic_sar
+)
+from analysis_engine.volume_profile import VolumeProfile
+from analysis_engine.harmonics import scan_harmonics
+from analysis_engine.elliott import ElliottWaveCounter
+from analysis_engine.regime import regime_report, scale_weights
+from analysis_engine.profiling import LayerTimer
+from analysis_engine.support_resistance import cluster_levels, split_levels, liquidity_zones
+from analysis_engine.risk_metrics import risk_report, lookup_var
+from analysis_engine.correlation import CorrelationMatrix
+from analysis_engine.signal_params import load_signal_params
+from analysis_engine.result_model import AnalysisResult
+from analysis_engine.ohlcv import OHLCV
+from analysis_engine.monte_carlo import target_probabilities
+
+# Layers run per analysis type (unknown types get the full set); the final
+# signal is scored on whichever layers ran
+ANALYSIS_LAYERS = {
+    "full": ("price_action", "technical_indicators", "fibonacci", "market_structure",
+             "fundamental_analysis", "sentiment_analysis", "risk_management"),
+    "quick": ("price_action", "technical_indicators", "market_structure"),
+    "risk": ("technical_indicators", "fibonacci", "risk_management"),
+}
+
+def _last(series: pd.Series):
+    """Last value of an indicator output without positional Series indexing"""
+    return series.to_numpy()[-1]
+
 
 class ComprehensiveAnalyzer:
-    def __init__(self):
+    """
+    7-layer analysis of one symbol's candles
+    
+    analyze() may be called from several threads at once: per-call state
+    lives in thread-local storage, analyses of the same (symbol, interval)
+    series take turns on that series' incremental state, and the shared
+    caches, counters and correlation matrix are locked.
+    """
+    
+    def __init__(self, swing_left: int = 3, swing_right: int = 3,
+                 swing_atr_multiplier: float = 1.5,
+                 correlation_universe: List[str] = None,
+                 correlation_window: int = 168,
+                 signal_params: Dict[str, Any] = None,
+                 account_size: float = 10000,
+                 risk_per_trade: float = 0.02,
+                 simulation_paths: int = 4000,
+                 simulation_horizon: int = 120,
+                 simulation_method: str = "garch",
+                 profile: bool = False):
         self.patterns_recognized = 0
         self.indicators_calculated = 0
         
-    def analyze(self, symbol: str, price_data: pd.DataFrame, analysis_type: str = "full") -> Dict[str, Any]:
+        # Per-layer/indicator wall and CPU time (see timing_stats)
+        self.timer = LayerTimer(enabled=profile)
+        
+        # Zigzag settings shared by Fibonacci and divergence detection
+        self.swing_left = swing_left
+        self.swing_right = swing_right
+        self.swing_atr_multiplier = swing_atr_multiplier
+        
+        # Per-analyze() symbol and memo for results shared between layers
+        self._local = threading.local()
+        
+        # Incrementally updated per-(symbol, interval) state
+        self._lock = threading.Lock()
+        self._series_locks: Dict[Tuple[str, int], threading.Lock] = {}
+        self._volume_profiles = LRUCache(maxsize=256)
+        self._level_cache = LRUCache(maxsize=256)
+        self._wave_counters = LRUCache(maxsize=256)
+        
+        # Rolling return correlations across the supported universe (1h bars)
+        self.correlations = CorrelationMatrix(
+            correlation_universe or [], window=correlation_window
+        )
+        self._correlation_lock = threading.Lock()
+        
+        # Final-signal weights, thresholds and RSI levels (see optimizer.py)
+        self.signal_params = signal_params or load_signal_params()
+        
+        # Single-symbol position sizing (see portfolio.py for several assets)
+        self.account_size = account_size
+        self.risk_per_trade = risk_per_trade
+        
+        # Monte Carlo target probabilities in the risk layer
+        self.simulation_paths = simulation_paths
+        self.simulation_horizon = simulation_horizon
+        self.simulation_method = simulation_method
+        
+    def analyze(self, symbol: str, price_data: pd.DataFrame, analysis_type: str = "full") -> AnalysisResult:
         """
         Perform comprehensive 7-layer analysis
         
         Args:
             symbol: Asset symbol
             price_data: Price data DataFrame
-            analysis_type: "full", "quick", or "risk"
+            analysis_type: "full", "quick", or "risk" (see ANALYSIS_LAYERS)
             
         Returns:
-            Dict containing all analysis results
+            AnalysisResult with typed summaries and the per-layer details
+        """
+        return self.analyze_arrays(symbol, OHLCV.from_frame(price_data), analysis_type)
+    
+    def analyze_arrays(self, symbol: str, price_data: OHLCV, analysis_type: str = "full") -> AnalysisResult:
         """
+        Perform comprehensive 7-layer analysis on contiguous OHLCV arrays
+        
+        Only the layers of `analysis_type` run (see ANALYSIS_LAYERS). Layers
+        index the arrays directly; the DataFrame needed by ta and pandas_ta
+        is built once, only if a layer asks for it.
+        """
+        
+        self._local.memo = {}
+        self._local.symbol = symbol
+        try:
+            with self._series_lock(self._series_key(price_data)):
+                return self._analyze(symbol, price_data, analysis_type)
+        finally:
+            self._local.memo = {}
+    
+    def _analyze(self, symbol: str, price_data: OHLCV, analysis_type: str) -> AnalysisResult:
+        layers = ANALYSIS_LAYERS.get(analysis_type, ANALYSIS_LAYERS["full"])
+        timer = self.timer
+        timer.begin()
+        timer.call("correlations", self.update_correlations, symbol, price_data)
+        timestamp = datetime.now().timestamp()
         
         result = {
-            "symbol": symbol,
-            "timestamp": datetime.now().isoformat(),
-            "analysis_type": analysis_type,
-            "current_price": float(price_data['Close'].iloc[-1]) if len(price_data) > 0 else 0,
+            "current_price": float(price_data.close[-1]) if len(price_data) > 0 else 0,
             "price_change_24h": 0,
             "volume_24h": 0
         }
         
         # Layer 1: Price Action Analysis
-        result.update(self._analyze_price_action(price_data))
+        if "price_action" in layers:
+            result.update(timer.call("price_action", self._analyze_price_action, price_data))
         
         # Layer 2: Technical Indicators
-        result.update(self._analyze_technical_indicators(price_data))
+        if "technical_indicators" in layers:
+            result.update(timer.call("technical_indicators", self._analyze_technical_indicators, price_data))
         
         # Layer 3: Fibonacci & Mathematical Analysis
-        result.update(self._analyze_fibonacci(price_data))
+        if "fibonacci" in layers:
+            result.update(timer.call("fibonacci", self._analyze_fibonacci, price_data))
         
         # Layer 4: Market Structure
-        result.update(self._analyze_market_structure(price_data))
+        if "market_structure" in layers:
+            result.update(timer.call("market_structure", self._analyze_market_structure, price_data))
         
         # Layer 5: Fundamental Analysis
-        result.update(self._analyze_fundamental(symbol, price_data))
+        if "fundamental_analysis" in layers:
+            result.update(timer.call("fundamental_analysis", self._analyze_fundamental, symbol, price_data))
         
         # Layer 6: Sentiment Analysis
-        result.update(self._analyze_sentiment(symbol, price_data))
+        if "sentiment_analysis" in layers:
+            result.update(timer.call("sentiment_analysis", self._analyze_sentiment, symbol, price_data))
         
         # Layer 7: Risk Management
-        result.update(self._analyze_risk_management(symbol, price_data, result))
+        if "risk_management" in layers:
+            result.update(timer.call("risk_management", self._analyze_risk_management, symbol, price_data, result))
         
         # Generate final signal
-        result.update(self._generate_final_signal(result))
+        result.update(timer.call("final_signal", self._generate_final_signal, result))
         
-        return result
+        pa = result.get("price_action", {})
+        patterns = pa.get("active_patterns_count", 0) + len(
+            pa.get("harmonic_patterns", {}).get("patterns", [])
+        )
+        with self._lock:
+            self.patterns_recognized += patterns
+        
+        analysis_result = AnalysisResult.from_layers(
+            symbol, analysis_type, timestamp, result,
+            next_review=timestamp + 24 * 3600
+        )
+        analysis_result.timings = timer.end()
+        return analysis_result
+    
+    def timing_stats(self) -> Dict[str, Any]:
+        """Aggregated per-layer/indicator timings and lifetime counters"""
+        return {
+            "profiling_enabled": self.timer.enabled,
+            "analyses_profiled": self.timer.analyses,
+            "patterns_recognized": self.patterns_recognized,
+            "indicators_calculated": self.indicators_calculated,
+            "sections": self.timer.stats()
+        }
+    
+    def _indicator(self, name: str, func, *args, **kwargs):
+        """Compute one indicator, counted and timed under the current layer"""
+        with self._lock:
+            self.indicators_calculated += 1
+        return self.timer.call(name, func, *args, **kwargs)
+    
+    def update_correlations(self, symbol: str, data) -> None:
+        """Feed a symbol's latest candles (DataFrame or OHLCV) into the universe correlation matrix"""
+        if not isinstance(data, OHLCV):
+            data = OHLCV.from_frame(data)
+        if data.timestamps is None or len(data) < 2:
+            return
+        
+        if data.interval_seconds != self.correlations.interval_seconds:
+            return
+        
+        with self._correlation_lock:
+            self.correlations.update(symbol, data.timestamps, data.close)
     
-    def _analyze_price_action(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_price_action(self, data: OHLCV) -> Dict[str, Any]:
         """Layer 1: Price Action Analysis (38+ patterns)"""
         
         if len(data) < 20:
             return {"price_action": {"error": "Insufficient data"}}
         
-        close = data['Close']
-        open_ = data['Open']
-        high = data['High']
-        low = data['Low']
-        volume = data['Volume'] if 'Volume' in data.columns else None
-        
         patterns = {
             # Single Candle Patterns
             "doji": self._detect_doji(data),
@@ -101,10 +252,10 @@ class ComprehensiveAnalyzer:
         }
         
         # Elliott Wave Analysis
-        elliott_wave = self._analyze_elliott_wave(data)
+        elliott_wave = self.timer.call("elliott_wave", self._analyze_elliott_wave, data)
         
         # Harmonic Patterns
-        harmonic_patterns = self._analyze_harmonic_patterns(data)
+        harmonic_patterns = self.timer.call("harmonic_patterns", self._analyze_harmonic_patterns, data)
         
         return {
             "price_action": {
@@ -117,145 +268,169 @@ class ComprehensiveAnalyzer:
             }
         }
     
-    def _analyze_technical_indicators(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_technical_indicators(self, data: OHLCV) -> Dict[str, Any]:
         """Layer 2: Technical Indicators (50+ indicators)"""
         
         if len(data) < 50:
             return {"technical_indicators": {"error": "Insufficient data"}}
         
-        close = data['Close']
-        high = data['High']
-        low = data['Low']
-        volume = data['Volume'] if 'Volume' in data.columns else None
+        # ta and pandas_ta take Series
+        frame = data.frame()
+        close = frame['Close']
+        high = frame['High']
+        low = frame['Low']
+        volume = frame['Volume'] if data.volume is not None else None
         
         # Momentum Indicators
-        rsi = ta.momentum.RSIIndicator(close=close, window=14)
-        macd = ta.trend.MACD(close=close)
-        stoch = ta.momentum.StochasticOscillator(high=high, low=low, close=close)
-        williams_r = ta.momentum.WilliamsRIndicator(high=high, low=low, close=close)
-        cci = ta.trend.CCIIndicator(high=high, low=low, close=close)
-        awesome_oscillator = ta.momentum.AwesomeOscillatorIndicator(high=high, low=low)
+        rsi = self._indicator("rsi", ta.momentum.RSIIndicator, close=close, window=14)
+        macd = self._indicator("macd", ta.trend.MACD, close=close)
+        stoch = self._indicator("stoch", ta.momentum.StochasticOscillator, high=high, low=low, close=close)
+        williams_r = self._indicator("williams_r", ta.momentum.WilliamsRIndicator, high=high, low=low, close=close)
+        cci = self._indicator("cci", ta.trend.CCIIndicator, high=high, low=low, close=close)
+        awesome_oscillator = self._indicator(
+            "awesome_oscillator", ta.momentum.AwesomeOscillatorIndicator, high=high, low=low
+        )
         
         # Trend Indicators
-        sma_20 = ta.trend.SMAIndicator(close=close, window=20)
-        sma_50 = ta.trend.SMAIndicator(close=close, window=50)
-        sma_200 = ta.trend.SMAIndicator(close=close, window=200)
-        ema_20 = ta.trend.EMAIndicator(close=close, window=20)
-        adx = ta.trend.ADXIndicator(high=high, low=low, close=close)
-        parabolic_sar = ta.trend.PSARIndicator(high=high, low=low, close=close)
+        sma_20 = self._indicator("sma_20", ta.trend.SMAIndicator, close=close, window=20)
+        sma_50 = self._indicator("sma_50", ta.trend.SMAIndicator, close=close, window=50)
+        sma_200 = self._indicator("sma_200", ta.trend.SMAIndicator, close=close, window=200)
+        ema_20 = self._indicator("ema_20", ta.trend.EMAIndicator, close=close, window=20)
+        adx = self._indicator("adx", ta.trend.ADXIndicator, high=high, low=low, close=close)
+        psar = self._indicator("parabolic_sar", parabolic_sar, data.high, data.low, data.close)
         
         # Volatility Indicators
-        bollinger = ta.volatility.BollingerBands(close=close)
-        atr = ta.volatility.AverageTrueRange(high=high, low=low, close=close)
-        
-        # Volume Indicators
-        obv = ta.volume.OnBalanceVolumeIndicator(close=close, volume=volume)
-        mfi = ta.volume.MFIIndicator(high=high, low=low, close=close, volume=volume)
-        volume_sma = ta.volume.VolumeWeightedAveragePrice(
-            high=high, low=low, close=close, volume=volume
-        )
+        bollinger = self._indicator("bollinger", ta.volatility.BollingerBands, close=close)
+        atr = self._indicator("atr", ta.volatility.AverageTrueRange, high=high, low=low, close=close)
+        
+        # Volume Indicators (sources without volume skip them)
+        if volume is not None:
+            obv = self._indicator("obv", ta.volume.OnBalanceVolumeIndicator, close=close, volume=volume)
+            mfi = self._indicator("mfi", ta.volume.MFIIndicator, high=high, low=low, close=close, volume=volume)
+            volume_sma = self._indicator("volume_sma", ta.volume.VolumeWeightedAveragePrice,
+                high=high, low=low, close=close, volume=volume
+            )
         
         # Additional indicators from pandas_ta
-        ichimoku = ta2.ichimoku(high, low, close)
-        supertrend = ta2.supertrend(high, low, close)
-        donchian = ta2.donchian(high, low)
+        ichimoku = self._indicator("ichimoku", ta2.ichimoku, high, low, close)
+        supertrend = self._indicator("supertrend", ta2.supertrend, high, low, close)
+        donchian = self._indicator("donchian", ta2.donchian, high, low)
         
         # Calculate divergences
-        divergences = self._calculate_divergences(data, rsi, macd)
+        divergences = self.timer.call("divergences", self._calculate_divergences, data, rsi, macd)
+        
+        # Latest values, each indicator output materialized once
+        price = data.close[-1]
+        rsi_value = _last(rsi.rsi())
+        macd_value, macd_signal = _last(macd.macd()), _last(macd.macd_signal())
+        stoch_k, stoch_d = _last(stoch.stoch()), _last(stoch.stoch_signal())
+        williams_value = _last(williams_r.williams_r())
+        cci_value = _last(cci.cci())
+        sma_50_value, sma_200_value = _last(sma_50.sma_indicator()), _last(sma_200.sma_indicator())
+        adx_value = _last(adx.adx())
+        psar_value = psar[-1]
+        bb_upper = _last(bollinger.bollinger_hband())
+        bb_middle = _last(bollinger.bollinger_mavg())
+        bb_lower = _last(bollinger.bollinger_lband())
+        atr_value = _last(atr.average_true_range())
+        
+        if volume is not None:
+            obv_series = obv.on_balance_volume()
+            mfi_value = _last(mfi.money_flow_index())
+            vwap_value = _last(volume_sma.volume_weighted_average_price())
+            volume_section = {
+                "obv": {"value": float(obv_series.to_numpy()[-1]), "trend": self._get_obv_trend(obv_series)},
+                "mfi": {"value": float(mfi_value), "signal": self._get_mfi_signal(mfi_value)},
+                "volume_profile": self._analyze_volume_profile(data),
+                "vwap": {
+                    "value": float(vwap_value),
+                    "relation": "above" if price > vwap_value else "below"
+                }
+            }
+        else:
+            volume_section = {
+                "obv": {"value": None, "trend": None},
+                "mfi": {"value": None, "signal": None},
+                "volume_profile": None,
+                "vwap": None
+            }
         
         return {
             "technical_indicators": {
                 "momentum": {
                     "rsi": {
-                        "value": float(rsi.rsi().iloc[-1]),
-                        "signal": self._get_rsi_signal(rsi.rsi().iloc[-1]),
+                        "value": float(rsi_value),
+                        "signal": self._get_rsi_signal(rsi_value),
                         "divergence": divergences.get("rsi")
                     },
                     "macd": {
-                        "value": float(macd.macd().iloc[-1]),
-                        "signal_line": float(macd.macd_signal().iloc[-1]),
-                        "histogram": float(macd.macd_diff().iloc[-1]),
-                        "signal": "bullish" if macd.macd().iloc[-1] > macd.macd_signal().iloc[-1] else "bearish",
+                        "value": float(macd_value),
+                        "signal_line": float(macd_signal),
+                        "histogram": float(_last(macd.macd_diff())),
+                        "signal": "bullish" if macd_value > macd_signal else "bearish",
                         "divergence": divergences.get("macd")
                     },
                     "stochastic": {
-                        "k": float(stoch.stoch().iloc[-1]),
-                        "d": float(stoch.stoch_signal().iloc[-1]),
-                        "signal": self._get_stoch_signal(stoch.stoch().iloc[-1], stoch.stoch_signal().iloc[-1])
+                        "k": float(stoch_k),
+                        "d": float(stoch_d),
+                        "signal": self._get_stoch_signal(stoch_k, stoch_d)
                     },
                     "williams_r": {
-                        "value": float(williams_r.williams_r().iloc[-1]),
-                        "signal": self._get_williams_r_signal(williams_r.williams_r().iloc[-1])
+                        "value": float(williams_value),
+                        "signal": self._get_williams_r_signal(williams_value)
                     },
                     "cci": {
-                        "value": float(cci.cci().iloc[-1]),
-                        "signal": self._get_cci_signal(cci.cci().iloc[-1])
+                        "value": float(cci_value),
+                        "signal": self._get_cci_signal(cci_value)
                     }
                 },
                 "trend": {
                     "moving_averages": {
-                        "sma_20": float(sma_20.sma_indicator().iloc[-1]),
-                        "sma_50": float(sma_50.sma_indicator().iloc[-1]),
-                        "sma_200": float(sma_200.sma_indicator().iloc[-1]),
-                        "ema_20": float(ema_20.ema_indicator().iloc[-1]),
-                        "golden_cross": sma_50.sma_indicator().iloc[-1] > sma_200.sma_indicator().iloc[-1],
-                        "death_cross": sma_50.sma_indicator().iloc[-1] < sma_200.sma_indicator().iloc[-1]
+                        "sma_20": float(_last(sma_20.sma_indicator())),
+                        "sma_50": float(sma_50_value),
+                        "sma_200": float(sma_200_value),
+                        "ema_20": float(_last(ema_20.ema_indicator())),
+                        "golden_cross": sma_50_value > sma_200_value,
+                        "death_cross": sma_50_value < sma_200_value
                     },
                     "adx": {
-                        "value": float(adx.adx().iloc[-1]),
-                        "plus_di": float(adx.adx_pos().iloc[-1]),
-                        "minus_di": float(adx.adx_neg().iloc[-1]),
-                        "trend_strength": self._get_adx_strength(adx.adx().iloc[-1])
+                        "value": float(adx_value),
+                        "plus_di": float(_last(adx.adx_pos())),
+                        "minus_di": float(_last(adx.adx_neg())),
+                        "trend_strength": self._get_adx_strength(adx_value)
                     },
                     "parabolic_sar": {
-                        "value": float(parabolic_sar.psar().iloc[-1]),
-                        "signal": "bullish" if close.iloc[-1] > parabolic_sar.psar().iloc[-1] else "bearish"
+                        "value": float(psar_value),
+                        "signal": "bullish" if price > psar_value else "bearish"
                     },
                     "ichimoku": self._parse_ichimoku(ichimoku, close),
                     "supertrend": self._parse_supertrend(supertrend, close)
                 },
                 "volatility": {
                     "bollinger_bands": {
-                        "upper": float(bollinger.bollinger_hband().iloc[-1]),
-                        "middle": float(bollinger.bollinger_mavg().iloc[-1]),
-                        "lower": float(bollinger.bollinger_lband().iloc[-1]),
-                        "percent_b": float((close.iloc[-1] - bollinger.bollinger_lband().iloc[-1]) / 
-                                          (bollinger.bollinger_hband().iloc[-1] - bollinger.bollinger_lband().iloc[-1])),
-                        "bandwidth": float((bollinger.bollinger_hband().iloc[-1] - bollinger.bollinger_lband().iloc[-1]) / 
-                                          bollinger.bollinger_mavg().iloc[-1]),
+                        "upper": float(bb_upper),
+                        "middle": float(bb_middle),
+                        "lower": float(bb_lower),
+                        "percent_b": float((price - bb_lower) / (bb_upper - bb_lower)),
+                        "bandwidth": float((bb_upper - bb_lower) / bb_middle),
                         "squeeze": self._detect_bollinger_squeeze(bollinger)
                     },
                     "atr": {
-                        "value": float(atr.average_true_range().iloc[-1]),
-                        "percent": float(atr.average_true_range().iloc[-1] / close.iloc[-1] * 100)
+                        "value": float(atr_value),
+                        "percent": float(atr_value / price * 100)
                     },
                     "donchian_channels": self._parse_donchian(donchian, close)
                 },
-                "volume": {
-                    "obv": {
-                        "value": float(obv.on_balance_volume().iloc[-1]) if volume is not None else None,
-                        "trend": self._get_obv_trend(obv.on_balance_volume()) if volume is not None else None
-                    },
-                    "mfi": {
-                        "value": float(mfi.mfi().iloc[-1]) if volume is not None else None,
-                        "signal": self._get_mfi_signal(mfi.mfi().iloc[-1]) if volume is not None else None
-                    },
-                    "volume_profile": self._analyze_volume_profile(data) if volume is not None else None,
-                    "vwap": {
-                        "value": float(volume_sma.vwap().iloc[-1]) if volume is not None else None,
-                        "relation": "above" if close.iloc[-1] > volume_sma.vwap().iloc[-1] else "below"
-                    } if volume is not None else None
-                }
+                "volume": volume_section
             }
         }
     
-    def _analyze_fibonacci(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_fibonacci(self, data: OHLCV) -> Dict[str, Any]:
         """Layer 3: Fibonacci & Mathematical Analysis"""
         
         if len(data) < 100:
             return {"fibonacci": {"error": "Insufficient data"}}
         
-        close = data['Close']
         
         # Find recent swing highs and lows
         swing_high, swing_low = self._find_swing_points(data)
@@ -279,7 +454,7 @@ class ComprehensiveAnalyzer:
             }
         
         # Current price relation to Fibonacci levels
-        current_price = close.iloc[-1]
+        current_price = data.close[-1]
         fib_relation = {}
         if fib_levels:
             for level_name, level_price in fib_levels.items():
@@ -304,16 +479,12 @@ class ComprehensiveAnalyzer:
             }
         }
     
-    def _analyze_market_structure(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_market_structure(self, data: OHLCV) -> Dict[str, Any]:
         """Layer 4: Market Structure Analysis"""
         
         if len(data) < 30:
             return {"market_structure": {"error": "Insufficient data"}}
         
-        close = data['Close']
-        high = data['High']
-        low = data['Low']
-        
         # Trend identification
         trend = self._identify_trend(data)
         
@@ -337,11 +508,12 @@ class ComprehensiveAnalyzer:
                 "liquidity_zones": liquidity_zones,
                 "order_flow": order_flow,
                 "wyckoff_analysis": wyckoff_analysis,
-                "market_regime": self._identify_market_regime(data)
+                "market_regime": self._identify_market_regime(data),
+                "regime_metrics": self._get_regime(data)["metrics"]
             }
         }
     
-    def _analyze_fundamental(self, symbol: str, data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_fundamental(self, symbol: str, data: OHLCV) -> Dict[str, Any]:
         """Layer 5: Fundamental Analysis"""
         
         # This is a simplified version. In production, you would connect to
@@ -368,17 +540,17 @@ class ComprehensiveAnalyzer:
         
         return {"fundamental_analysis": fundamental}
     
-    def _analyze_sentiment(self, symbol: str, data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_sentiment(self, symbol: str, data: OHLCV) -> Dict[str, Any]:
         """Layer 6: Sentiment Analysis"""
         
         # Simplified sentiment analysis
         # In production, connect to sentiment APIs, social media, etc.
         
-        close = data['Close']
-        volume = data['Volume'] if 'Volume' in data.columns else None
+        close = data.close
+        volume = data.volume
         
         # Price-based sentiment
-        price_change = ((close.iloc[-1] - close.iloc[-5]) / close.iloc[-5] * 100) if len(close) >= 5 else 0
+        price_change = ((close[-1] - close[-5]) / close[-5] * 100) if len(close) >= 5 else 0
         
         sentiment_score = 50  # Neutral baseline
         
@@ -390,13 +562,13 @@ class ComprehensiveAnalyzer:
         
         # Volume sentiment
         if volume is not None and len(volume) >= 20:
-            avg_volume = volume.iloc[-20:].mean()
-            current_volume = volume.iloc[-1]
+            avg_volume = volume[-20:].mean()
+            current_volume = volume[-1]
             if current_volume > avg_volume * 1.5:
                 sentiment_score += 10  # High volume suggests conviction
         
         # Technical sentiment
-        rsi = ta.momentum.RSIIndicator(close=close, window=14).rsi().iloc[-1]
+        rsi = ta.momentum.RSIIndicator(close=data.frame()['Close'], window=14).rsi().iloc[-1]
         if rsi < 30:
             sentiment_score -= 15  # Oversold might indicate fear
         elif rsi > 70:
@@ -427,20 +599,18 @@ class ComprehensiveAnalyzer:
             }
         }
     
-    def _analyze_risk_management(self, symbol: str, data: pd.DataFrame, 
+    def _analyze_risk_management(self, symbol: str, data: OHLCV, 
                                 analysis_results: Dict) -> Dict[str, Any]:
         """Layer 7: Risk Management Analysis"""
         
         if len(data) < 20:
             return {"risk_management": {"error": "Insufficient data"}}
         
-        close = data['Close']
-        current_price = close.iloc[-1]
+        current_price = data.close[-1]
         
         # Calculate ATR for volatility
-        high = data['High']
-        low = data['Low']
-        atr = ta.volatility.AverageTrueRange(high=high, low=low, close=close)
+        frame = data.frame()
+        atr = ta.volatility.AverageTrueRange(high=frame['High'], low=frame['Low'], close=frame['Close'])
         atr_value = atr.average_true_range().iloc[-1]
         
         # Determine stop loss levels
@@ -454,7 +624,9 @@ class ComprehensiveAnalyzer:
         )
         
         # Risk/Reward analysis
-        risk_reward = self._analyze_risk_reward(data, analysis_results)
+        risk_reward = self._analyze_risk_reward(
+            data, analysis_results, stop_loss_levels.get("technical")
+        )
         
         # Correlation check (simplified)
         correlation_risk = self._assess_correlation_risk(symbol)
@@ -465,6 +637,8 @@ class ComprehensiveAnalyzer:
         # Kelly Criterion (simplified)
         kelly_position = self._calculate_kelly_criterion(analysis_results)
         
+        risk_metrics = self._get_risk_metrics(data)
+        
         return {
             "risk_management": {
                 "current_price": float(current_price),
@@ -480,6 +654,8 @@ class ComprehensiveAnalyzer:
                 "kelly_criterion": kelly_position,
                 "maximum_drawdown": self._calculate_max_drawdown(data),
                 "var_95": self._calculate_var(data, 0.95),
+                "cvar_95": lookup_var(risk_metrics["var_table"], 0.95, 1, "historical_cvar"),
+                "risk_metrics": risk_metrics,
                 "risk_factors": self._identify_risk_factors(analysis_results)
             }
         }
@@ -489,13 +665,20 @@ class ComprehensiveAnalyzer:
         
         signals = []
         confidence_score = 0
+        
+        # Rule weights shift with the regime (trend vs mean-reversion rules)
+        regime = analysis_results.get("market_structure", {}).get("market_regime", "normal")
+        weights = scale_weights(self.signal_params["weights"], regime)
+        if regime != "normal":
+            signals.append(f"Market regime: {regime.replace('_', ' ')}")
         risk_level = "MEDIUM"
+        thresholds = self.signal_params["thresholds"]
         
         # Price action signals
         pa = analysis_results.get("price_action", {})
         if pa.get("active_patterns_count", 0) > 0:
             signals.append("Active price patterns detected")
-            confidence_score += 10
+            confidence_score += weights["active_patterns"]
         
         # Technical signals
         ti = analysis_results.get("technical_indicators", {})
@@ -506,84 +689,84 @@ class ComprehensiveAnalyzer:
         rsi_signal = momentum.get("rsi", {}).get("signal", "neutral")
         if rsi_signal == "oversold":
             signals.append("RSI oversold - potential bounce")
-            confidence_score += 15
+            confidence_score += weights["rsi_oversold"]
         elif rsi_signal == "overbought":
             signals.append("RSI overbought - potential pullback")
-            confidence_score -= 10
+            confidence_score += weights["rsi_overbought"]
         
         # MACD signal
         macd_signal = momentum.get("macd", {}).get("signal", "neutral")
         if macd_signal == "bullish":
             signals.append("MACD bullish crossover")
-            confidence_score += 10
+            confidence_score += weights["macd_bullish"]
         
         # Trend signals
         ma = trend.get("moving_averages", {})
         if ma.get("golden_cross", False):
             signals.append("Golden Cross detected")
-            confidence_score += 20
+            confidence_score += weights["golden_cross"]
         elif ma.get("death_cross", False):
             signals.append("Death Cross detected")
-            confidence_score -= 20
+            confidence_score += weights["death_cross"]
         
         # Trend strength
         adx_strength = trend.get("adx", {}).get("trend_strength", "weak")
         if adx_strength == "strong":
             signals.append("Strong trend confirmed")
-            confidence_score += 15
+            confidence_score += weights["strong_trend"]
         
         # Fibonacci signals
         fib = analysis_results.get("fibonacci", {})
         fib_relation = fib.get("current_relation", {})
         if fib_relation:
             signals.append(f"At Fibonacci level: {list(fib_relation.keys())[0]}")
-            confidence_score += 5
+            confidence_score += weights["fibonacci_level"]
         
         # Market structure
         ms = analysis_results.get("market_structure", {})
         market_trend = ms.get("trend", {}).get("primary", "sideways")
         if market_trend == "uptrend":
             signals.append("Primary uptrend confirmed")
-            confidence_score += 15
+            confidence_score += weights["uptrend"]
         elif market_trend == "downtrend":
             signals.append("Primary downtrend confirmed")
-            confidence_score -= 15
+            confidence_score += weights["downtrend"]
         
         # Sentiment signals
         sentiment = analysis_results.get("sentiment_analysis", {})
         sentiment_cat = sentiment.get("category", "NEUTRAL")
         if sentiment_cat == "EXTREME_FEAR":
             signals.append("Extreme fear - contrarian opportunity")
-            confidence_score += 20
+            confidence_score += weights["extreme_fear"]
         elif sentiment_cat == "EXTREME_GREED":
             signals.append("Extreme greed - caution needed")
-            confidence_score -= 20
+            confidence_score += weights["extreme_greed"]
         
         # Risk/Reward
         rm = analysis_results.get("risk_management", {})
         rr = rm.get("risk_reward_analysis", {})
-        rr_ratio = rr.get("ratio", 1)
+        rr_ratio = rr.get("best_rr_ratio", 0)
         if rr_ratio >= 3:
-            signals.append(f"Excellent R:R ratio ({rr_ratio}:1)")
-            confidence_score += 25
+            signals.append(f"Excellent R:R ratio ({rr_ratio:.1f}:1)")
+            confidence_score += weights["rr_excellent"]
         elif rr_ratio >= 2:
-            signals.append(f"Good R:R ratio ({rr_ratio}:1)")
-            confidence_score += 15
+            signals.append(f"Good R:R ratio ({rr_ratio:.1f}:1)")
+            confidence_score += weights["rr_good"]
         
-        # Determine final signal
-        if confidence_score >= 50:
+        # Determine final signal; the upper half of the HOLD band is MEDIUM risk
+        if confidence_score >= thresholds["STRONG_BUY"]:
             final_signal = "STRONG_BUY"
             risk_level = "LOW"
-        elif confidence_score >= 30:
+        elif confidence_score >= thresholds["BUY"]:
             final_signal = "BUY"
             risk_level = "MEDIUM"
-        elif confidence_score >= 10:
+        elif confidence_score >= (thresholds["HOLD"] + thresholds["BUY"]) / 2:
             final_signal = "HOLD"
             risk_level = "MEDIUM"
-        elif confidence_score >= -10:
+        elif confidence_score >= thresholds["HOLD"]:
             final_signal = "HOLD"
             risk_level = "HIGH"
-        elif confidence_score >= -30:
+        elif confidence_score >= thresholds["SELL"]:
             final_signal = "SELL"
             risk_level = "HIGH"
         else:
@@ -603,27 +786,21 @@ class ComprehensiveAnalyzer:
                 "risk_level": risk_level,
                 "time_horizon": time_horizon,
                 "signals": signals,
-                "confidence_breakdown": {
-                    "technical": confidence_score * 0.4,
-                    "sentiment": confidence_score * 0.3,
-                    "risk_reward": confidence_score * 0.3
-                },
-                "recommended_action": self._get_recommended_action(final_signal, confidence_score),
-                "next_review": (datetime.now() + timedelta(hours=24)).isoformat()
+                "recommended_action": self._get_recommended_action(final_signal, confidence_score)
             }
         }
     
     # Helper methods for pattern detection (simplified versions)
     
-    def _detect_doji(self, data: pd.DataFrame) -> Dict:
+    def _detect_doji(self, data: OHLCV) -> Dict:
         """Detect Doji patterns"""
         if len(data) < 1:
             return {"detected": False}
         
-        close = data['Close'].iloc[-1]
-        open_ = data['Open'].iloc[-1]
-        high = data['High'].iloc[-1]
-        low = data['Low'].iloc[-1]
+        close = data.close[-1]
+        open_ = data.open[-1]
+        high = data.high[-1]
+        low = data.low[-1]
         
         body_size = abs(close - open_)
         total_range = high - low
@@ -638,15 +815,15 @@ class ComprehensiveAnalyzer:
         
         return {"detected": False}
     
-    def _detect_hammer(self, data: pd.DataFrame) -> Dict:
+    def _detect_hammer(self, data: OHLCV) -> Dict:
         """Detect Hammer pattern"""
         if len(data) < 1:
             return {"detected": False}
         
-        close = data['Close'].iloc[-1]
-        open_ = data['Open'].iloc[-1]
-        high = data['High'].iloc[-1]
-        low = data['Low'].iloc[-1]
+        close = data.close[-1]
+        open_ = data.open[-1]
+        high = data.high[-1]
+        low = data.low[-1]
         
         body_size = abs(close - open_)
         lower_shadow = min(close, open_) - low
@@ -666,15 +843,15 @@ class ComprehensiveAnalyzer:
         
         return {"detected": False}
     
-    def _detect_engulfing(self, data: pd.DataFrame) -> Dict:
+    def _detect_engulfing(self, data: OHLCV) -> Dict:
         """Detect Engulfing pattern"""
         if len(data) < 2:
             return {"detected": False}
         
-        current_close = data['Close'].iloc[-1]
-        current_open = data['Open'].iloc[-1]
-        prev_close = data['Close'].iloc[-2]
-        prev_open = data['Open'].iloc[-2]
+        current_close = data.close[-1]
+        current_open = data.open[-1]
+        prev_close = data.close[-2]
+        prev_open = data.open[-2]
         
         current_body = abs(current_close - current_open)
         prev_body = abs(prev_close - prev_open)
@@ -712,9 +889,9 @@ class ComprehensiveAnalyzer:
     
     def _get_rsi_signal(self, rsi_value: float) -> str:
         """Get RSI signal"""
-        if rsi_value > 70:
+        if rsi_value > self.signal_params["rsi_overbought"]:
             return "overbought"
-        elif rsi_value < 30:
+        elif rsi_value < self.signal_params["rsi_oversold"]:
             return "oversold"
         elif rsi_value > 50:
             return "bullish"
@@ -723,65 +900,120 @@ class ComprehensiveAnalyzer:
         else:
             return "neutral"
     
-    def _calculate_divergences(self, data: pd.DataFrame, rsi_indicator, macd_indicator) -> Dict:
-        """Calculate RSI and MACD divergences"""
-        # Simplified divergence calculation
-        close = data['Close']
-        rsi = rsi_indicator.rsi()
+    def _calculate_divergences(self, data: OHLCV, rsi_indicator, macd_indicator) -> Dict:
+        """Calculate RSI and MACD regular and hidden divergences over all swings"""
+        swings = self._get_swings(data)
         
-        if len(close) < 20 or len(rsi) < 20:
+        if len(swings["index"]) < 4:
             return {}
         
-        # Look for regular bullish divergence
-        price_lows = []
-        rsi_lows = []
-        
-        for i in range(-10, 0):
-            if i < -1:
-                if close.iloc[i] < close.iloc[i-1] and close.iloc[i] < close.iloc[i+1]:
-                    price_lows.append((i, close.iloc[i]))
-                if rsi.iloc[i] < rsi.iloc[i-1] and rsi.iloc[i] < rsi.iloc[i+1]:
-                    rsi_lows.append((i, rsi.iloc[i]))
-        
         divergences = {}
-        
-        if len(price_lows) >= 2 and len(rsi_lows) >= 2:
-            # Check for bullish divergence (price makes lower low, RSI makes higher low)
-            if (price_lows[-1][1] < price_lows[-2][1] and 
-                rsi_lows[-1][1] > rsi_lows[-2][1]):
-                divergences["rsi"] = "bullish_divergence"
-            # Check for bearish divergence (price makes higher high, RSI makes lower high)
-            elif (price_lows[-1][1] > price_lows[-2][1] and 
-                  rsi_lows[-1][1] < rsi_lows[-2][1]):
-                divergences["rsi"] = "bearish_divergence"
+        for name, oscillator in (("rsi", rsi_indicator.rsi()), ("macd", macd_indicator.macd())):
+            events = scan_divergences(swings, oscillator.to_numpy())
+            divergences[name] = active_divergence(swings, events)
         
         return divergences
     
-    def _identify_trend(self, data: pd.DataFrame) -> Dict:
+    @property
+    def _memo(self) -> Dict[tuple, Any]:
+        return self._local.memo
+    
+    @property
+    def _current_symbol(self) -> Optional[str]:
+        return getattr(self._local, "symbol", None)
+    
+    def _series_lock(self, key: Tuple[str, int]) -> threading.Lock:
+        """Lock serializing analyses that update one series' incremental state"""
+        with self._lock:
+            lock = self._series_locks.get(key)
+            if lock is None:
+                lock = self._series_locks[key] = threading.Lock()
+            return lock
+    
+    def _series_state(self, cache: LRUCache, key: Tuple, factory):
+        """Incremental state object of a series, created on first use"""
+        with self._lock:
+            state = cache.get(key)
+            if state is None:
+                state = cache[key] = factory()
+            return state
+    
+    def _get_swings(self, data: OHLCV) -> Dict[str, np.ndarray]:
+        """Zigzag swing sequence for the data, computed once per analysis"""
+        key = ("swings", id(data), len(data))
+        if key not in self._memo:
+            self._memo[key] = zigzag(
+                data.high,
+                data.low,
+                data.close,
+                left=self.swing_left,
+                right=self.swing_right,
+                atr_multiplier=self.swing_atr_multiplier
+            )
+        return self._memo[key]
+    
+    def _get_risk_metrics(self, data: OHLCV) -> Dict:
+        """VaR/CVaR table, drawdown and volatility, computed once per analysis"""
+        key = ("risk_metrics", id(data), len(data))
+        if key not in self._memo:
+            interval = self._series_key(data)[1]
+            self._memo[key] = risk_report(
+                data.close,
+                periods_per_year=365 * 86400 / interval if interval else None
+            )
+        return self._memo[key]
+    
+    def _get_regime(self, data: OHLCV) -> Dict:
+        """Regime, Wyckoff phase and rolling statistics, computed once per analysis"""
+        key = ("regime", id(data), len(data))
+        if key not in self._memo:
+            self._memo[key] = regime_report(data.close, data.high, data.low)
+        return self._memo[key]
+    
+    def _get_levels(self, data: OHLCV) -> List[Dict]:
+        """Ranked support/resistance levels, cached per (symbol, interval, last bar)"""
+        key = self._series_key(data) + (data.last_key,)
+        with self._lock:
+            levels = self._level_cache.get(key)
+        if levels is None:
+            atr = average_true_range(data.high, data.low, data.close)
+            volume = data.volume if data.volume is not None else np.ones(len(data))
+            levels = cluster_levels(
+                self._get_swings(data), data.high, data.low,
+                volume, tolerance=0.5 * float(atr[-1])
+            )
+            with self._lock:
+                self._level_cache[key] = levels
+        return levels
+    
+    def _series_key(self, data: OHLCV) -> Tuple[str, int]:
+        """(symbol, bar interval in seconds) identifying the analyzed series"""
+        return self._current_symbol, data.interval_seconds
+    
+    def _identify_trend(self, data: OHLCV) -> Dict:
         """Identify market trend"""
-        close = data['Close']
+        close = data.close
         
         if len(close) < 20:
             return {"primary": "unknown", "strength": "weak"}
         
-        # Calculate simple moving averages
-        sma_20 = close.rolling(window=20).mean()
-        sma_50 = close.rolling(window=50).mean()
+        # Latest simple moving averages (NaN until the window is full)
+        sma_20 = close[-20:].mean()
+        sma_50 = close[-50:].mean() if len(close) >= 50 else np.nan
         
-        current_price = close.iloc[-1]
+        current_price = close[-1]
         
         # Determine trend based on price position relative to MAs
-        if current_price > sma_20.iloc[-1] > sma_50.iloc[-1]:
+        if current_price > sma_20 > sma_50:
             trend = "uptrend"
-        elif current_price < sma_20.iloc[-1] < sma_50.iloc[-1]:
+        elif current_price < sma_20 < sma_50:
             trend = "downtrend"
         else:
             trend = "sideways"
         
         # Calculate trend strength using ADX
-        high = data['High']
-        low = data['Low']
-        adx_indicator = ta.trend.ADXIndicator(high=high, low=low, close=close)
+        frame = data.frame()
+        adx_indicator = ta.trend.ADXIndicator(high=frame['High'], low=frame['Low'], close=frame['Close'])
         adx_value = adx_indicator.adx().iloc[-1]
         
         if adx_value > 25:
@@ -795,29 +1027,32 @@ class ComprehensiveAnalyzer:
             "primary": trend,
             "strength": strength,
             "adx_value": float(adx_value),
-            "price_above_sma20": current_price > sma_20.iloc[-1],
-            "price_above_sma50": current_price > sma_50.iloc[-1]
+            "price_above_sma20": current_price > sma_20,
+            "price_above_sma50": current_price > sma_50
         }
     
     def _calculate_position_sizing(self, current_price: float, 
                                  stop_price: float, atr: float) -> Dict:
         """Calculate position sizing based on risk management principles"""
         
-        risk_per_trade = 0.02  # 2% risk per trade
-        account_size = 10000  # Default account size
+        risk_per_trade = self.risk_per_trade
+        account_size = self.account_size
         
         # Calculate risk amount
         risk_amount = account_size * risk_per_trade
         
         # Calculate stop distance
         stop_distance = abs(current_price - stop_price)
-        stop_percent = (stop_distance / current_price) * 100
+        if stop_distance <= 0 or current_price <= 0:
+            # Flat or zero-ATR data: no stop to size against
+            stop_distance = 0.0
+        stop_percent = (stop_distance / current_price) * 100 if current_price > 0 else 0.0
         
         # Calculate position size
-        position_size = risk_amount / stop_distance
+        position_size = risk_amount / stop_distance if stop_distance > 0 else 0.0
         
         # Adjust for volatility
-        volatility_ratio = atr / current_price
+        volatility_ratio = atr / current_price if current_price > 0 else 0.0
         if volatility_ratio > 0.05:  # High volatility
             position_size *= 0.5
         elif volatility_ratio < 0.01:  # Low volatility
@@ -838,12 +1073,11 @@ class ComprehensiveAnalyzer:
             "volatility_adjusted": volatility_ratio > 0.05 or volatility_ratio < 0.01
         }
     
-    def _analyze_risk_reward(self, data: pd.DataFrame, 
-                           analysis_results: Dict) -> Dict:
+    def _analyze_risk_reward(self, data: OHLCV, 
+                           analysis_results: Dict, stop_loss: float = None) -> Dict:
         """Analyze risk/reward ratios"""
         
-        close = data['Close']
-        current_price = close.iloc[-1]
+        current_price = float(data.close[-1])
         
         # Get potential targets from analysis
         technical = analysis_results.get("technical_indicators", {})
@@ -871,22 +1105,44 @@ class ComprehensiveAnalyzer:
                     "distance_percent": ((price - current_price) / current_price) * 100
                 })
         
-        # Calculate stop loss from technical levels
-        stop_loss = current_price * 0.95  # Default 5% stop
+        # Resistance levels from the support/resistance engine
+        for level in self._calculate_support_resistance(data)["resistance"][:3]:
+            targets.append({
+                "type": "Resistance",
+                "price": level["price"],
+                "distance_percent": ((level["price"] - current_price) / current_price) * 100
+            })
+        
+        # Stop loss from technical levels, tail risk as a last resort
+        if stop_loss is None or stop_loss >= current_price:
+            stop_loss = self._calculate_stop_loss_levels(data, analysis_results)["cvar_based"]
+        
+        risk = current_price - stop_loss
+        for target in targets:
+            target["rr_ratio"] = (target["price"] - current_price) / risk if risk > 0 else 0.0
         
-        # Find best R:R target
+        # Simulated chance of each target trading before the stop
+        simulation = self.timer.call(
+            "target_simulation", self._simulate_targets, data, targets, stop_loss
+        )
+        
+        # Best target by probability-weighted R multiple when simulated,
+        # by raw R:R otherwise
         best_target = None
         best_rr = 0
+        best_score = 0 if simulation is None else -np.inf
         
         for target in targets:
-            reward = target["price"] - current_price
-            risk = current_price - stop_loss
-            
-            if risk > 0:
-                rr_ratio = reward / risk
-                if rr_ratio > best_rr:
-                    best_rr = rr_ratio
-                    best_target = target
+            if target["rr_ratio"] <= 0:
+                continue
+            if simulation is None:
+                score = target["rr_ratio"]
+            else:
+                score = target["expected_r"]
+            if score > best_score:
+                best_score = score
+                best_rr = target["rr_ratio"]
+                best_target = target
         
         return {
             "current_price": current_price,
@@ -897,9 +1153,41 @@ class ComprehensiveAnalyzer:
             "best_target": best_target,
             "best_rr_ratio": best_rr,
             "recommended_rr_minimum": 2.0,
-            "meets_minimum_rr": best_rr >= 2.0
+            "meets_minimum_rr": best_rr >= 2.0,
+            "simulation": simulation
         }
     
+    def _simulate_targets(self, data: OHLCV, targets: List[Dict], stop_loss: float) -> Optional[Dict]:
+        """
+        Monte Carlo hit probabilities written into the targets above price
+        
+        Each simulated target gains hit_probability, stop_first_probability,
+        expected_bars and expected_r (probability-weighted R multiple).
+        Paths are seeded with the latest bar so a repeated analysis of the
+        same candle reports the same numbers.
+        """
+        current_price = float(data.close[-1])
+        upside = [t for t in targets if t["price"] > current_price]
+        if not upside or not 0 < stop_loss < current_price:
+            return None
+        
+        simulation = target_probabilities(
+            data.close, [t["price"] for t in upside], stop_loss,
+            horizon=self.simulation_horizon, paths=self.simulation_paths,
+            method=self.simulation_method, seed=data.last_key
+        )
+        if "error" in simulation:
+            return None
+        
+        for target, outcome in zip(upside, simulation.pop("targets")):
+            target["hit_probability"] = outcome["hit_probability"] * 100
+            target["stop_first_probability"] = outcome["stop_first_probability"] * 100
+            target["expected_bars"] = outcome["expected_bars"]
+            target["expected_r"] = (outcome["hit_probability"] * target["rr_ratio"]
+                                    - outcome["stop_first_probability"])
+        simulation["stop_probability"] *= 100
+        return simulation
+    
     def _get_recommended_action(self, signal: str, confidence: int) -> str:
         """Get recommended action based on signal and confidence"""
         
@@ -921,58 +1209,70 @@ class ComprehensiveAnalyzer:
             return f"⚠️ {base_action} - DÜŞÜK GÜVEN (DİKKATLİ OL)"
     
     # Additional simplified helper methods
-    def _detect_hanging_man(self, data: pd.DataFrame) -> Dict:
+    def _detect_hanging_man(self, data: OHLCV) -> Dict:
         return {"detected": False}
     
-    def _detect_shooting_star(self, data: pd.DataFrame) -> Dict:
+    def _detect_shooting_star(self, data: OHLCV) -> Dict:
         return {"detected": False}
     
-    def _detect_marubozu(self, data: pd.DataFrame) -> Dict:
+    def _detect_marubozu(self, data: OHLCV) -> Dict:
         return {"detected": False}
     
-    def _detect_spinning_top(self, data: pd.DataFrame) -> Dict:
+    def _detect_spinning_top(self, data: OHLCV) -> Dict:
         return {"detected": False}
     
-    def _detect_harami(self, data: pd.DataFrame) -> Dict:
+    def _detect_harami(self, data: OHLCV) -> Dict:
         return {"detected": False}
     
-    def _detect_morning_star(self, data: pd.DataFrame) -> Dict:
+    def _detect_morning_star(self, data: OHLCV) -> Dict:
         return {"detected": False}
     
-    def _detect_evening_star(self, data: pd.DataFrame) -> Dict:
+    def _detect_evening_star(self, data: OHLCV) -> Dict:
         return {"detected": False}
     
-    def _detect_three_white_soldiers(self, data: pd.DataFrame) -> Dict:
+    def _detect_three_white_soldiers(self, data: OHLCV) -> Dict:
         return {"detected": False}
     
-    def _detect_three_black_crows(self, data: pd.DataFrame) -> Dict:
+    def _detect_three_black_crows(self, data: OHLCV) -> Dict:
         return {"detected": False}
     
-    def _detect_head_shoulders(self, data: pd.DataFrame) -> Dict:
+    def _detect_head_shoulders(self, data: OHLCV) -> Dict:
         return {"detected": False}
     
-    def _detect_double_top_bottom(self, data: pd.DataFrame) -> Dict:
+    def _detect_double_top_bottom(self, data: OHLCV) -> Dict:
         return {"detected": False}
     
-    def _detect_triangles(self, data: pd.DataFrame) -> Dict:
+    def _detect_triangles(self, data: OHLCV) -> Dict:
         return {"detected": False}
     
-    def _detect_flags_pennants(self, data: pd.DataFrame) -> Dict:
+    def _detect_flags_pennants(self, data: OHLCV) -> Dict:
         return {"detected": False}
     
-    def _detect_cup_handle(self, data: pd.DataFrame) -> Dict:
+    def _detect_cup_handle(self, data: OHLCV) -> Dict:
         return {"detected": False}
     
-    def _analyze_elliott_wave(self, data: pd.DataFrame) -> Dict:
-        return {"wave_count": "unknown", "current_wave": "unknown"}
+    def _analyze_elliott_wave(self, data: OHLCV) -> Dict:
+        """Primary and alternative wave counts, updated incrementally per series"""
+        counter = self._series_state(self._wave_counters, self._series_key(data), ElliottWaveCounter)
+        
+        swings = self._get_swings(data)
+        timestamps = data.timestamps
+        keys = timestamps[swings["index"]] if timestamps is not None else swings["index"]
+        counter.update(keys, swings["price"], swings["kind"])
+        return counter.summary(float(data.close[-1]))
     
-    def _analyze_harmonic_patterns(self, data: pd.DataFrame) -> Dict:
-        return {"patterns": []}
+    def _analyze_harmonic_patterns(self, data: OHLCV) -> Dict:
+        """XABCD patterns on the zigzag swings, forming ones first"""
+        patterns = scan_harmonics(self._get_swings(data), float(data.close[-1]), len(data))
+        return {
+            "patterns": patterns,
+            "in_completion_zone": [p["name"] for p in patterns if p.get("in_completion_zone")]
+        }
     
     def _get_last_signals(self, patterns: Dict) -> List[str]:
         return []
     
-    def _analyze_last_candles(self, data: pd.DataFrame, count: int) -> Dict:
+    def _analyze_last_candles(self, data: OHLCV, count: int) -> Dict:
         return {"analysis": "No significant patterns"}
     
     def _get_stoch_signal(self, k: float, d: float) -> str:
@@ -1006,13 +1306,17 @@ class ComprehensiveAnalyzer:
         return "neutral"
     
     def _analyze_volume_profile(self, data) -> Dict:
-        return {"poc": 0, "value_area": {"high": 0, "low": 0}}
+        """Volume profile, updated incrementally per symbol and interval"""
+        profile = self._series_state(self._volume_profiles, self._series_key(data), VolumeProfile)
+        
+        profile.update(data.timestamps, data.high, data.low, data.volume)
+        return profile.summary(float(data.close[-1]))
     
     def _find_swing_points(self, data) -> Tuple[float, float]:
-        return None, None
+        return last_swing(self._get_swings(data))
     
     def _calculate_support_resistance(self, data) -> Dict:
-        return {"support": [], "resistance": []}
+        return split_levels(self._get_levels(data), float(data.close[-1]))
     
     def _calculate_pivot_points(self, data) -> Dict:
         return {"pivot": 0, "r1": 0, "r2": 0, "s1": 0, "s2": 0}
@@ -1021,22 +1325,23 @@ class ComprehensiveAnalyzer:
         return {"analysis": "Not implemented"}
     
     def _identify_market_phase(self, data) -> str:
-        return "unknown"
+        return self._get_regime(data)["phase"]
     
     def _analyze_structure(self, data) -> Dict:
         return {"higher_highs": False, "higher_lows": False}
     
     def _identify_liquidity_zones(self, data) -> List[Dict]:
-        return []
+        return liquidity_zones(self._get_levels(data), float(data.close[-1]))[:5]
     
     def _analyze_order_flow(self, data) -> Dict:
         return {"bid_ask_imbalance": 0}
     
     def _perform_wyckoff_analysis(self, data) -> Dict:
-        return {"phase": "unknown"}
+        regime = self._get_regime(data)
+        return {**regime["wyckoff"], "bars_in_phase": regime["bars_in_phase"]}
     
     def _identify_market_regime(self, data) -> str:
-        return "normal"
+        return self._get_regime(data)["regime"]
     
     def _analyze_crypto_fundamental(self, symbol, data) -> Dict:
         return {"market_cap": 0, "volume_24h": 0}
@@ -1057,10 +1362,50 @@ class ComprehensiveAnalyzer:
         return "neutral"
     
     def _calculate_stop_loss_levels(self, data, analysis_results) -> Dict:
-        return {"technical": data['Close'].iloc[-1] * 0.95}
+        """Stop candidates: 2x ATR, the 99% 5-bar historical CVaR and below the nearest support"""
+        current_price = float(data.close[-1])
+        atr = float(average_true_range(data.high, data.low, data.close)[-1])
+        
+        # 99% historical CVaR over 5 bars; 5% only without enough history
+        cvar = lookup_var(self._get_risk_metrics(data)["var_table"], 0.99, 5, "historical_cvar")
+        stops = {
+            "atr_2x": current_price - 2 * atr,
+            "cvar_based": current_price * (1 - (cvar if cvar > 0 else 5.0) / 100)
+        }
+        
+        support = self._calculate_support_resistance(data)["support"]
+        if support:
+            stops["support"] = support[0]["bottom"] - 0.25 * atr
+        
+        # Prefer the support stop unless it sits unreasonably far away
+        if "support" in stops and stops["support"] >= current_price - 4 * atr:
+            technical = stops["support"]
+        else:
+            technical = stops["atr_2x"]
+        
+        return {"technical": technical, **stops}
     
     def _assess_correlation_risk(self, symbol) -> Dict:
-        return {"risk": "low", "correlated_assets": []}
+        """Concentration risk from the universe correlation matrix"""
+        with self._correlation_lock:
+            correlations = self.correlations.correlations(symbol)
+            most_correlated = self.correlations.most_correlated(symbol)
+        strong = sum(1 for c in correlations.values() if abs(c["correlation"]) >= 0.7)
+        moderate = sum(1 for c in correlations.values() if abs(c["correlation"]) >= 0.5)
+        
+        if strong >= 3:
+            risk = "high"
+        elif strong or moderate >= 3:
+            risk = "medium"
+        else:
+            risk = "low"
+        
+        return {
+            "risk": risk,
+            "correlated_assets": most_correlated,
+            "highly_correlated_count": strong,
+            "assets_compared": len(correlations)
+        }
     
     def _calculate_volatility_adjustment(self, atr, data) -> Dict:
         return {"adjustment_factor": 1.0}
@@ -1069,10 +1414,10 @@ class ComprehensiveAnalyzer:
         return {"optimal_position": 0.1, "recommended": 0.025}
     
     def _calculate_max_drawdown(self, data) -> float:
-        return 0.0
+        return self._get_risk_metrics(data)["drawdown"]["max_drawdown"]
     
     def _calculate_var(self, data, confidence) -> float:
-        return 0.0
+        return lookup_var(self._get_risk_metrics(data)["var_table"], confidence)
     
     def _identify_risk_factors(self, analysis_results) -> List[str]:
         return ["General market risk"]
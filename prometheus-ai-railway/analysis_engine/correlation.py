@@ -0,0 +1,162 @@
+"""
+Universe-wide rolling return correlations with incremental co-moments
+"""
+
+import numpy as np
+from typing import Dict, List, Sequence
+
+
+class CorrelationMatrix:
+    """
+    Rolling pairwise correlation of log returns across a fixed universe
+
+    Returns live in a (window x symbols) table keyed by bar timestamp.
+    Pairwise-complete running sums (co-observation counts, sums, sums of
+    squares and cross products) are adjusted only for the rows that change,
+    so a new candle costs O(N^2) instead of recomputing O(N^2 * T).
+    Symbols that did not trade in a bar (stocks/forex off-hours) are simply
+    missing from that row rather than counted as zero returns.
+    """
+
+    def __init__(self, symbols: Sequence[str], window: int = 168,
+                 interval_seconds: int = 3600, min_periods: int = 30):
+        self.symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        self.window = window
+        self.interval_seconds = interval_seconds
+        self.min_periods = min_periods
+        self._col = {s: i for i, s in enumerate(self.symbols)}
+
+        n = len(self.symbols)
+        self._values = np.zeros((window, n))
+        self._mask = np.zeros((window, n))
+        self._row_ts = np.zeros(0, dtype=np.int64)
+        self._row_slot = np.zeros(0, dtype=np.int64)
+        self._free = list(range(window))
+
+        self._count = np.zeros((n, n))
+        self._sum = np.zeros((n, n))
+        self._sum_sq = np.zeros((n, n))
+        self._cross = np.zeros((n, n))
+        self._row_updates = 0
+
+    def update(self, symbol: str, timestamps: np.ndarray, closes: np.ndarray) -> None:
+        """
+        Feed the latest bars of one symbol
+
+        Args:
+            symbol: Universe symbol; others are ignored
+            timestamps: Bar timestamps as int64 nanoseconds
+            closes: Close prices aligned with timestamps
+        """
+        col = self._col.get(symbol.upper())
+        if col is None or len(closes) < 2:
+            return
+
+        ts = np.asarray(timestamps, dtype=np.int64)[1:]
+        returns = np.diff(np.log(np.asarray(closes, dtype=float)))
+        ok = np.isfinite(returns)
+        ts, returns = ts[ok][-self.window:], returns[ok][-self.window:]
+        if len(ts) == 0:
+            return
+
+        new_ts = np.setdiff1d(ts, self._row_ts)
+        if len(new_ts):
+            self._extend(new_ts)
+
+        if len(self._row_ts) == 0:
+            return
+
+        pos = np.searchsorted(self._row_ts, ts)
+        pos = np.minimum(pos, len(self._row_ts) - 1)
+        inside = self._row_ts[pos] == ts
+        slots = self._row_slot[pos[inside]]
+        if len(slots) == 0:
+            return
+
+        self._apply(slots, -1.0)
+        self._values[slots, col] = returns[inside]
+        self._mask[slots, col] = 1.0
+        self._apply(slots, 1.0)
+
+        self._row_updates += len(slots)
+        if self._row_updates > 20 * self.window:
+            self._recompute()
+
+    def correlations(self, symbol: str) -> Dict[str, Dict]:
+        """Correlation of one symbol against every other symbol, O(N)"""
+        i = self._col.get(symbol.upper())
+        if i is None:
+            return {}
+
+        count = self._count[i]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_i = self._sum[i] / count       # x_i over rows shared with j
+            mean_j = self._sum[:, i] / count    # x_j over rows shared with i
+            var_i = self._sum_sq[i] / count - mean_i ** 2
+            var_j = self._sum_sq[:, i] / count - mean_j ** 2
+            cov = self._cross[i] / count - mean_i * mean_j
+            corr = cov / np.sqrt(var_i * var_j)
+
+        valid = (count >= self.min_periods) & np.isfinite(corr)
+        valid[i] = False
+        return {
+            self.symbols[j]: {"correlation": float(np.clip(corr[j], -1, 1)),
+                              "observations": int(count[j])}
+            for j in np.flatnonzero(valid)
+        }
+
+    def most_correlated(self, symbol: str, limit: int = 5) -> List[Dict]:
+        """Assets with the highest absolute correlation to `symbol`"""
+        corr = self.correlations(symbol)
+        ranked = sorted(corr.items(), key=lambda item: -abs(item[1]["correlation"]))
+        return [{"symbol": s, **stats} for s, stats in ranked[:limit]]
+
+    def matrix(self) -> np.ndarray:
+        """Full pairwise correlation matrix (NaN where data is insufficient)"""
+        count = self._count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_a = self._sum / count
+            mean_b = self._sum.T / count
+            var_a = self._sum_sq / count - mean_a ** 2
+            var_b = self._sum_sq.T / count - mean_b ** 2
+            corr = (self._cross / count - mean_a * mean_b) / np.sqrt(var_a * var_b)
+        corr[count < self.min_periods] = np.nan
+        return np.clip(corr, -1, 1)
+
+    def _extend(self, new_ts: np.ndarray) -> None:
+        """Open rows for new timestamps, evicting the oldest beyond the window"""
+        all_ts = np.union1d(self._row_ts, new_ts)
+        cutoff = all_ts[-self.window:][0]
+
+        old = self._row_ts < cutoff
+        if old.any():
+            evicted = self._row_slot[old]
+            self._apply(evicted, -1.0)
+            self._values[evicted] = 0.0
+            self._mask[evicted] = 0.0
+            self._free.extend(evicted.tolist())
+            self._row_ts = self._row_ts[~old]
+            self._row_slot = self._row_slot[~old]
+
+        added = new_ts[new_ts >= cutoff]
+        slots = np.array([self._free.pop() for _ in range(len(added))], dtype=np.int64)
+        row_ts = np.concatenate((self._row_ts, added))
+        row_slot = np.concatenate((self._row_slot, slots))
+        order = np.argsort(row_ts, kind='stable')
+        self._row_ts, self._row_slot = row_ts[order], row_slot[order]
+
+    def _apply(self, slots: np.ndarray, sign: float) -> None:
+        """Add (sign=+1) or remove (sign=-1) rows from the running co-moments"""
+        x = self._values[slots]
+        m = self._mask[slots]
+        self._count += sign * (m.T @ m)
+        self._sum += sign * (x.T @ m)
+        self._sum_sq += sign * ((x * x).T @ m)
+        self._cross += sign * (x.T @ x)
+
+    def _recompute(self) -> None:
+        """Rebuild the co-moments from the table to shed rounding drift"""
+        for arr in (self._count, self._sum, self._sum_sq, self._cross):
+            arr.fill(0.0)
+        self._apply(self._row_slot, 1.0)
+        self._row_updates = 0
@@ -10,11 +10,14 @@ import asyncio
 import aiohttp
 from datetime import datetime, timedelta
 import ccxt
-from cachetools import TTLCache
+
+from utils.cache import CacheBackend, MemoryCache, pack_frame, unpack_frame
 
 class UniversalDataClient:
-    def __init__(self):
-        self.cache = TTLCache(maxsize=100, ttl=300)  # 5 minutes cache
+    def __init__(self, cache: CacheBackend = None, ttl: float = 300):
+        # OHLCV frames, shared between processes when the backend is
+        self.cache = cache or MemoryCache(maxsize=100)
+        self.ttl = ttl
         self.ccxt_exchange = ccxt.binance()
         
     async def fetch_data(self, symbol: str, period: str = "7d", interval: str = "1h") -> Optional[pd.DataFrame]:
@@ -31,22 +34,26 @@ class UniversalDataClient:
         """
         
         cache_key = f"{symbol}_{period}_{interval}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        cached = await self.cache.get("ohlcv", cache_key)
+        if cached is not None:
+            return unpack_frame(cached)
         
         try:
             # Determine asset type and fetch accordingly
             if self._is_crypto(symbol):
-                data = await self._fetch_crypto_data(symbol, period, interval)
+                fetch = self._fetch_crypto_data
             elif self._is_forex(symbol):
-                data = await self._fetch_forex_data(symbol, period, interval)
+                fetch = self._fetch_forex_data
             elif self._is_commodity(symbol):
-                data = await self._fetch_commodity_data(symbol, period, interval)
+                fetch = self._fetch_commodity_data
             else:
-                data = await self._fetch_stock_data(symbol, period, interval)
+                fetch = self._fetch_stock_data
+            
+            # yfinance and ccxt block; keep their HTTP calls off the event loop
+            data = await asyncio.to_thread(fetch, symbol, period, interval)
             
             if data is not None and not data.empty:
-                self.cache[cache_key] = data
+                await self.cache.set("ohlcv", cache_key, pack_frame(data), self.ttl)
             
             return data
             
@@ -71,7 +78,7 @@ class UniversalDataClient:
         commodities = ["GOLD", "XAUUSD", "SILVER", "XAGUSD", "OIL", "CL", "BRENT"]
         return symbol.upper() in commodities
     
-    async def _fetch_stock_data(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+    def _fetch_stock_data(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
         """Fetch stock data using yfinance"""
         try:
             ticker = yf.Ticker(symbol)
@@ -88,7 +95,7 @@ class UniversalDataClient:
             print(f"Error fetching stock data for {symbol}: {e}")
             return None
     
-    async def _fetch_crypto_data(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+    def _fetch_crypto_data(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
         """Fetch cryptocurrency data"""
         try:
             # Map interval for CCXT
@@ -144,7 +151,7 @@ class UniversalDataClient:
             except:
                 return None
     
-    async def _fetch_forex_data(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+    def _fetch_forex_data(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
         """Fetch forex data using yfinance"""
         try:
             # Forex symbols in yfinance format
@@ -162,7 +169,7 @@ class UniversalDataClient:
             print(f"Error fetching forex data for {symbol}: {e}")
             return None
     
-    async def _fetch_commodity_data(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+    def _fetch_commodity_data(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
         """Fetch commodity data"""
         try:
             # Map commodity symbols to yfinance symbols
@@ -0,0 +1,296 @@
+"""
+Incremental Elliott wave counter on a zigzag pivot stream
+"""
+
+import math
+from collections import deque
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+IMPULSE = "impulse"
+ZIGZAG = "zigzag"
+
+WAVE_LABELS = {IMPULSE: ("1", "2", "3", "4", "5"), ZIGZAG: ("A", "B", "C")}
+# Fibonacci guideline per ratio: (numerator wave, denominator wave, ideal)
+GUIDELINES = {
+    IMPULSE: ((2, 1, 0.618), (3, 1, 1.618), (4, 3, 0.382), (5, 1, 1.0)),
+    ZIGZAG: ((2, 1, 0.618), (3, 1, 1.0)),
+}
+
+
+class WaveCount(NamedTuple):
+    pattern: str
+    direction: int                        # +1 up, -1 down (direction of wave 1 / A)
+    points: Tuple[Tuple[int, float], ...]  # (pivot key, price) of the start and each wave end
+    extreme: Optional[float] = None       # Most extreme candidate end of the next wave so far
+
+    @property
+    def waves(self) -> int:
+        return len(self.points) - 1
+
+    @property
+    def complete(self) -> bool:
+        return self.waves == len(WAVE_LABELS[self.pattern])
+
+    @property
+    def start(self) -> Tuple[int, int]:
+        """(key, kind) of the start pivot; one bar can hold both a high and a low pivot"""
+        return self.points[0][0], -self.direction
+
+    @property
+    def last_kind(self) -> int:
+        """Kind of the last point: starts are lows for up counts and highs for down"""
+        return -self.direction if self.waves % 2 == 0 else self.direction
+
+
+def _passes_rules(count: WaveCount) -> bool:
+    """Hard rules that only need the points so far (prices normalized to an up count)"""
+    v = [p * count.direction for _, p in count.points]
+    m = len(v)
+    if count.pattern == IMPULSE:
+        if m == 3:
+            return v[2] > v[0]                      # Wave 2 never retraces all of wave 1
+        if m == 4:
+            return v[3] > v[1]                      # Wave 3 goes beyond wave 1
+        if m == 5:
+            return v[4] > v[1]                      # Wave 4 does not overlap wave 1
+        if m == 6:
+            l1, l3, l5 = v[1] - v[0], v[3] - v[2], v[5] - v[4]
+            return v[5] > v[3] and not (l3 < l1 and l3 < l5)   # Wave 3 is never the shortest
+        return True
+
+    if m == 3:
+        return 0.236 <= (v[1] - v[2]) / (v[1] - v[0]) <= 0.886   # B retraces part of A
+    if m == 4:
+        return v[3] > v[1] and 0.618 <= (v[3] - v[2]) / (v[1] - v[0]) <= 2.618
+    return True
+
+
+def guideline_fit(count: WaveCount) -> float:
+    """0-1 closeness of the wave length ratios to their Fibonacci guidelines"""
+    prices = [p for _, p in count.points]
+    lengths = [abs(b - a) for a, b in zip(prices, prices[1:])]
+    fits = [
+        math.exp(-abs(math.log(lengths[num - 1] / lengths[den - 1] / ideal)))
+        for num, den, ideal in GUIDELINES[count.pattern]
+        if num <= len(lengths) and lengths[den - 1] > 0 and lengths[num - 1] > 0
+    ]
+    return sum(fits) / len(fits) if fits else 0.5
+
+
+def invalidation_level(count: WaveCount) -> Optional[float]:
+    """Price beyond which the in-progress count is wrong"""
+    if count.complete or count.waves < 1:
+        return None
+    if count.pattern == IMPULSE and count.waves >= 3:
+        return count.points[1][1]                   # Wave 4 may not enter wave 1
+    return count.points[0][1]                       # Waves 2/B may not pass the start
+
+
+class ElliottWaveCounter:
+    """
+    Impulse (12345) and zigzag (ABC) counts over an alternating pivot stream
+
+    Each pivot either extends open counts or kills them, so candidates are
+    pruned as soon as a rule fails instead of enumerating pivot subsets:
+
+    - a wave end must be the most extreme pivot since the previous end
+      (later pivots that beat it re-anchor the branch, they do not fork it);
+    - a count dies once a later pivot of the same kind overshoots its last
+      wave end, since that wave demonstrably did not end there;
+    - hard rules (wave 2 / B retracement, wave 3 beyond 1, no 1-4 overlap,
+      wave 3 not the shortest) are checked the moment their pivot arrives.
+
+    Open counts are snapshotted after every pivot. When the zigzag revises
+    its tail (or the data window slides), the counter rolls back to the
+    last snapshot still consistent with the new pivots and only replays
+    what changed.
+
+    Counts may only start within the last `max_pivots` pivots of the input,
+    and each start pivot keeps at most `max_counts / max_pivots` branches
+    (most waves, then best guideline fit). A branch's survival thus never
+    depends on counts that started earlier, so following the stream gives
+    exactly the counts a rebuild from the same pivots would.
+    """
+
+    def __init__(self, max_pivots: int = 40, max_counts: int = 400, snapshots: int = 8):
+        self.max_pivots = max_pivots
+        self.max_counts = max_counts
+        self._pivots: List[Tuple[int, float, int]] = []
+        self._base = 0                              # Absolute position of _pivots[0]
+        self._window: FrozenSet[Tuple[int, int]] = frozenset()  # (key, kind) counts may start at
+        self._open: List[WaveCount] = []
+        self._done: List[WaveCount] = []
+        self._snapshots = deque(maxlen=snapshots)   # (processed, window, open, done)
+
+    @property
+    def processed(self) -> int:
+        return self._base + len(self._pivots)
+
+    def update(self, keys: Sequence[int], prices: Sequence[float], kinds: Sequence[int]) -> int:
+        """
+        Sync with the latest pivot sequence
+
+        Args:
+            keys: Stable pivot identifiers (bar timestamps), ascending
+            prices, kinds: Pivot prices and kinds (+1 high / -1 low)
+
+        Returns:
+            Number of pivots that had to be (re)processed
+        """
+        new = [(int(k), float(p), int(t)) for k, p, t in zip(keys, prices, kinds)]
+        start = max(len(new) - self.max_pivots, 0)
+        window = frozenset((key, kind) for key, _, kind in new[start:])
+        resume = self._resume_point(new, start, window)
+        if resume is None:
+            self._reset()
+            resume = start
+        self._window = window
+        for pivot in new[resume:]:
+            self._step(pivot)
+        self._open = [c for c in self._open if c.start in window]
+        self._done = [c for c in self._done if c.start in window]
+        return len(new) - resume
+
+    def _resume_point(self, new: List[Tuple[int, float, int]], start: int,
+                      window: FrozenSet[Tuple[int, int]]) -> Optional[int]:
+        """Index into `new` from which to replay after rolling back, or None to rebuild"""
+        if not self._pivots or not new:
+            return None
+        position = {(key, kind): i for i, (key, _, kind) in enumerate(self._pivots)}
+        first = next((j for j, (key, _, kind) in enumerate(new) if (key, kind) in position), None)
+        # Unknown pivots ahead of the known ones may only be older than the window
+        if first is None or first > start:
+            return None
+
+        key, _, kind = new[first]
+        offset = position[key, kind] - first        # old position = new position + offset
+        common = first
+        while (common < len(new) and common + offset < len(self._pivots)
+               and new[common] == self._pivots[common + offset]):
+            common += 1
+
+        # Roll back to the newest snapshot at or before the first difference
+        limit = self._base + common + offset
+        while self._snapshots and self._snapshots[-1][0] > limit:
+            self._snapshots.pop()
+        if not self._snapshots:
+            return None
+        processed, snapshot_window, open_counts, done = self._snapshots[-1]
+        resume = processed - self._base - offset
+        if resume < first:
+            return None
+        # A snapshot that already dropped counts the new window keeps is no use
+        if any((key, kind) not in snapshot_window for key, _, kind in new[start:resume]):
+            return None
+
+        del self._pivots[processed - self._base:]
+        self._open, self._done = list(open_counts), list(done)
+        return resume
+
+    def _reset(self) -> None:
+        self._base += len(self._pivots)
+        self._pivots = []
+        self._open, self._done = [], []
+        self._snapshots.clear()
+
+    def _step(self, pivot: Tuple[int, float, int]) -> None:
+        key, price, kind = pivot
+        self._pivots.append(pivot)
+        if len(self._pivots) > 2 * self.max_pivots:
+            drop = len(self._pivots) - self.max_pivots
+            self._base += drop
+            del self._pivots[:drop]
+        survivors = []
+        for count in self._open:
+            if count.start not in self._window:
+                continue
+            last_price = count.points[-1][1]
+            if kind == count.last_kind:
+                if (price - last_price) * kind > 0:
+                    continue                        # Last wave end overshot: count is dead
+                survivors.append(count)
+                continue
+
+            # Opposite kind: a candidate end for the next wave if it is a new extreme
+            if count.extreme is not None and (price - count.extreme) * kind <= 0:
+                survivors.append(count)
+                continue
+            count = count._replace(extreme=price)
+            survivors.append(count)
+
+            child = WaveCount(count.pattern, count.direction, count.points + ((key, price),))
+            if _passes_rules(child):
+                if child.complete:
+                    self._done.append(child)
+                else:
+                    survivors.append(child)
+
+        # Every pivot can start wave 1 or wave A in the opposite direction of its kind
+        survivors.append(WaveCount(IMPULSE, -kind, ((key, price),)))
+        survivors.append(WaveCount(ZIGZAG, -kind, ((key, price),)))
+
+        self._open = self._cap_branches(survivors)
+        self._done = [c for c in self._done if c.start in self._window]
+        self._snapshots.append((self.processed, self._window, tuple(self._open), tuple(self._done)))
+
+    def _cap_branches(self, counts: List[WaveCount]) -> List[WaveCount]:
+        """Keep the best branches of every start pivot, in their current order"""
+        per_start = max(self.max_counts // self.max_pivots, 1)
+        branches: Dict[Tuple[int, int], List[WaveCount]] = {}
+        for count in counts:
+            branches.setdefault(count.start, []).append(count)
+        if all(len(group) <= per_start for group in branches.values()):
+            return counts
+
+        kept = set()
+        for group in branches.values():
+            if len(group) > per_start:
+                group.sort(key=lambda c: (c.waves, guideline_fit(c)), reverse=True)
+            kept.update(id(c) for c in group[:per_start])
+        return [c for c in counts if id(c) in kept]
+
+    def candidates(self, current_price: float) -> List[Tuple[float, WaveCount]]:
+        """Scored counts still consistent with the current price, best first"""
+        if not self._pivots:
+            return []
+        latest = self._pivots[-1][0]
+        scored = []
+        for count in self._open:
+            if count.waves < 2:
+                continue
+            level = invalidation_level(count)
+            if level is not None and (current_price - level) * count.direction <= 0:
+                continue
+            scored.append((guideline_fit(count) * count.waves / len(WAVE_LABELS[count.pattern]), count))
+        for count in self._done:
+            if count.points[-1][0] == latest:
+                scored.append((guideline_fit(count), count))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored
+
+    def summary(self, current_price: float, alternatives: int = 3) -> Dict:
+        """Primary count plus the best alternatives"""
+        scored = self.candidates(current_price)
+        if not scored:
+            return {"wave_count": "unknown", "current_wave": "unknown"}
+
+        score, primary = scored[0]
+        result = self._describe(primary, score)
+        result["waves"] = [
+            {"wave": label, "start": start[1], "end": end[1]}
+            for label, start, end in zip(WAVE_LABELS[primary.pattern],
+                                         primary.points[:-1], primary.points[1:])
+        ]
+        result["invalidation"] = invalidation_level(primary)
+        result["alternatives"] = [self._describe(c, s) for s, c in scored[1:alternatives + 1]]
+        return result
+
+    @staticmethod
+    def _describe(count: WaveCount, score: float) -> Dict:
+        labels = WAVE_LABELS[count.pattern]
+        return {
+            "wave_count": count.pattern,
+            "direction": "up" if count.direction > 0 else "down",
+            "current_wave": "complete" if count.complete else labels[count.waves],
+            "confidence": round(float(score), 3),
+        }
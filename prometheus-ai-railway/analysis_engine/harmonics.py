@@ -0,0 +1,196 @@
+"""
+Harmonic XABCD pattern scanner over zigzag swing sequences
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, List, Optional
+
+from analysis_engine.swing_detector import LOW
+
+# Leg ratios, each invariant to mirroring the pattern (bullish <-> bearish):
+#   xb    = AB / XA         B retracement of XA
+#   bc    = BC / AB         C retracement (or extension) of AB
+#   cd    = CD / BC         D extension of BC
+#   xd    = AD / XA         D retracement (or extension) of XA
+#   xc    = XC / XA         C extension of XA (Cypher)
+#   dc_xc = CD / XC         D retracement of XC (Shark, Cypher)
+RATIOS = ("xb", "bc", "cd", "xd", "xc", "dc_xc")
+# Ratios that need point D; the rest can be checked while D is still forming
+D_RATIOS = ("cd", "xd", "dc_xc")
+
+PATTERNS: Dict[str, Dict[str, tuple]] = {
+    "Gartley": {"xb": (0.618, 0.618), "bc": (0.382, 0.886), "cd": (1.13, 1.618), "xd": (0.786, 0.786)},
+    "Bat": {"xb": (0.382, 0.50), "bc": (0.382, 0.886), "cd": (1.618, 2.618), "xd": (0.886, 0.886)},
+    "Butterfly": {"xb": (0.786, 0.786), "bc": (0.382, 0.886), "cd": (1.618, 2.24), "xd": (1.27, 1.618)},
+    "Crab": {"xb": (0.382, 0.618), "bc": (0.382, 0.886), "cd": (2.24, 3.618), "xd": (1.618, 1.618)},
+    "Shark": {"bc": (1.13, 1.618), "cd": (1.618, 2.24), "dc_xc": (0.886, 1.13)},
+    "Cypher": {"xb": (0.382, 0.618), "xc": (1.272, 1.414), "dc_xc": (0.786, 0.786)},
+}
+NAMES = list(PATTERNS)
+
+
+def _bounds():
+    """(patterns x ratios) template ranges; unused ratios are NaN"""
+    lower = np.full((len(NAMES), len(RATIOS)), np.nan)
+    upper = np.full((len(NAMES), len(RATIOS)), np.nan)
+    for i, name in enumerate(NAMES):
+        for ratio, (lo, hi) in PATTERNS[name].items():
+            j = RATIOS.index(ratio)
+            lower[i, j], upper[i, j] = lo, hi
+    return lower, upper
+
+
+LOWER, UPPER = _bounds()
+
+
+def leg_ratios(points: np.ndarray) -> np.ndarray:
+    """
+    Ratio columns (RATIOS order) for rows of X, A, B, C[, D] prices
+
+    Rows with only four points get NaN in the D ratios.
+    """
+    x, a, b, c = points[:, 0], points[:, 1], points[:, 2], points[:, 3]
+    d = points[:, 4] if points.shape[1] > 4 else np.full(len(points), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.column_stack((
+            (a - b) / (a - x),
+            (c - b) / (a - b),
+            (c - d) / (c - b),
+            (a - d) / (a - x),
+            (c - x) / (a - x),
+            (c - d) / (c - x),
+        ))
+
+
+def _match(ratios: np.ndarray, columns: List[int], tolerance: float):
+    """
+    Test every row against every template on the given ratio columns
+
+    A ratio passes when it lies within `tolerance` (relative) of its
+    template range. The fit score falls from 1 inside every range to 0.5
+    at the edge of the tolerance.
+
+    Returns:
+        (rows x patterns) boolean match matrix and fit scores
+    """
+    r = ratios[:, None, columns]
+    lo, hi = LOWER[None, :, columns], UPPER[None, :, columns]
+    used = ~np.isnan(lo)
+    with np.errstate(invalid='ignore'):
+        # Relative distance outside the template range (0 inside it)
+        error = np.maximum(np.maximum(lo - r, r - hi), 0.0) / lo
+        ok = np.where(used, error <= tolerance, True)
+    mean_error = np.where(used, error, 0.0).sum(axis=2) / np.maximum(used.sum(axis=2), 1)
+    score = np.clip(1 - mean_error / (2 * tolerance), 0, 1)
+    return ok.all(axis=2), score
+
+
+def _completion_zone(name: str, x: float, a: float, b: float, c: float,
+                     tolerance: float) -> Optional[Dict]:
+    """
+    Potential reversal zone for D: overlap of the price ranges every D
+    ratio of the template allows (with tolerance), else the range of its
+    primary D ratio (XD, or the XC retracement for Shark and Cypher)
+    """
+    spec = PATTERNS[name]
+    anchors = {"cd": (c, c - b), "xd": (a, a - x), "dc_xc": (c, c - x)}
+    ranges = {}
+    for ratio in D_RATIOS:
+        if ratio in spec:
+            origin, leg = anchors[ratio]
+            lo, hi = spec[ratio][0] * (1 - tolerance), spec[ratio][1] * (1 + tolerance)
+            ends = (origin - lo * leg, origin - hi * leg)
+            ranges[ratio] = (min(ends), max(ends))
+    if not ranges:
+        return None
+
+    bottom = max(r[0] for r in ranges.values())
+    top = min(r[1] for r in ranges.values())
+    if bottom > top:
+        primary = "xd" if "xd" in ranges else "dc_xc" if "dc_xc" in ranges else "cd"
+        bottom, top = ranges[primary]
+    return {"low": float(bottom), "high": float(top)}
+
+
+def scan_harmonics(swings: Dict[str, np.ndarray], current_price: float, n_bars: int,
+                   tolerance: float = 0.05, recent_swings: int = 3) -> List[Dict]:
+    """
+    Completed and forming XABCD patterns ending at the latest swings
+
+    All five-pivot windows of the swing sequence are tested against all
+    templates at once with broadcast ratio checks. Completed patterns are
+    reported when D is one of the last `recent_swings` pivots; a forming
+    pattern uses the last four pivots as X, A, B, C and reports where D
+    would complete.
+
+    Args:
+        swings: Zigzag output ("index", "price", "kind")
+        current_price: Latest close
+        n_bars: Number of bars the swings were computed on
+        tolerance: Relative slack around each template ratio
+
+    Returns:
+        Pattern dicts, best fit first
+    """
+    idx, price, kind = swings["index"], swings["price"], swings["kind"]
+    if len(price) < 4:
+        return []
+
+    early = [RATIOS.index(r) for r in RATIOS if r not in D_RATIOS]
+    patterns = []
+
+    if len(price) >= 5:
+        start = max(len(price) - 4 - recent_swings, 0)
+        windows = sliding_window_view(price, 5)[start:]
+        matched, score = _match(leg_ratios(windows), list(range(len(RATIOS))), tolerance)
+        for w, p in zip(*np.nonzero(matched)):
+            s = start + w
+            d_bar = int(idx[s + 4])
+            zone = _completion_zone(NAMES[p], *price[s:s + 4], tolerance)
+            patterns.append(_describe(NAMES[p], "completed", idx[s:s + 5], price[s:s + 5],
+                                      kind[s], score[w, p], zone, current_price,
+                                      bars_since_completion=n_bars - 1 - d_bar))
+
+    # Forming: last four pivots are X, A, B, C and price is travelling towards D
+    points = price[-4:]
+    bullish = kind[-4] == LOW
+    moving_to_d = current_price < points[3] if bullish else current_price > points[3]
+    if moving_to_d:
+        matched, score = _match(leg_ratios(points[None, :]), early, tolerance)
+        for p in np.flatnonzero(matched[0]):
+            zone = _completion_zone(NAMES[p], *points, tolerance)
+            if zone is None:
+                continue
+            # Price already ran far through the zone: the pattern failed
+            beyond = zone["low"] - current_price if bullish else current_price - zone["high"]
+            if beyond > zone["high"] - zone["low"] + abs(points[3] - points[2]) * 0.1:
+                continue
+            patterns.append(_describe(NAMES[p], "forming", idx[-4:], points, kind[-4],
+                                      score[0, p], zone, current_price))
+
+    patterns.sort(key=lambda pat: (pat["status"] != "forming", -pat["score"]))
+    return patterns
+
+
+def _describe(name: str, status: str, bars: np.ndarray, prices: np.ndarray, first_kind: int,
+              score: float, zone: Optional[Dict], current_price: float, **extra) -> Dict:
+    labels = "XABCD"
+    ratios = leg_ratios(np.append(prices, [np.nan] * (5 - len(prices)))[None, :])[0]
+    pattern = {
+        "name": name,
+        "direction": "bullish" if first_kind == LOW else "bearish",
+        "status": status,
+        "points": {labels[i]: {"index": int(bars[i]), "price": float(prices[i])}
+                   for i in range(len(prices))},
+        "ratios": {r: round(float(v), 3) for r, v in zip(RATIOS, ratios)
+                   if r in PATTERNS[name] and np.isfinite(v)},
+        "score": round(float(score), 3),
+        "completion_zone": zone,
+        **extra
+    }
+    if zone:
+        pattern["in_completion_zone"] = bool(zone["low"] <= current_price <= zone["high"])
+        mid = (zone["low"] + zone["high"]) / 2
+        pattern["distance_percent"] = float((mid - current_price) / current_price * 100)
+    return pattern
@@ -0,0 +1,142 @@
+"""
+Monte Carlo price paths for target-before-stop probabilities
+"""
+
+import numpy as np
+from typing import Dict, Optional, Sequence
+
+METHODS = ("bootstrap", "garch")
+
+
+def garch_filter(returns: np.ndarray, alpha: float = 0.08,
+                 beta: float = 0.90) -> np.ndarray:
+    """
+    GARCH(1,1) conditional variances of a return series
+
+    Variance targeting: omega is set so the unconditional variance equals
+    the sample variance, leaving only the (fixed) alpha/beta persistence.
+    Element t is the variance forecast for return t; the last element is
+    followed by one more forecast, so the result has len(returns) + 1 values.
+    """
+    long_run = returns.var()
+    omega = long_run * (1 - alpha - beta)
+    variance = np.empty(len(returns) + 1)
+    variance[0] = long_run
+    for t, r in enumerate(returns):
+        variance[t + 1] = omega + alpha * r * r + beta * variance[t]
+    return variance
+
+
+def simulate_log_paths(returns: np.ndarray, horizon: int, paths: int,
+                       method: str = "garch", rng: Optional[np.random.Generator] = None,
+                       alpha: float = 0.08, beta: float = 0.90) -> np.ndarray:
+    """
+    Cumulative log returns of simulated paths (paths x horizon)
+
+    - bootstrap: i.i.d. resampling of the historical log returns
+    - garch: filtered historical simulation; standardized GARCH(1,1)
+      residuals are resampled and rescaled by a variance that evolves with
+      every simulated shock, starting from today's forecast, so a calm or
+      turbulent present carries into the paths
+
+    All paths are drawn as one matrix; the GARCH recursion loops over the
+    horizon only, vectorized across paths.
+    """
+    rng = rng or np.random.default_rng()
+    # Drawn time-major so each simulated bar is one contiguous row
+    draws = rng.integers(len(returns), size=(horizon, paths))
+
+    if method == "bootstrap":
+        return np.cumsum(returns[draws], axis=0).T
+
+    mean = returns.mean()
+    shocks = returns - mean
+    variance = garch_filter(shocks, alpha, beta)
+    omega = shocks.var() * (1 - alpha - beta)
+
+    steps = (shocks / np.sqrt(variance[:-1]))[draws]
+    current = np.full(paths, variance[-1])
+    for t in range(horizon):
+        shock = steps[t] * np.sqrt(current)
+        current = omega + alpha * shock * shock + beta * current
+        steps[t] = shock
+    steps += mean
+    return np.cumsum(steps, axis=0).T
+
+
+def first_passage(log_paths: np.ndarray, levels: np.ndarray, upper: bool = True) -> np.ndarray:
+    """
+    Bar index at which each path first reaches each level (paths x levels)
+
+    Paths that never get there within the horizon get `horizon`. The
+    running extreme of a path is monotone, so the first touch is the
+    horizon minus the number of bars at or beyond the level.
+    """
+    horizon = log_paths.shape[1]
+    if upper:
+        extreme = np.maximum.accumulate(log_paths, axis=1)
+        counts = [np.count_nonzero(extreme >= level, axis=1) for level in levels]
+    else:
+        extreme = np.minimum.accumulate(log_paths, axis=1)
+        counts = [np.count_nonzero(extreme <= level, axis=1) for level in levels]
+    return horizon - np.column_stack(counts)
+
+
+def target_probabilities(close: np.ndarray, targets: Sequence[float], stop: float,
+                         horizon: int = 120, paths: int = 4000, method: str = "garch",
+                         lookback: int = 1000, seed: Optional[int] = None) -> Dict:
+    """
+    Chance of reaching each target before the stop, from simulated closes
+
+    Paths are built from the last `lookback` log returns. A target and the
+    stop touched on the same bar count as stopped out, and intrabar moves
+    are not simulated, so the probabilities lean conservative.
+
+    Args:
+        close: Close prices, oldest first
+        targets: Target prices above the current price
+        stop: Stop price below the current price
+        horizon: Bars simulated per path
+        paths: Number of paths
+        method: "bootstrap" or "garch"
+        seed: Seed for reproducible paths
+
+    Returns:
+        Dict with the stop probability and, per target, the probability of
+        being hit first and the mean bars needed when it is
+    """
+    if method not in METHODS:
+        return {"error": f"Unknown method: {method}"}
+
+    close = np.asarray(close, dtype=float)
+    returns = np.diff(np.log(close[-(lookback + 1):]))
+    returns = returns[np.isfinite(returns)]
+    if len(returns) < 30:
+        return {"error": "Insufficient data"}
+
+    current = close[-1]
+    log_paths = simulate_log_paths(returns, horizon, paths, method, np.random.default_rng(seed))
+
+    target_levels = np.log(np.asarray(targets, dtype=float) / current)
+    hit_bar = first_passage(log_paths, target_levels, upper=True)
+    stop_bar = first_passage(log_paths, np.array([np.log(stop / current)]), upper=False)
+
+    stopped = stop_bar < horizon
+    first = hit_bar < stop_bar
+    results = []
+    for k, price in enumerate(targets):
+        hits = first[:, k]
+        results.append({
+            "price": float(price),
+            "hit_probability": float(hits.mean()),
+            "stop_first_probability": float((stopped[:, 0] & ~hits).mean()),
+            "expected_bars": float(hit_bar[hits, k].mean() + 1) if hits.any() else None,
+        })
+
+    return {
+        "method": method,
+        "paths": paths,
+        "horizon": horizon,
+        "stop_probability": float(stopped.mean()),
+        "targets": results,
+    }
@@ -0,0 +1,82 @@
+"""
+Struct of contiguous OHLCV arrays used by the analysis layers
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+
+class OHLCV:
+    """
+    Bars as separate contiguous float64 arrays plus int64 timestamps
+
+    Layers read prices straight from the arrays; a DataFrame is only built
+    (once, lazily) by `frame()` for libraries that need pandas input such
+    as ta and pandas_ta.
+    """
+
+    __slots__ = ("timestamps", "open", "high", "low", "close", "volume", "_frame")
+
+    def __init__(self, open: np.ndarray, high: np.ndarray, low: np.ndarray,
+                 close: np.ndarray, volume: Optional[np.ndarray] = None,
+                 timestamps: Optional[np.ndarray] = None):
+        """
+        Args:
+            open, high, low, close: Prices, oldest bar first
+            volume: Volumes, or None when the source has none
+            timestamps: Bar open times as int64 nanoseconds since the epoch,
+                or None for an untimed series
+        """
+        self.open = np.ascontiguousarray(open, dtype=np.float64)
+        self.high = np.ascontiguousarray(high, dtype=np.float64)
+        self.low = np.ascontiguousarray(low, dtype=np.float64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.volume = None if volume is None else np.ascontiguousarray(volume, dtype=np.float64)
+        self.timestamps = None if timestamps is None else np.ascontiguousarray(timestamps, dtype=np.int64)
+        self._frame: Optional[pd.DataFrame] = None
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame) -> "OHLCV":
+        """Arrays of an OHLCV DataFrame, which is kept as the cached frame"""
+        bars = cls(
+            data['Open'].to_numpy(),
+            data['High'].to_numpy(),
+            data['Low'].to_numpy(),
+            data['Close'].to_numpy(),
+            data['Volume'].to_numpy() if 'Volume' in data.columns else None,
+            data.index.as_unit('ns').asi8 if isinstance(data.index, pd.DatetimeIndex) else None
+        )
+        bars._frame = data
+        return bars
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    @property
+    def interval_seconds(self) -> int:
+        """
+        Median spacing of the last 64 bars, 0 when untimed or too short
+
+        Session and weekend gaps (stocks, forex) are rare among the recent
+        bars, so the median stays at the bar interval from one candle to
+        the next, where the last gap alone would not.
+        """
+        if self.timestamps is None or len(self.timestamps) < 2:
+            return 0
+        return int(np.median(np.diff(self.timestamps[-65:])) // 1_000_000_000)
+
+    @property
+    def last_key(self) -> int:
+        """Identifier of the latest bar: its timestamp, else its position"""
+        return int(self.timestamps[-1]) if self.timestamps is not None else len(self.close) - 1
+
+    def frame(self) -> pd.DataFrame:
+        """The bars as a DataFrame, built on first use"""
+        if self._frame is None:
+            columns = {"Open": self.open, "High": self.high, "Low": self.low, "Close": self.close}
+            if self.volume is not None:
+                columns["Volume"] = self.volume
+            index = pd.DatetimeIndex(self.timestamps) if self.timestamps is not None else None
+            self._frame = pd.DataFrame(columns, index=index, copy=False)
+        return self._frame
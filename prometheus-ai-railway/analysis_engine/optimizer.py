@@ -0,0 +1,345 @@
+"""
+Parallel walk-forward optimizer for the final-signal parameters
+
+Per-symbol price arrays, ATR, RSI, the risk layer's stop and target levels
+and the backtester's feature matrix are computed once and packed into a
+single shared-memory block. Pool workers attach read-only views, so a
+candidate parameter set costs only the RSI columns, one matrix-vector
+product and the trade simulation per symbol.
+Every candidate is scored on every walk-forward block in one pass; the
+fold bookkeeping then happens in the parent without re-simulating.
+"""
+
+import asyncio
+import logging
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Dict, List, Sequence, Tuple
+
+from analysis_engine.backtester import (
+    signal_features, signal_regimes, set_rsi_levels, confidence_scores, decisions, simulate_trades,
+    risk_levels
+)
+from analysis_engine.signal_params import DEFAULT_SIGNAL_PARAMS, save_signal_params
+from analysis_engine.swing_detector import average_true_range
+
+logger = logging.getLogger(__name__)
+
+# Search ranges around the defaults
+WEIGHT_SCALE = (0.5, 1.5)
+THRESHOLD_SHIFT = 15
+RSI_OVERBOUGHT_RANGE = (65, 80)
+RSI_OVERSOLD_RANGE = (20, 35)
+
+# Rules the backtester cannot replay keep their default weights
+TUNED_WEIGHTS = [
+    "active_patterns", "rsi_oversold", "rsi_overbought", "macd_bullish",
+    "golden_cross", "death_cross", "fibonacci_level", "uptrend", "downtrend",
+    "extreme_fear", "extreme_greed", "rr_excellent", "rr_good",
+]
+
+
+class SharedPriceArrays:
+    """
+    Named float64 arrays of many symbols packed into one shared-memory block
+
+    The layout maps symbol -> array name -> (offset, shape) and is small
+    enough to pickle into every worker; the data itself is never copied.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, layout: Dict, owner: bool):
+        self.shm = shm
+        self.layout = layout
+        self.owner = owner
+        self.arrays: Dict[str, Dict[str, np.ndarray]] = {}
+        for symbol, entries in layout.items():
+            self.arrays[symbol] = {}
+            for name, (offset, shape) in entries.items():
+                view = np.ndarray(shape, dtype=np.float64, buffer=shm.buf, offset=offset)
+                if not owner:
+                    view.flags.writeable = False
+                self.arrays[symbol][name] = view
+
+    @classmethod
+    def create(cls, arrays: Dict[str, Dict[str, np.ndarray]]) -> "SharedPriceArrays":
+        layout = {}
+        offset = 0
+        for symbol, entries in arrays.items():
+            layout[symbol] = {}
+            for name, values in entries.items():
+                layout[symbol][name] = (offset, tuple(values.shape))
+                offset += values.size * 8
+
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 8))
+        shared = cls(shm, layout, owner=True)
+        for symbol, entries in arrays.items():
+            for name, values in entries.items():
+                shared.arrays[symbol][name][...] = values
+        return shared
+
+    @classmethod
+    def attach(cls, name: str, layout: Dict) -> "SharedPriceArrays":
+        return cls(shared_memory.SharedMemory(name=name), layout, owner=False)
+
+    def close(self) -> None:
+        self.arrays = {}
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def prepare_arrays(data: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Everything a candidate evaluation needs for one symbol"""
+    features, rsi = signal_features(data)
+    high = data['High'].to_numpy(dtype=float)
+    low = data['Low'].to_numpy(dtype=float)
+    close = data['Close'].to_numpy(dtype=float)
+    stop, target = risk_levels(data)
+    return {
+        "open": data['Open'].to_numpy(dtype=float),
+        "high": high,
+        "low": low,
+        "close": close,
+        "atr": average_true_range(high, low, close),
+        "stop": stop,
+        "target": target,
+        "rsi": rsi,
+        "regime": signal_regimes(data).astype(float),
+        "features": np.ascontiguousarray(features),
+    }
+
+
+def walk_forward_blocks(n: int, warmup: int, blocks: int) -> List[Tuple[int, int]]:
+    """Split the bars after warm-up into consecutive equal blocks"""
+    edges = np.linspace(warmup, n, blocks + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:])]
+
+
+def sample_candidates(count: int, seed: int = 42,
+                      base: Dict = None) -> List[Dict]:
+    """Seeded random parameter sets around `base`; the first is `base` itself"""
+    base = base or DEFAULT_SIGNAL_PARAMS
+    rng = np.random.default_rng(seed)
+    candidates = [base]
+    order = ("STRONG_BUY", "BUY", "HOLD", "SELL")
+    for _ in range(count - 1):
+        weights = dict(base["weights"])
+        scale = rng.uniform(*WEIGHT_SCALE, size=len(TUNED_WEIGHTS))
+        for name, factor in zip(TUNED_WEIGHTS, scale):
+            weights[name] = int(round(base["weights"][name] * factor))
+
+        shifted = [base["thresholds"][label] + int(rng.integers(-THRESHOLD_SHIFT, THRESHOLD_SHIFT + 1))
+                   for label in order]
+        # Keep the decision bands ordered and at least 5 points wide
+        for i in range(1, len(shifted)):
+            shifted[i] = min(shifted[i], shifted[i - 1] - 5)
+
+        candidates.append({
+            "weights": weights,
+            "thresholds": dict(zip(order, shifted)),
+            "rsi_overbought": int(rng.integers(RSI_OVERBOUGHT_RANGE[0], RSI_OVERBOUGHT_RANGE[1] + 1)),
+            "rsi_oversold": int(rng.integers(RSI_OVERSOLD_RANGE[0], RSI_OVERSOLD_RANGE[1] + 1)),
+        })
+    return candidates
+
+
+# Worker state, set once per process by _init_worker
+_shared: SharedPriceArrays = None
+_settings: Dict = {}
+
+
+def _init_worker(shm_name: str, layout: Dict, settings: Dict) -> None:
+    global _shared, _settings
+    _shared = SharedPriceArrays.attach(shm_name, layout)
+    _settings = settings
+
+
+def evaluate_candidate(params: Dict, arrays: Dict[str, Dict[str, np.ndarray]] = None,
+                       settings: Dict = None) -> np.ndarray:
+    """
+    Score one parameter set on every walk-forward block
+
+    Trades are simulated separately inside each block, so a trade that
+    would close after the block ends is dropped rather than leaking
+    into the next one.
+
+    Returns:
+        (blocks x 2) array of total R-multiple and trade count
+    """
+    arrays = arrays if arrays is not None else _shared.arrays
+    settings = settings or _settings
+    blocks = settings["blocks"]
+    result = np.zeros((blocks, 2))
+
+    for symbol, a in arrays.items():
+        features = set_rsi_levels(a["features"], a["rsi"],
+                                  params["rsi_overbought"], params["rsi_oversold"])
+        labels = decisions(confidence_scores(features, params["weights"], a["regime"]), params["thresholds"])
+        entries = np.isin(labels, settings["entry_decisions"])
+
+        for k, (start, end) in enumerate(walk_forward_blocks(len(labels), settings["warmup"], blocks)):
+            if end - start < 2:
+                continue
+            part = slice(start, end)
+            trades = simulate_trades(
+                a["open"][part], a["high"][part], a["low"][part], a["close"][part],
+                a["atr"][part], entries[part], stop_atr=settings["stop_atr"],
+                reward_risk=settings["reward_risk"], max_bars=settings["max_bars"],
+                stops=a["stop"][part], targets=a["target"][part]
+            )
+            if len(trades["entry"]):
+                r_multiple = (trades["exit"] - trades["entry"]) / (trades["entry"] - trades["stop"])
+                result[k, 0] += r_multiple.sum()
+                result[k, 1] += len(r_multiple)
+    return result
+
+
+class WalkForwardOptimizer:
+    """
+    Rolling walk-forward search over final-signal weights and thresholds
+
+    History is split into `folds + 1` consecutive blocks. Fold k picks the
+    candidate with the highest total R on block k (subject to a minimum
+    trade count) and reports how it did on block k + 1, which it never saw.
+    The parameter set that goes live is the best one on the final block.
+    """
+
+    def __init__(self, candidates: int = 200, folds: int = 4, workers: int = None,
+                 seed: int = 42, entry_decisions: Sequence[str] = ("STRONG_BUY",),
+                 min_trades: int = 10, stop_atr: float = 2.0, reward_risk: float = 2.0,
+                 max_bars: int = 168, warmup: int = 200):
+        self.candidates = candidates
+        self.folds = folds
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+        self.min_trades = min_trades
+        self.warmup = warmup
+        self.settings = {
+            "blocks": folds + 1,
+            "entry_decisions": list(entry_decisions),
+            "stop_atr": stop_atr,
+            "reward_risk": reward_risk,
+            "max_bars": max_bars,
+            "warmup": warmup,
+        }
+
+    def run(self, datasets: Dict[str, pd.DataFrame]) -> Dict:
+        """Search, walk forward and return the chosen parameters with fold stats"""
+        usable = {s: d for s, d in datasets.items()
+                  if len(d) > self.warmup + 2 * (self.folds + 1)}
+        if not usable:
+            return {"error": "Insufficient data"}
+
+        candidates = sample_candidates(self.candidates, self.seed)
+        scores = self._evaluate_all(usable, candidates)   # candidates x blocks x 2
+
+        objective = np.where(scores[:, :, 1] >= self.min_trades, scores[:, :, 0], -np.inf)
+        walk_forward = []
+        for k in range(self.folds):
+            best = int(np.argmax(objective[:, k]))
+            if not np.isfinite(objective[best, k]):
+                best = 0
+            walk_forward.append({
+                "fold": k + 1,
+                "candidate": best,
+                "train_r": float(scores[best, k, 0]),
+                "train_trades": int(scores[best, k, 1]),
+                "test_r": float(scores[best, k + 1, 0]),
+                "test_trades": int(scores[best, k + 1, 1]),
+                "default_test_r": float(scores[0, k + 1, 0]),
+            })
+
+        chosen = int(np.argmax(objective[:, -1]))
+        if not np.isfinite(objective[chosen, -1]):
+            chosen = 0
+
+        test_r = sum(f["test_r"] for f in walk_forward)
+        test_trades = sum(f["test_trades"] for f in walk_forward)
+        return {
+            "params": candidates[chosen],
+            "candidate": chosen,
+            "symbols": list(usable),
+            "walk_forward": walk_forward,
+            "out_of_sample": {
+                "total_r": test_r,
+                "trades": test_trades,
+                "expectancy_r": test_r / test_trades if test_trades else 0.0,
+                "default_total_r": sum(f["default_test_r"] for f in walk_forward),
+            },
+        }
+
+    def _evaluate_all(self, datasets: Dict[str, pd.DataFrame],
+                      candidates: List[Dict]) -> np.ndarray:
+        shared = SharedPriceArrays.create({s: prepare_arrays(d) for s, d in datasets.items()})
+        try:
+            if self.workers <= 1:
+                results = [evaluate_candidate(c, shared.arrays, self.settings) for c in candidates]
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(shared.shm.name, shared.layout, self.settings),
+                ) as pool:
+                    chunksize = max(1, len(candidates) // (self.workers * 4))
+                    results = list(pool.map(evaluate_candidate, candidates, chunksize=chunksize))
+        finally:
+            shared.close()
+        return np.stack(results)
+
+
+async def _fetch_all(symbols: List[str], period: str, interval: str) -> Dict[str, pd.DataFrame]:
+    from analysis_engine.data_fetchers.universal_client import UniversalDataClient
+
+    client = UniversalDataClient()
+    datasets = {}
+    for symbol in symbols:
+        data = await client.fetch_data(symbol, period=period, interval=interval)
+        if data is None or data.empty:
+            logger.warning(f"No data for {symbol}, skipping")
+            continue
+        datasets[symbol] = data
+    return datasets
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Walk-forward optimize the final signal")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--period", default="2y")
+    parser.add_argument("--interval", default="1h")
+    parser.add_argument("--candidates", type=int, default=200)
+    parser.add_argument("--folds", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--min-trades", type=int, default=10)
+    parser.add_argument("--output", default="signal_params.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    datasets = asyncio.run(_fetch_all(args.symbols, args.period, args.interval))
+    optimizer = WalkForwardOptimizer(
+        candidates=args.candidates, folds=args.folds, workers=args.workers,
+        seed=args.seed, min_trades=args.min_trades
+    )
+    result = optimizer.run(datasets)
+    if "error" in result:
+        raise SystemExit(result["error"])
+
+    save_signal_params(result["params"], args.output, metadata={
+        "created_at": datetime.now().isoformat(),
+        "period": args.period,
+        "interval": args.interval,
+        "candidates": args.candidates,
+        "seed": args.seed,
+        "symbols": result["symbols"],
+        "walk_forward": result["walk_forward"],
+        "out_of_sample": result["out_of_sample"],
+    })
+    print(json.dumps({k: v for k, v in result.items() if k != "params"}, indent=2))
+    print(f"Saved parameters to {args.output}")
@@ -0,0 +1,191 @@
+"""
+Portfolio-level position sizing: risk parity and volatility targeting
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+
+from analysis_engine.ohlcv import OHLCV
+from analysis_engine.swing_detector import average_true_range
+
+METHODS = ("risk_parity", "volatility_target")
+
+
+def return_matrix(frames: Dict[str, pd.DataFrame]) -> Tuple[List[str], np.ndarray]:
+    """
+    Log returns of every symbol aligned on bar timestamps (bars x symbols)
+
+    Returns are taken per symbol before aligning, so a bar a market did not
+    trade (stocks/forex off-hours) is NaN for that symbol only instead of
+    turning the next return into a multi-bar one. Timestamps are aligned
+    as naive UTC, since ccxt frames are naive UTC and yfinance frames are
+    tz-aware.
+    """
+    returns = pd.concat(
+        {symbol: _utc_naive(np.log(frame['Close'].astype(float)).diff()) for symbol, frame in frames.items()},
+        axis=1
+    ).sort_index()
+    return list(returns.columns), returns.to_numpy()[1:]
+
+
+def _utc_naive(series: pd.Series) -> pd.Series:
+    index = series.index
+    if isinstance(index, pd.DatetimeIndex) and index.tz is not None:
+        series = series.set_axis(index.tz_convert("UTC").tz_localize(None))
+    return series
+
+
+def pairwise_covariance(returns: np.ndarray, min_periods: int = 30,
+                        shrinkage: float = 0.1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Covariance over pairwise-complete observations, shrunk towards its diagonal
+
+    All pairs come from three matrix products over the observation mask
+    (as in CorrelationMatrix). Pairs with fewer than `min_periods` shared
+    bars are treated as uncorrelated, and negative eigenvalues left by the
+    pairwise estimate are clipped so the result is positive semi-definite.
+
+    Returns:
+        (covariance, pairwise observation counts)
+    """
+    mask = np.isfinite(returns).astype(float)
+    x = np.where(mask > 0, returns, 0.0)
+    count = mask.T @ mask
+    sums = x.T @ mask                               # sums[i, j]: x_i over rows shared with j
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = (x.T @ x - sums * sums.T / count) / (count - 1)
+    cov[count < min_periods] = 0.0
+    cov = np.nan_to_num(cov)
+
+    diagonal = np.diag(np.diag(cov))
+    cov = (1 - shrinkage) * cov + shrinkage * diagonal
+    eigenvalues, eigenvectors = np.linalg.eigh(cov)
+    if eigenvalues.min() < 0:
+        cov = (eigenvectors * np.maximum(eigenvalues, 0)) @ eigenvectors.T
+    return cov, count
+
+
+def risk_parity_weights(cov: np.ndarray, tol: float = 1e-10, max_iter: int = 50) -> np.ndarray:
+    """
+    Fully invested weights with equal risk contributions
+
+    Newton's method on the convex form min 0.5 x'Cx - sum(log x) / n, whose
+    optimum has x_i (Cx)_i = 1/n; weights are x rescaled to sum to one.
+    Converges in a handful of iterations of one n x n solve each.
+    """
+    n = len(cov)
+    budget = np.full(n, 1.0 / n)
+    x = 1 / np.sqrt(np.diag(cov))
+    x /= np.sqrt(x @ cov @ x)
+    for _ in range(max_iter):
+        gradient = cov @ x - budget / x
+        if np.abs(gradient).max() < tol:
+            break
+        step = np.linalg.solve(cov + np.diag(budget / x ** 2), gradient)
+        t = 1.0
+        while np.any(x - t * step <= 0):
+            t *= 0.5
+        x = x - t * step
+    return x / x.sum()
+
+
+def volatility_target_weights(cov: np.ndarray, target_volatility: float,
+                              periods_per_year: float, max_gross: float = 1.0) -> np.ndarray:
+    """
+    Inverse-volatility weights scaled to an annualized portfolio volatility
+
+    Gross exposure never exceeds `max_gross`; whatever is not allocated
+    stays in cash.
+    """
+    inverse = 1 / np.sqrt(np.diag(cov))
+    weights = inverse / inverse.sum()
+    volatility = np.sqrt(weights @ cov @ weights * periods_per_year)
+    return weights * min(target_volatility / volatility, max_gross)
+
+
+def size_portfolio(frames: Dict[str, pd.DataFrame], method: str = "risk_parity",
+                   account_size: float = 10000, max_risk_per_trade: float = 0.02,
+                   target_volatility: float = 0.20, stop_atr: float = 2.0,
+                   min_periods: int = 30, shrinkage: float = 0.1) -> Dict:
+    """
+    Allocate an account across several assets
+
+    Each position is additionally capped so that hitting its ATR stop
+    (`stop_atr` x ATR, as the risk layer's atr_2x stop) loses at most
+    `max_risk_per_trade` of the account; the capped remainder stays in cash.
+
+    Args:
+        frames: OHLCV per symbol
+        method: "risk_parity" or "volatility_target"
+        target_volatility: Annualized volatility for "volatility_target"
+
+    Returns:
+        Allocation summary with one entry per position
+    """
+    if method not in METHODS:
+        return {"error": f"Unknown method: {method}"}
+
+    usable = {s: f for s, f in frames.items() if f is not None and len(f) > min_periods}
+    skipped = [s for s in frames if s not in usable]
+    if not usable:
+        return {"error": "Insufficient data", "skipped": skipped}
+
+    symbols, returns = return_matrix(usable)
+    cov, count = pairwise_covariance(returns, min_periods, shrinkage)
+    keep = np.diag(cov) > 0
+    skipped += [s for s, ok in zip(symbols, keep) if not ok]
+    symbols = [s for s, ok in zip(symbols, keep) if ok]
+    if not symbols:
+        return {"error": "Insufficient data", "skipped": skipped}
+    cov, count = cov[np.ix_(keep, keep)], count[np.ix_(keep, keep)]
+
+    # Median bar spacing: the last gap may be a session close or a weekend
+    intervals = [OHLCV.from_frame(usable[s]).interval_seconds for s in symbols]
+    interval = float(np.median([i for i in intervals if i > 0] or [3600]))
+    periods_per_year = 365 * 86400 / interval
+
+    if method == "risk_parity":
+        weights = risk_parity_weights(cov)
+    else:
+        weights = volatility_target_weights(cov, target_volatility, periods_per_year)
+
+    prices = np.array([float(usable[s]['Close'].iloc[-1]) for s in symbols])
+    stop_fraction = np.array([
+        stop_atr * average_true_range(usable[s]['High'].to_numpy(), usable[s]['Low'].to_numpy(),
+                                      usable[s]['Close'].to_numpy())[-1]
+        for s in symbols
+    ]) / prices
+    cap = max_risk_per_trade / stop_fraction
+    capped = weights > cap
+    weights = np.minimum(weights, cap)
+
+    portfolio_variance = weights @ cov @ weights
+    contributions = weights * (cov @ weights) / portfolio_variance if portfolio_variance > 0 else weights * 0
+
+    positions = [
+        {
+            "symbol": symbol,
+            "weight_percent": float(weights[i] * 100),
+            "position_value": float(weights[i] * account_size),
+            "units": float(weights[i] * account_size / prices[i]),
+            "risk_contribution_percent": float(contributions[i] * 100),
+            "stop_percent": float(stop_fraction[i] * 100),
+            "risk_percent": float(weights[i] * stop_fraction[i] * 100),
+            "capped": bool(capped[i]),
+        }
+        for i, symbol in enumerate(symbols)
+    ]
+    positions.sort(key=lambda p: -p["weight_percent"])
+
+    return {
+        "method": method,
+        "account_size": account_size,
+        "max_risk_per_trade_percent": max_risk_per_trade * 100,
+        "portfolio_volatility": float(np.sqrt(portfolio_variance * periods_per_year) * 100),
+        "invested_percent": float(weights.sum() * 100),
+        "cash_percent": float(max(1 - weights.sum(), 0) * 100),
+        "observations": int(count.min()),
+        "positions": positions,
+        "skipped": skipped,
+    }
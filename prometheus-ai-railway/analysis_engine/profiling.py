@@ -0,0 +1,124 @@
+"""
+Wall and CPU time per analysis layer and indicator
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+import numpy as np
+
+_DISABLED = nullcontext()
+
+
+class _Section:
+    __slots__ = ("timer", "name", "wall", "cpu")
+
+    def __init__(self, timer: "LayerTimer", name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        stack = self.timer._stack
+        self.name = f"{stack[-1]}/{self.name}" if stack else self.name
+        stack.append(self.name)
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = (time.perf_counter() - self.wall) * 1000
+        cpu = (time.thread_time() - self.cpu) * 1000
+        self.timer._stack.pop()
+        entry = self.timer._current.setdefault(self.name, [0.0, 0.0, 0])
+        entry[0] += wall
+        entry[1] += cpu
+        entry[2] += 1
+        return False
+
+
+class LayerTimer:
+    """
+    Named, nestable timing sections for ComprehensiveAnalyzer
+
+    Nested sections are recorded as "layer/indicator". Each analyze() call
+    collects its own section totals (returned by `end`), and a bounded
+    history of recent totals per section backs the aggregated `stats`.
+    The open sections and running totals are kept per thread, so analyses
+    running concurrently on an executor do not mix their timings.
+    When disabled, `section` hands out a shared no-op context manager and
+    `call` is a plain function call.
+    """
+
+    def __init__(self, enabled: bool = False, history: int = 512):
+        self.enabled = enabled
+        self.history = history
+        self.analyses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[Tuple[float, float]]] = {}
+
+    @property
+    def _stack(self) -> List[str]:
+        return self._local.stack
+
+    @property
+    def _current(self) -> Dict[str, List[float]]:
+        return self._local.current
+
+    def begin(self) -> None:
+        """Start collecting sections for one analysis on this thread"""
+        self._local.stack = []
+        self._local.current = {}
+
+    def section(self, name: str):
+        return _Section(self, name) if self.enabled else _DISABLED
+
+    def call(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        """func(*args, **kwargs), timed as a section"""
+        if not self.enabled:
+            return func(*args, **kwargs)
+        with _Section(self, name):
+            return func(*args, **kwargs)
+
+    def end(self) -> Dict[str, Dict[str, float]]:
+        """Close the analysis: its per-section timings ({} when disabled)"""
+        if not self.enabled:
+            return {}
+        current, self._local.current = self._current, {}
+        timings = {}
+        with self._lock:
+            self.analyses += 1
+            for name, (wall, cpu, calls) in current.items():
+                samples = self._samples.get(name)
+                if samples is None:
+                    samples = self._samples[name] = deque(maxlen=self.history)
+                samples.append((wall, cpu))
+                timings[name] = {"wall_ms": round(wall, 3), "cpu_ms": round(cpu, 3), "calls": calls}
+        return timings
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-section wall/CPU statistics over the recent analyses, slowest first"""
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+        stats = {}
+        for name, samples in snapshot.items():
+            values = np.array(samples)
+            wall, cpu = values[:, 0], values[:, 1]
+            p50, p95 = np.percentile(wall, [50, 95])
+            stats[name] = {
+                "samples": len(values),
+                "wall_mean_ms": round(float(wall.mean()), 3),
+                "wall_p50_ms": round(float(p50), 3),
+                "wall_p95_ms": round(float(p95), 3),
+                "wall_max_ms": round(float(wall.max()), 3),
+                "cpu_mean_ms": round(float(cpu.mean()), 3),
+            }
+        return dict(sorted(stats.items(), key=lambda item: -item[1]["wall_mean_ms"]))
+
+    def reset(self) -> None:
+        with self._lock:
+            self.analyses = 0
+            self._samples.clear()
@@ -0,0 +1,228 @@
+"""
+Per-bar market regime and Wyckoff phase classification from rolling statistics
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Sequence
+
+REGIMES = ("normal", "trending", "ranging", "high_volatility")
+PHASES = ("unknown", "accumulation", "markup", "distribution", "markdown")
+
+# Multipliers applied to final-signal weights per regime. Trend-following
+# rules gain weight in trends; mean-reversion rules gain weight in ranges;
+# everything is damped when volatility is extreme.
+TREND_RULES = ("macd_bullish", "golden_cross", "death_cross", "strong_trend", "uptrend", "downtrend")
+REVERSION_RULES = ("rsi_oversold", "rsi_overbought", "fibonacci_level", "extreme_fear", "extreme_greed")
+REGIME_WEIGHT_SCALES: Dict[str, Dict[str, float]] = {
+    "normal": {},
+    "trending": {**{r: 1.25 for r in TREND_RULES}, **{r: 0.75 for r in REVERSION_RULES}},
+    "ranging": {**{r: 0.75 for r in TREND_RULES}, **{r: 1.25 for r in REVERSION_RULES}},
+    "high_volatility": {r: 0.75 for r in TREND_RULES + REVERSION_RULES},
+}
+
+
+def _window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing sum over `window` bars (NaN until the window is full or when it holds a NaN)"""
+    n = len(values)
+    out = np.full(n, np.nan)
+    if n < window:
+        return out
+    csum = np.concatenate(([0.0], np.cumsum(np.nan_to_num(values))))
+    bad = np.concatenate(([0], np.cumsum(np.isnan(values))))
+    sums = csum[window:] - csum[:-window]
+    sums[(bad[window:] - bad[:-window]) > 0] = np.nan
+    out[window - 1:] = sums
+    return out
+
+
+def _window_var(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing sample variance from cumulative sums"""
+    s1 = _window_sum(values, window)
+    s2 = _window_sum(values * values, window)
+    return np.maximum((s2 - s1 * s1 / window) / (window - 1), 0.0)
+
+
+def _lagged(values: np.ndarray, lag: int) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    out[lag:] = values[:-lag]
+    return out
+
+
+def regime_features(close: np.ndarray, window: int = 64, vol_window: int = 20,
+                    vol_lookback: int = 250, lags: Sequence[int] = (1, 2, 4, 8, 16)) -> Dict[str, np.ndarray]:
+    """
+    Rolling regime statistics for every bar (NaN during warm-up)
+
+    - hurst: half the slope of log Var(lag-k returns) against log k over
+      the trailing `window` bars (0.5 random walk, >0.5 persistent)
+    - variance_ratio: Var(q-bar returns) / (q * Var(1-bar returns)), q = 4
+    - efficiency: |net move| / path length over `window` bars
+    - vol_percentile: rank of the current `vol_window` realized volatility
+      among the trailing `vol_lookback` values (expanding at the start)
+    - direction: sign of the net move over `window` bars
+
+    Each window statistic is a difference of cumulative sums; the lag
+    dimension is broadcast, so the cost is O(n * len(lags)).
+    """
+    log_price = np.log(np.asarray(close, dtype=float))
+    n = len(log_price)
+
+    lag_var = np.column_stack([_window_var(log_price - _lagged(log_price, k), window) for k in lags])
+    x = np.log(np.asarray(lags, dtype=float))
+    x_centred = x - x.mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = np.log(lag_var)
+        hurst = 0.5 * ((y - y.mean(axis=1, keepdims=True)) @ x_centred) / (x_centred @ x_centred)
+        variance_ratio = lag_var[:, list(lags).index(4)] / (4 * lag_var[:, 0]) if 4 in lags else \
+            np.full(n, np.nan)
+
+        step = np.abs(np.diff(log_price, prepend=np.nan))
+        net = log_price - _lagged(log_price, window)
+        efficiency = np.abs(net) / _window_sum(step, window)
+
+    vol = np.sqrt(_window_var(np.diff(log_price, prepend=np.nan), vol_window))
+    padded = np.concatenate((np.full(vol_lookback - 1, np.nan), vol))
+    history = sliding_window_view(padded, vol_lookback)
+    with np.errstate(invalid='ignore'):
+        valid = (~np.isnan(history)).sum(axis=1)
+        vol_percentile = (history <= vol[:, None]).sum(axis=1) / np.maximum(valid, 1) * 100
+    vol_percentile[np.isnan(vol)] = np.nan
+
+    return {
+        "hurst": hurst,
+        "variance_ratio": variance_ratio,
+        "efficiency": efficiency,
+        "volatility": vol,
+        "vol_percentile": vol_percentile,
+        "direction": np.sign(net),
+    }
+
+
+def classify_regimes(features: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Regime code (index into REGIMES) per bar
+
+    Trending needs two votes from: efficiency >= 0.3 (a second vote at
+    >= 0.5, so a steady drift counts on its own), Hurst >= 0.55, variance
+    ratio >= 1.1; ranging mirrors them (efficiency <= 0.15 and <= 0.08,
+    Hurst <= 0.45, variance ratio <= 0.9). Realized volatility in its top
+    decile overrides both.
+    """
+    efficiency = features["efficiency"]
+    with np.errstate(invalid='ignore'):
+        trend_votes = ((efficiency >= 0.3).astype(int) + (efficiency >= 0.5)
+                       + (features["hurst"] >= 0.55) + (features["variance_ratio"] >= 1.1))
+        range_votes = ((efficiency <= 0.15).astype(int) + (efficiency <= 0.08)
+                       + (features["hurst"] <= 0.45) + (features["variance_ratio"] <= 0.9))
+        high_vol = features["vol_percentile"] >= 90
+
+    return np.select(
+        [high_vol, trend_votes >= 2, range_votes >= 2],
+        [REGIMES.index("high_volatility"), REGIMES.index("trending"), REGIMES.index("ranging")],
+        default=REGIMES.index("normal")
+    ).astype(np.int8)
+
+
+def wyckoff_phases(close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                   regimes: np.ndarray, features: Dict[str, np.ndarray],
+                   window: int = 64) -> Dict[str, np.ndarray]:
+    """
+    Wyckoff-style phase per bar plus spring/upthrust events
+
+    Trending bars are markup or markdown by direction. Other bars are
+    accumulation after a decline or distribution after an advance, judged
+    by the move over the two windows before the current one relative to
+    realized volatility. A spring undercuts the prior window's low and
+    closes back above it; an upthrust is the mirror at the high.
+    """
+    close = np.asarray(close, dtype=float)
+    log_price = np.log(close)
+    prior = _lagged(log_price, window) - _lagged(log_price, 3 * window)
+    scale = features["volatility"] * np.sqrt(2 * window)
+
+    trending = regimes == REGIMES.index("trending")
+    direction = features["direction"]
+    with np.errstate(invalid='ignore'):
+        phase = np.select(
+            [trending & (direction > 0), trending & (direction < 0),
+             ~trending & (prior < -scale), ~trending & (prior > scale)],
+            [PHASES.index("markup"), PHASES.index("markdown"),
+             PHASES.index("accumulation"), PHASES.index("distribution")],
+            default=PHASES.index("unknown")
+        ).astype(np.int8)
+
+    range_low = _lagged(_rolling_extreme(np.asarray(low, dtype=float), window, np.min), 1)
+    range_high = _lagged(_rolling_extreme(np.asarray(high, dtype=float), window, np.max), 1)
+    with np.errstate(invalid='ignore'):
+        spring = (low < range_low) & (close > range_low)
+        upthrust = (high > range_high) & (close < range_high)
+
+    return {"phase": phase, "spring": spring, "upthrust": upthrust,
+            "range_low": range_low, "range_high": range_high}
+
+
+def _rolling_extreme(values: np.ndarray, window: int, func) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = func(sliding_window_view(values, window), axis=1)
+    return out
+
+
+def _run_length(codes: np.ndarray) -> int:
+    """Bars since the last code change"""
+    changes = np.flatnonzero(codes[1:] != codes[:-1])
+    return int(len(codes) - 1 - changes[-1]) if len(changes) else len(codes)
+
+
+def regime_report(close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                  window: int = 64) -> Dict:
+    """Latest regime, Wyckoff phase and the statistics behind them"""
+    features = regime_features(close, window=window)
+    regimes = classify_regimes(features)
+    wyckoff = wyckoff_phases(close, high, low, regimes, features, window=window)
+
+    phase = wyckoff["phase"]
+    in_phase = _run_length(phase)
+    recent = slice(len(phase) - in_phase, None)
+    springs = np.flatnonzero(wyckoff["spring"][recent])
+    upthrusts = np.flatnonzero(wyckoff["upthrust"][recent])
+
+    def last(name):
+        value = features[name][-1]
+        return None if np.isnan(value) else round(float(value), 3)
+
+    return {
+        "regime": REGIMES[regimes[-1]],
+        "bars_in_regime": _run_length(regimes),
+        "phase": PHASES[phase[-1]],
+        "bars_in_phase": in_phase,
+        "metrics": {
+            "hurst": last("hurst"),
+            "variance_ratio": last("variance_ratio"),
+            "efficiency": last("efficiency"),
+            "vol_percentile": last("vol_percentile"),
+        },
+        "wyckoff": {
+            "phase": PHASES[phase[-1]],
+            "range_high": None if np.isnan(wyckoff["range_high"][-1]) else float(wyckoff["range_high"][-1]),
+            "range_low": None if np.isnan(wyckoff["range_low"][-1]) else float(wyckoff["range_low"][-1]),
+            "springs": int(len(springs)),
+            "upthrusts": int(len(upthrusts)),
+            "last_event": _last_event(springs, upthrusts, in_phase),
+        },
+    }
+
+
+def _last_event(springs: np.ndarray, upthrusts: np.ndarray, span: int):
+    events = [(int(s), "spring") for s in springs[-1:]] + [(int(u), "upthrust") for u in upthrusts[-1:]]
+    if not events:
+        return None
+    bar, name = max(events)
+    return {"type": name, "bars_ago": span - 1 - bar}
+
+
+def scale_weights(weights: Dict[str, float], regime: str) -> Dict[str, float]:
+    """Final-signal weights adjusted for a regime, rounded to whole points"""
+    scales = REGIME_WEIGHT_SCALES.get(regime, {})
+    return {name: int(round(w * scales.get(name, 1.0))) for name, w in weights.items()}
@@ -0,0 +1,319 @@
+"""
+Typed analysis result with compact binary (msgpack) and JSON serialization
+"""
+
+import json
+import msgpack
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Leading element of every serialized row; bump it whenever a row layout
+# changes so results written by older code are not misread
+SCHEMA_VERSION = 2
+
+# Layer sections produced by ComprehensiveAnalyzer, kept verbatim as details
+LAYERS = (
+    "price_action",
+    "technical_indicators",
+    "fibonacci",
+    "market_structure",
+    "fundamental_analysis",
+    "sentiment_analysis",
+    "risk_management",
+)
+
+
+def _encode(value: Any) -> Any:
+    """msgpack/json fallback for NumPy scalars and arrays left in layer details"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class SchemaMismatch(ValueError):
+    """A serialized result was written with a different row layout"""
+
+
+@dataclass(slots=True)
+class Target:
+    type: str
+    price: float
+    distance_percent: float
+    # Monte Carlo estimates; None when the target was not simulated
+    hit_probability: Optional[float] = None
+    expected_bars: Optional[float] = None
+
+    def to_row(self) -> list:
+        return [self.type, self.price, self.distance_percent,
+                self.hit_probability, self.expected_bars]
+
+    @classmethod
+    def from_row(cls, row: Optional[list]) -> Optional["Target"]:
+        return cls(*row) if row else None
+
+
+@dataclass(slots=True)
+class TechnicalSummary:
+    rsi: float = 0.0
+    rsi_signal: str = "neutral"
+    macd_signal: str = "neutral"
+    golden_cross: bool = False
+    death_cross: bool = False
+    trend_strength: str = "weak"
+    active_patterns: int = 0
+    fibonacci_level: Optional[str] = None
+    market_trend: str = "sideways"
+    sentiment: str = "NEUTRAL"
+
+    def to_row(self) -> list:
+        return [self.rsi, self.rsi_signal, self.macd_signal, self.golden_cross,
+                self.death_cross, self.trend_strength, self.active_patterns,
+                self.fibonacci_level, self.market_trend, self.sentiment]
+
+    @classmethod
+    def from_row(cls, row: list) -> "TechnicalSummary":
+        return cls(*row)
+
+
+@dataclass(slots=True)
+class RiskSummary:
+    atr: float = 0.0
+    atr_percent: float = 0.0
+    stop_loss_levels: Dict[str, float] = field(default_factory=dict)
+    best_rr_ratio: float = 0.0
+    meets_minimum_rr: bool = False
+    best_target: Optional[Target] = None
+    risk_per_trade_percent: float = 0.0
+    risk_amount: float = 0.0
+    stop_percent: float = 0.0
+    position_value: float = 0.0
+    maximum_drawdown: float = 0.0
+    var_95: float = 0.0
+    cvar_95: float = 0.0
+    risk_factors: List[str] = field(default_factory=list)
+
+    def to_row(self) -> list:
+        return [self.atr, self.atr_percent, self.stop_loss_levels, self.best_rr_ratio,
+                self.meets_minimum_rr, self.best_target.to_row() if self.best_target else None,
+                self.risk_per_trade_percent, self.risk_amount, self.stop_percent,
+                self.position_value, self.maximum_drawdown, self.var_95, self.cvar_95,
+                self.risk_factors]
+
+    @classmethod
+    def from_row(cls, row: list) -> "RiskSummary":
+        row = list(row)
+        row[5] = Target.from_row(row[5])
+        return cls(*row)
+
+
+@dataclass(slots=True)
+class FinalSignal:
+    decision: str = "HOLD"
+    confidence_score: float = 0
+    risk_level: str = "MEDIUM"
+    time_horizon: str = "SHORT_TERM"
+    signals: List[str] = field(default_factory=list)
+    recommended_action: str = ""
+    next_review: float = 0.0  # Unix seconds
+
+    def to_row(self) -> list:
+        return [self.decision, self.confidence_score, self.risk_level, self.time_horizon,
+                self.signals, self.recommended_action, self.next_review]
+
+    @classmethod
+    def from_row(cls, row: list) -> "FinalSignal":
+        return cls(*row)
+
+
+@dataclass(slots=True)
+class AnalysisResult:
+    """
+    One analysis, summarized into the typed fields reports and prompts use
+
+    The full per-layer output stays available in `layers`. Binary
+    serialization packs every typed section as a positional array, so
+    field names are not repeated per cached result.
+    """
+    symbol: str
+    analysis_type: str
+    timestamp: float  # Unix seconds
+    current_price: float = 0.0
+    price_change_24h: float = 0.0
+    volume_24h: float = 0.0
+    technical: TechnicalSummary = field(default_factory=TechnicalSummary)
+    risk: RiskSummary = field(default_factory=RiskSummary)
+    signal: FinalSignal = field(default_factory=FinalSignal)
+    ai_insights: str = ""
+    layers: Dict[str, Any] = field(default_factory=dict)
+    # Section -> {"wall_ms", "cpu_ms", "calls"}; empty unless profiling is enabled
+    timings: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    @classmethod
+    def from_layers(cls, symbol: str, analysis_type: str, timestamp: float,
+                    result: Dict[str, Any], next_review: float = 0.0) -> "AnalysisResult":
+        """Build from the per-layer dicts assembled by ComprehensiveAnalyzer.analyze"""
+        ti = result.get("technical_indicators", {})
+        momentum = ti.get("momentum", {})
+        trend = ti.get("trend", {})
+        ma = trend.get("moving_averages", {})
+        fib_relation = result.get("fibonacci", {}).get("current_relation", {})
+
+        technical = TechnicalSummary(
+            rsi=float(momentum.get("rsi", {}).get("value", 0.0)),
+            rsi_signal=momentum.get("rsi", {}).get("signal", "neutral"),
+            macd_signal=momentum.get("macd", {}).get("signal", "neutral"),
+            golden_cross=bool(ma.get("golden_cross", False)),
+            death_cross=bool(ma.get("death_cross", False)),
+            trend_strength=trend.get("adx", {}).get("trend_strength", "weak"),
+            active_patterns=int(result.get("price_action", {}).get("active_patterns_count", 0)),
+            fibonacci_level=next(iter(fib_relation), None),
+            market_trend=result.get("market_structure", {}).get("trend", {}).get("primary", "sideways"),
+            sentiment=result.get("sentiment_analysis", {}).get("category", "NEUTRAL"),
+        )
+
+        rm = result.get("risk_management", {})
+        rr = rm.get("risk_reward_analysis", {})
+        position = rm.get("position_sizing", {})
+        best = rr.get("best_target")
+        risk = RiskSummary(
+            atr=float(rm.get("atr", {}).get("value", 0.0)),
+            atr_percent=float(rm.get("atr", {}).get("percent", 0.0)),
+            stop_loss_levels={k: float(v) for k, v in rm.get("stop_loss_levels", {}).items()},
+            best_rr_ratio=float(rr.get("best_rr_ratio", 0.0)),
+            meets_minimum_rr=bool(rr.get("meets_minimum_rr", False)),
+            best_target=Target(best["type"], float(best["price"]), float(best["distance_percent"]),
+                               best.get("hit_probability"), best.get("expected_bars"))
+            if best else None,
+            risk_per_trade_percent=float(position.get("risk_per_trade_percent", 0.0)),
+            risk_amount=float(position.get("risk_amount", 0.0)),
+            stop_percent=float(position.get("stop_percent", 0.0)),
+            position_value=float(position.get("position_value", 0.0)),
+            maximum_drawdown=float(rm.get("maximum_drawdown", 0.0)),
+            var_95=float(rm.get("var_95", 0.0)),
+            cvar_95=float(rm.get("cvar_95", 0.0)),
+            risk_factors=list(rm.get("risk_factors", [])),
+        )
+
+        fs = result.get("final_signal", {})
+        signal = FinalSignal(
+            decision=fs.get("decision", "HOLD"),
+            confidence_score=fs.get("confidence_score", 0),
+            risk_level=fs.get("risk_level", "MEDIUM"),
+            time_horizon=fs.get("time_horizon", "SHORT_TERM"),
+            signals=list(fs.get("signals", [])),
+            recommended_action=fs.get("recommended_action", ""),
+            next_review=next_review,
+        )
+
+        return cls(
+            symbol=symbol,
+            analysis_type=analysis_type,
+            timestamp=timestamp,
+            current_price=float(result.get("current_price", 0.0)),
+            price_change_24h=float(result.get("price_change_24h", 0.0)),
+            volume_24h=float(result.get("volume_24h", 0.0)),
+            technical=technical,
+            risk=risk,
+            signal=signal,
+            layers={name: result[name] for name in LAYERS if name in result},
+        )
+
+    def to_row(self, include_layers: bool = True) -> list:
+        return [SCHEMA_VERSION, self.symbol, self.analysis_type, self.timestamp,
+                self.current_price, self.price_change_24h, self.volume_24h,
+                self.technical.to_row(), self.risk.to_row(), self.signal.to_row(),
+                self.ai_insights, self.layers if include_layers else {}, self.timings]
+
+    @classmethod
+    def from_row(cls, row: list) -> "AnalysisResult":
+        """
+        Raises:
+            SchemaMismatch: The row was written with another SCHEMA_VERSION
+        """
+        if not row or row[0] != SCHEMA_VERSION:
+            raise SchemaMismatch(f"Expected result schema {SCHEMA_VERSION}, got {row[:1]}")
+        return cls(
+            symbol=row[1],
+            analysis_type=row[2],
+            timestamp=row[3],
+            current_price=row[4],
+            price_change_24h=row[5],
+            volume_24h=row[6],
+            technical=TechnicalSummary.from_row(row[7]),
+            risk=RiskSummary.from_row(row[8]),
+            signal=FinalSignal.from_row(row[9]),
+            ai_insights=row[10],
+            layers=row[11],
+            timings=row[12],
+        )
+
+    def to_bytes(self, include_layers: bool = True) -> bytes:
+        """Compact msgpack encoding for caches and inter-process transfer"""
+        return msgpack.packb(self.to_row(include_layers), default=_encode, use_bin_type=True)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "AnalysisResult":
+        # Layer dicts may use float keys (Fibonacci ratios)
+        return cls.from_row(msgpack.unpackb(data, raw=False, strict_map_key=False))
+
+    @staticmethod
+    def readable(data: bytes) -> bool:
+        """Whether `data` has the current row layout, decoding only its version tag"""
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(data)
+        try:
+            return unpacker.read_array_header() > 0 and unpacker.unpack() == SCHEMA_VERSION
+        except (ValueError, msgpack.OutOfData):
+            return False
+
+    def to_dict(self, include_layers: bool = True) -> Dict[str, Any]:
+        """Plain nested dict with field names, for JSON APIs"""
+        return {
+            "symbol": self.symbol,
+            "analysis_type": self.analysis_type,
+            "timestamp": self.timestamp,
+            "current_price": self.current_price,
+            "price_change_24h": self.price_change_24h,
+            "volume_24h": self.volume_24h,
+            "technical": {name: getattr(self.technical, name)
+                          for name in TechnicalSummary.__slots__},
+            "risk": {
+                **{name: getattr(self.risk, name) for name in RiskSummary.__slots__},
+                "best_target": {name: getattr(self.risk.best_target, name)
+                                for name in Target.__slots__} if self.risk.best_target else None,
+            },
+            "signal": {name: getattr(self.signal, name) for name in FinalSignal.__slots__},
+            "ai_insights": self.ai_insights,
+            "layers": self.layers if include_layers else {},
+            "timings": self.timings,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AnalysisResult":
+        risk = dict(data.get("risk", {}))
+        best = risk.pop("best_target", None)
+        return cls(
+            symbol=data["symbol"],
+            analysis_type=data["analysis_type"],
+            timestamp=data["timestamp"],
+            current_price=data.get("current_price", 0.0),
+            price_change_24h=data.get("price_change_24h", 0.0),
+            volume_24h=data.get("volume_24h", 0.0),
+            technical=TechnicalSummary(**data.get("technical", {})),
+            risk=RiskSummary(**risk, best_target=Target(**best) if best else None),
+            signal=FinalSignal(**data.get("signal", {})),
+            ai_insights=data.get("ai_insights", ""),
+            layers=data.get("layers", {}),
+            timings=data.get("timings", {}),
+        )
+
+    def to_json(self, include_layers: bool = True) -> str:
+        return json.dumps(self.to_dict(include_layers), default=_encode,
+                          ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text: str) -> "AnalysisResult":
+        return cls.from_dict(json.loads(text))
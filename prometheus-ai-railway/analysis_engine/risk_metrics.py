@@ -0,0 +1,224 @@
+"""
+Vectorized risk metrics: VaR/CVaR, drawdown and realized volatility
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+# Acklam's rational approximation of the inverse standard normal CDF
+_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+      1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+      6.680131188771972e+01, -1.328068155288572e+01)
+_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+      -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+      3.754408661907416e+00)
+_P_LOW = 0.02425
+
+
+def norm_ppf(p) -> np.ndarray:
+    """Inverse standard normal CDF (|error| < 1.2e-9)"""
+    p = np.asarray(p, dtype=float)
+    out = np.empty_like(p)
+
+    low = p < _P_LOW
+    high = p > 1 - _P_LOW
+    mid = ~(low | high)
+
+    q = np.sqrt(-2 * np.log(np.where(low, p, 0.5)))
+    tail = ((((((_C[0] * q + _C[1]) * q + _C[2]) * q + _C[3]) * q + _C[4]) * q + _C[5])
+            / ((((_D[0] * q + _D[1]) * q + _D[2]) * q + _D[3]) * q + 1))
+    out[low] = tail[low]
+
+    q = np.sqrt(-2 * np.log(np.where(high, 1 - p, 0.5)))
+    tail = ((((((_C[0] * q + _C[1]) * q + _C[2]) * q + _C[3]) * q + _C[4]) * q + _C[5])
+            / ((((_D[0] * q + _D[1]) * q + _D[2]) * q + _D[3]) * q + 1))
+    out[high] = -tail[high]
+
+    q = p - 0.5
+    r = q * q
+    centre = ((((((_A[0] * r + _A[1]) * r + _A[2]) * r + _A[3]) * r + _A[4]) * r + _A[5]) * q
+              / (((((_B[0] * r + _B[1]) * r + _B[2]) * r + _B[3]) * r + _B[4]) * r + 1))
+    out[mid] = centre[mid]
+    return out
+
+
+def norm_pdf(x) -> np.ndarray:
+    """Standard normal density"""
+    x = np.asarray(x, dtype=float)
+    return np.exp(-0.5 * x * x) / np.sqrt(2 * np.pi)
+
+
+def log_returns(close: np.ndarray) -> np.ndarray:
+    """Bar-to-bar log returns (length n - 1)"""
+    close = np.asarray(close, dtype=float)
+    return np.diff(np.log(close))
+
+
+def _cornish_fisher(z: np.ndarray, skew, excess_kurt) -> np.ndarray:
+    return (z
+            + (z ** 2 - 1) * skew / 6
+            + (z ** 3 - 3 * z) * excess_kurt / 24
+            - (2 * z ** 3 - 5 * z) * skew ** 2 / 36)
+
+
+def value_at_risk(returns: np.ndarray, confidences: Sequence[float] = (0.95, 0.99),
+                  horizons: Sequence[int] = (1,)) -> List[Dict]:
+    """
+    Historical, parametric and Cornish-Fisher VaR/CVaR
+
+    Horizon returns are overlapping sums of log returns taken from one
+    cumulative sum. Each horizon is sorted once; every confidence level is
+    then an index into the sorted array and its CVaR a prefix-sum lookup.
+    The parametric and Cornish-Fisher figures broadcast over the whole
+    (horizon x confidence) grid.
+
+    Returns:
+        One row per (horizon, confidence) with losses as positive percents
+    """
+    returns = np.asarray(returns, dtype=float)
+    returns = returns[np.isfinite(returns)]
+    conf = np.asarray(confidences, dtype=float)
+    if len(returns) < 10:
+        return []
+
+    mu = returns.mean()
+    sigma = returns.std(ddof=1)
+    centred = returns - mu
+    m2 = np.mean(centred ** 2)
+    skew = np.mean(centred ** 3) / m2 ** 1.5 if m2 > 0 else 0.0
+    excess_kurt = np.mean(centred ** 4) / m2 ** 2 - 3 if m2 > 0 else 0.0
+
+    alpha = 1 - conf
+    z = norm_ppf(alpha)
+    csum = np.concatenate(([0.0], np.cumsum(returns)))
+
+    # Tail grid for the Cornish-Fisher expected shortfall
+    grid = (np.arange(32) + 0.5) / 32
+
+    rows = []
+    for h in horizons:
+        if h >= len(returns):
+            continue
+        agg = np.sort(csum[h:] - csum[:-h])
+        prefix = np.concatenate(([0.0], np.cumsum(agg)))
+        k = np.maximum(np.floor(alpha * len(agg)).astype(np.int64), 1)
+        hist_var = agg[k - 1]
+        hist_cvar = prefix[k] / k
+
+        mu_h = mu * h
+        sigma_h = sigma * np.sqrt(h)
+        param_var = mu_h + z * sigma_h
+        param_cvar = mu_h - sigma_h * norm_pdf(z) / alpha
+
+        # i.i.d. aggregation: skew scales with 1/sqrt(h), excess kurtosis 1/h
+        skew_h = skew / np.sqrt(h)
+        kurt_h = excess_kurt / h
+        cf_var = mu_h + _cornish_fisher(z, skew_h, kurt_h) * sigma_h
+        tail_z = norm_ppf(alpha[:, None] * grid[None, :])
+        cf_cvar = mu_h + _cornish_fisher(tail_z, skew_h, kurt_h).mean(axis=1) * sigma_h
+
+        for i, c in enumerate(conf):
+            rows.append({
+                "confidence": float(c),
+                "horizon": int(h),
+                "historical_var": _loss_percent(hist_var[i]),
+                "historical_cvar": _loss_percent(hist_cvar[i]),
+                "parametric_var": _loss_percent(param_var[i]),
+                "parametric_cvar": _loss_percent(param_cvar[i]),
+                "cornish_fisher_var": _loss_percent(cf_var[i]),
+                "cornish_fisher_cvar": _loss_percent(cf_cvar[i])
+            })
+    return rows
+
+
+def _loss_percent(log_return: float) -> float:
+    """Log-return quantile to a positive simple-return loss in percent"""
+    return float(-np.expm1(log_return) * 100)
+
+
+def drawdown_stats(close: np.ndarray) -> Dict:
+    """Maximum and current drawdown plus the longest time under water (bars)"""
+    close = np.asarray(close, dtype=float)
+    if len(close) < 2:
+        return {"max_drawdown": 0.0, "current_drawdown": 0.0, "max_duration": 0, "current_duration": 0}
+
+    peak = np.maximum.accumulate(close)
+    drawdown = close / peak - 1
+    bars = np.arange(len(close))
+    last_peak = np.maximum.accumulate(np.where(drawdown == 0, bars, 0))
+    duration = bars - last_peak
+    trough = int(np.argmin(drawdown))
+
+    return {
+        "max_drawdown": float(-drawdown[trough] * 100),
+        "current_drawdown": float(-drawdown[-1] * 100),
+        "max_drawdown_peak_bar": int(last_peak[trough]),
+        "max_drawdown_trough_bar": trough,
+        "max_duration": int(duration.max()),
+        "current_duration": int(duration[-1])
+    }
+
+
+def rolling_volatility(returns: np.ndarray, window: int = 20) -> np.ndarray:
+    """Rolling sample standard deviation from cumulative sums (NaN warm-up)"""
+    returns = np.asarray(returns, dtype=float)
+    n = len(returns)
+    out = np.full(n, np.nan)
+    if n < window or window < 2:
+        return out
+    s1 = np.concatenate(([0.0], np.cumsum(returns)))
+    s2 = np.concatenate(([0.0], np.cumsum(returns * returns)))
+    win_sum = s1[window:] - s1[:-window]
+    win_sq = s2[window:] - s2[:-window]
+    var = (win_sq - win_sum * win_sum / window) / (window - 1)
+    out[window - 1:] = np.sqrt(np.maximum(var, 0.0))
+    return out
+
+
+def risk_report(close: np.ndarray, confidences: Sequence[float] = (0.95, 0.99),
+                horizons: Sequence[int] = (1, 5, 20), vol_window: int = 20,
+                periods_per_year: Optional[float] = None) -> Dict:
+    """
+    All risk metrics for one price series
+
+    Args:
+        close: Close prices
+        confidences: VaR/CVaR confidence levels
+        horizons: VaR/CVaR horizons in bars
+        vol_window: Rolling volatility window in bars
+        periods_per_year: Bars per year for annualizing volatility
+
+    Returns:
+        Dict with "var_table", "drawdown" and "volatility" sections
+    """
+    returns = log_returns(close)
+    vol = rolling_volatility(returns, vol_window)
+    valid = vol[~np.isnan(vol)]
+
+    volatility = {"window": vol_window}
+    if len(valid):
+        current = float(valid[-1])
+        volatility.update({
+            "current": current * 100,
+            "percentile": float((valid <= current).mean() * 100),
+            "mean": float(valid.mean() * 100)
+        })
+        if periods_per_year:
+            volatility["annualized"] = current * np.sqrt(periods_per_year) * 100
+
+    return {
+        "var_table": value_at_risk(returns, confidences, horizons),
+        "drawdown": drawdown_stats(close),
+        "volatility": volatility
+    }
+
+
+def lookup_var(var_table: List[Dict], confidence: float, horizon: int = 1,
+               field: str = "historical_var") -> float:
+    """Pick one figure out of a `value_at_risk` table (0.0 when missing)"""
+    for row in var_table:
+        if row["horizon"] == horizon and abs(row["confidence"] - confidence) < 1e-9:
+            return row[field]
+    return 0.0
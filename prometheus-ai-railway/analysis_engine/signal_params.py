@@ -0,0 +1,96 @@
+"""
+Final-signal weights and thresholds, with optional optimized overrides on disk
+"""
+
+import copy
+import json
+import logging
+import math
+import os
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIGNAL_PARAMS: Dict[str, Any] = {
+    # Confidence points added when each rule fires
+    "weights": {
+        "active_patterns": 10,
+        "rsi_oversold": 15,
+        "rsi_overbought": -10,
+        "macd_bullish": 10,
+        "golden_cross": 20,
+        "death_cross": -20,
+        "strong_trend": 15,
+        "fibonacci_level": 5,
+        "uptrend": 15,
+        "downtrend": -15,
+        "extreme_fear": 20,
+        "extreme_greed": -20,
+        "rr_excellent": 25,
+        "rr_good": 15,
+    },
+    # Lowest confidence score of each decision; below SELL is STRONG_SELL
+    "thresholds": {
+        "STRONG_BUY": 50,
+        "BUY": 30,
+        "HOLD": -10,
+        "SELL": -30,
+    },
+    "rsi_overbought": 70,
+    "rsi_oversold": 30,
+}
+
+
+def load_signal_params(path: str = None) -> Dict[str, Any]:
+    """
+    Default signal parameters, overridden by a JSON file when present
+
+    Unknown keys in the file are ignored and missing ones keep their
+    defaults, so files written by older optimizer runs stay loadable. An
+    unreadable file or a non-numeric value falls back to the defaults.
+    """
+    params = copy.deepcopy(DEFAULT_SIGNAL_PARAMS)
+    if not path or not os.path.exists(path):
+        return params
+
+    try:
+        with open(path) as f:
+            stored = json.load(f)
+        for section in ("weights", "thresholds"):
+            for key, value in stored.get(section, {}).items():
+                if key in params[section]:
+                    params[section][key] = _number(value)
+        for key in ("rsi_overbought", "rsi_oversold"):
+            if key in stored:
+                params[key] = _number(stored[key])
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Could not load signal parameters from {path}, using defaults: {e}")
+        return copy.deepcopy(DEFAULT_SIGNAL_PARAMS)
+
+    logger.info(f"Loaded signal parameters from {path}")
+    return params
+
+
+def _number(value) -> float:
+    """Keep whole numbers as ints so confidence scores stay integral"""
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"not a finite number: {value}")
+    return int(value) if value.is_integer() else value
+
+
+def save_signal_params(params: Dict[str, Any], path: str, metadata: Dict = None) -> None:
+    """Write signal parameters (plus optional run metadata) as JSON"""
+    payload = {
+        "weights": params["weights"],
+        "thresholds": params["thresholds"],
+        "rsi_overbought": params["rsi_overbought"],
+        "rsi_oversold": params["rsi_oversold"],
+    }
+    if metadata:
+        payload["metadata"] = metadata
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,122 @@
+"""
+Support/resistance engine: sorted-array clustering of swing points
+"""
+
+import numpy as np
+from typing import Dict, List
+
+from analysis_engine.swing_detector import HIGH
+
+
+def cluster_levels(swings: Dict[str, np.ndarray], high: np.ndarray, low: np.ndarray,
+                   volume: np.ndarray, tolerance: float) -> List[Dict]:
+    """
+    Cluster swing prices into ranked horizontal levels
+
+    Swing prices are sorted once and split wherever the gap to the next
+    price exceeds `tolerance`, so clustering is O(n log n). Touches are the
+    bars whose high or low lies within half a tolerance of the level and are
+    counted with binary searches on the sorted highs and lows.
+
+    Args:
+        swings: Zigzag output ("index", "price", "kind")
+        high, low, volume: Bar arrays the swings were computed on
+        tolerance: Maximum price gap inside one cluster
+
+    Returns:
+        Levels sorted by strength (strongest first)
+    """
+    idx = swings["index"]
+    if len(idx) == 0 or tolerance <= 0:
+        return []
+
+    n = len(high)
+    volume = np.nan_to_num(np.asarray(volume, dtype=float))
+
+    order = np.argsort(swings["price"], kind='stable')
+    price = swings["price"][order]
+    bars = idx[order]
+    is_high = (swings["kind"][order] == HIGH).astype(np.int64)
+
+    starts = np.flatnonzero(np.concatenate(([True], np.diff(price) > tolerance)))
+    members = np.diff(np.append(starts, len(price)))
+
+    pivot_volume = volume[bars]
+    weight = pivot_volume + 1e-12
+    level = np.add.reduceat(price * weight, starts) / np.add.reduceat(weight, starts)
+    level_volume = np.add.reduceat(pivot_volume, starts)
+    last_bar = np.maximum.reduceat(bars, starts)
+    highs = np.add.reduceat(is_high, starts)
+    top = np.maximum.reduceat(price, starts)
+    bottom = np.minimum.reduceat(price, starts)
+
+    half = tolerance / 2
+    sorted_high = np.sort(high)
+    sorted_low = np.sort(low)
+    touches = (
+        np.searchsorted(sorted_high, level + half, side='right')
+        - np.searchsorted(sorted_high, level - half, side='left')
+        + np.searchsorted(sorted_low, level + half, side='right')
+        - np.searchsorted(sorted_low, level - half, side='left')
+    )
+
+    bars_since = (n - 1) - last_bar
+    recency = np.exp(-bars_since / max(n / 4, 1))
+    strength = (
+        0.4 * touches / max(touches.max(), 1)
+        + 0.3 * level_volume / max(level_volume.max(), 1e-12)
+        + 0.3 * recency
+    )
+
+    ranked = np.argsort(-strength, kind='stable')
+    return [
+        {
+            "price": float(level[i]),
+            "top": float(top[i]),
+            "bottom": float(bottom[i]),
+            "touches": int(touches[i]),
+            "pivots": int(members[i]),
+            "equal_highs": int(highs[i]),
+            "equal_lows": int(members[i] - highs[i]),
+            "volume": float(level_volume[i]),
+            "bars_since_touch": int(bars_since[i]),
+            "strength": round(float(strength[i]), 3)
+        }
+        for i in ranked
+    ]
+
+
+def split_levels(levels: List[Dict], current_price: float,
+                 max_levels: int = 5) -> Dict[str, List[Dict]]:
+    """Strongest levels below/above price, each list nearest first"""
+    support = [lvl for lvl in levels if lvl["price"] < current_price][:max_levels]
+    resistance = [lvl for lvl in levels if lvl["price"] >= current_price][:max_levels]
+    support.sort(key=lambda lvl: current_price - lvl["price"])
+    resistance.sort(key=lambda lvl: lvl["price"] - current_price)
+    return {"support": support, "resistance": resistance}
+
+
+def liquidity_zones(levels: List[Dict], current_price: float) -> List[Dict]:
+    """Equal highs/lows clusters where resting stop liquidity is likely"""
+    zones = []
+    for lvl in levels:
+        if lvl["equal_highs"] >= 2:
+            zones.append({
+                "type": "buy_side_liquidity",
+                "price": lvl["price"],
+                "top": lvl["top"],
+                "bottom": lvl["bottom"],
+                "equal_touches": lvl["equal_highs"],
+                "position": "above" if lvl["price"] > current_price else "below"
+            })
+        if lvl["equal_lows"] >= 2:
+            zones.append({
+                "type": "sell_side_liquidity",
+                "price": lvl["price"],
+                "top": lvl["top"],
+                "bottom": lvl["bottom"],
+                "equal_touches": lvl["equal_lows"],
+                "position": "above" if lvl["price"] > current_price else "below"
+            })
+    zones.sort(key=lambda z: abs(z["price"] - current_price))
+    return zones
@@ -0,0 +1,197 @@
+"""
+Histogram-based volume profile with POC, value area and volume nodes
+"""
+
+import numpy as np
+from typing import Dict, List, Optional
+
+
+class VolumeProfile:
+    """
+    Volume-at-price histogram that can be kept in sync with a rolling window
+
+    Each bar's volume is spread uniformly over its high-low range and
+    deposited into fixed-width price buckets with `np.bincount`, so building
+    the profile is O(bars + buckets). `update()` only adds bars that are new
+    and subtracts bars that left the window, which keeps repeated analyses
+    of the same symbol cheap regardless of history length.
+    """
+
+    def __init__(self, num_buckets: int = 100, value_area_pct: float = 0.70):
+        self.num_buckets = num_buckets
+        self.value_area_pct = value_area_pct
+        self.bucket_size = 0.0
+        self.origin = 0.0
+        self.hist = np.zeros(0)
+        self._timestamps = None
+        self._high = None
+        self._low = None
+        self._volume = None
+
+    def update(self, timestamps: Optional[np.ndarray], high: np.ndarray,
+               low: np.ndarray, volume: np.ndarray) -> None:
+        """
+        Sync the profile with the latest window of bars
+
+        Args:
+            timestamps: Monotonic bar timestamps, or None to force a rebuild
+            high, low, volume: Bar arrays aligned with timestamps
+        """
+        high = np.asarray(high, dtype=float)
+        low = np.asarray(low, dtype=float)
+        volume = np.nan_to_num(np.asarray(volume, dtype=float))
+
+        if timestamps is None or self._timestamps is None or len(self._timestamps) == 0:
+            self._rebuild(timestamps, high, low, volume)
+            return
+
+        timestamps = np.asarray(timestamps)
+        old = self._timestamps
+        if len(timestamps) == 0 or timestamps[0] < old[0] or timestamps[0] > old[-1]:
+            self._rebuild(timestamps, high, low, volume)
+            return
+
+        # Bars older than the new window drop out; the old last bar may have
+        # been an unfinished candle, so it is always replaced
+        removed = int(np.searchsorted(old, timestamps[0], side='left'))
+        start_new = int(np.searchsorted(timestamps, old[-1], side='left'))
+        overlap = len(old) - removed - 1
+        changed = removed + 1 + (len(timestamps) - start_new)
+
+        if (start_new != overlap or changed > len(timestamps) // 2
+                or not np.array_equal(old[removed:-1], timestamps[:start_new])):
+            self._rebuild(timestamps, high, low, volume)
+            return
+
+        drop = np.r_[0:removed, len(old) - 1]
+        self._deposit(self._high[drop], self._low[drop], self._volume[drop], -1.0)
+        self._deposit(high[start_new:], low[start_new:], volume[start_new:], 1.0)
+        np.maximum(self.hist, 0.0, out=self.hist)
+        self._trim()
+
+        if len(self.hist) > 4 * self.num_buckets:
+            self._rebuild(timestamps, high, low, volume)
+            return
+
+        self._store(timestamps, high, low, volume)
+
+    def summary(self, current_price: float, max_nodes: int = 3) -> Dict:
+        """POC, value area and high/low-volume nodes of the current profile"""
+        total = self.hist.sum()
+        if len(self.hist) == 0 or total <= 0:
+            return {"poc": 0, "value_area": {"high": 0, "low": 0}}
+
+        centers = self.origin + (np.arange(len(self.hist)) + 0.5) * self.bucket_size
+        poc_bucket = int(np.argmax(self.hist))
+
+        # Value area: the highest-volume buckets that together hold the
+        # requested share of volume, reported as the price span they cover
+        order = np.argsort(self.hist)[::-1]
+        covered = np.cumsum(self.hist[order])
+        count = int(np.searchsorted(covered, total * self.value_area_pct)) + 1
+        va_buckets = order[:count]
+        va_low = self.origin + va_buckets.min() * self.bucket_size
+        va_high = self.origin + (va_buckets.max() + 1) * self.bucket_size
+
+        smooth = np.convolve(self.hist, np.ones(3) / 3, mode='same')
+        inner = smooth[1:-1]
+        peaks = np.flatnonzero((inner > smooth[:-2]) & (inner >= smooth[2:])) + 1
+        troughs = np.flatnonzero((inner < smooth[:-2]) & (inner <= smooth[2:])) + 1
+        mean = smooth.mean()
+        peaks = peaks[smooth[peaks] > mean]
+        troughs = troughs[smooth[troughs] < mean * 0.5]
+        hvn = peaks[np.argsort(smooth[peaks])[::-1][:max_nodes]]
+        lvn = troughs[np.argsort(smooth[troughs])[:max_nodes]]
+
+        poc = float(centers[poc_bucket])
+        return {
+            "poc": poc,
+            "value_area": {"high": float(va_high), "low": float(va_low)},
+            "high_volume_nodes": self._node_list(centers, hvn),
+            "low_volume_nodes": self._node_list(centers, lvn),
+            "bucket_size": float(self.bucket_size),
+            "poc_relation": "above" if current_price > poc else "below",
+            "in_value_area": bool(va_low <= current_price <= va_high)
+        }
+
+    def _node_list(self, centers: np.ndarray, buckets: np.ndarray) -> List[Dict]:
+        total = self.hist.sum()
+        return [
+            {"price": float(centers[b]), "volume_share": float(self.hist[b] / total)}
+            for b in buckets
+        ]
+
+    def _rebuild(self, timestamps, high, low, volume) -> None:
+        self.hist = np.zeros(0)
+        if len(high) == 0:
+            self._store(timestamps, high, low, volume)
+            return
+
+        price_min = float(np.min(low))
+        price_max = float(np.max(high))
+        self.bucket_size = (price_max - price_min) / self.num_buckets
+        if self.bucket_size <= 0:
+            self.bucket_size = max(abs(price_max) * 1e-4, 1e-12)
+        self.origin = np.floor(price_min / self.bucket_size) * self.bucket_size
+
+        self._deposit(high, low, volume, 1.0)
+        self._store(timestamps, high, low, volume)
+
+    def _store(self, timestamps, high, low, volume) -> None:
+        self._timestamps = None if timestamps is None else np.array(timestamps)
+        self._high = high.copy()
+        self._low = low.copy()
+        self._volume = volume.copy()
+
+    def _deposit(self, high: np.ndarray, low: np.ndarray,
+                 volume: np.ndarray, sign: float) -> None:
+        """Spread each bar's volume over its range and add it to the histogram"""
+        if len(high) == 0:
+            return
+
+        lo_pos = (low - self.origin) / self.bucket_size
+        hi_pos = (high - self.origin) / self.bucket_size
+        lo_b = np.floor(lo_pos).astype(np.int64)
+        hi_b = np.floor(hi_pos).astype(np.int64)
+        shift = self._ensure_range(int(lo_b.min()), int(hi_b.max()))
+        if shift:
+            lo_pos, hi_pos = lo_pos + shift, hi_pos + shift
+            lo_b, hi_b = lo_b + shift, hi_b + shift
+
+        size = len(self.hist)
+        same = lo_b == hi_b
+        hist = np.zeros(size)
+        hist += np.bincount(lo_b[same], weights=volume[same], minlength=size)
+
+        spread = ~same
+        lo_b, hi_b = lo_b[spread], hi_b[spread]
+        lo_pos, hi_pos = lo_pos[spread], hi_pos[spread]
+        density = volume[spread] / (hi_pos - lo_pos)
+
+        hist += np.bincount(lo_b, weights=density * (lo_b + 1 - lo_pos), minlength=size)
+        hist += np.bincount(hi_b, weights=density * (hi_pos - hi_b), minlength=size)
+        # Buckets fully inside the range get `density` each: difference array
+        diff = (np.bincount(lo_b + 1, weights=density, minlength=size + 1)
+                - np.bincount(hi_b, weights=density, minlength=size + 1))
+        hist += np.cumsum(diff)[:size]
+
+        self.hist += sign * hist
+
+    def _ensure_range(self, first: int, last: int) -> int:
+        """Grow the histogram so buckets first..last exist; returns the left shift"""
+        left = max(-first, 0)
+        right = max(last + 1 - len(self.hist), 0)
+        if left or right:
+            self.hist = np.pad(self.hist, (left, right))
+            self.origin -= left * self.bucket_size
+        return left
+
+    def _trim(self) -> None:
+        """Drop empty buckets at both ends after bars leave the window"""
+        filled = np.flatnonzero(self.hist > 1e-9 * max(self.hist.max(initial=0.0), 1.0))
+        if len(filled) == 0:
+            self.hist = np.zeros(0)
+            return
+        first, last = filled[0], filled[-1]
+        self.origin += first * self.bucket_size
+        self.hist = self.hist[first:last + 1].copy()
@@ -7,10 +7,12 @@ Integrates both PROMETHEUS AI v6.0 and Efsanevi Yatırım Yeteneği systems
 import os
 import logging
 import asyncio
-from typing import Dict, Any, Optional
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime
 
-from flask import Flask, request, jsonify
+from aiohttp import web
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, 
@@ -20,8 +22,22 @@ import google.generativeai as genai
 
 from config import config
 from analysis_engine.comprehensive_analyzer import ComprehensiveAnalyzer
+from analysis_engine.signal_params import load_signal_params
+from analysis_engine.result_model import AnalysisResult
+from analysis_engine.portfolio import METHODS, size_portfolio
 from data_fetchers.universal_client import UniversalDataClient
-from utils.formatters import format_analysis_report
+from utils.formatters import (
+    format_analysis_report, format_quick_report, format_risk_report,
+    format_portfolio_report, format_scan_insights, format_scan_report
+)
+from utils.scheduler import AnalysisScheduler, RateLimited
+from utils.cache import create_cache, pack, pack_frame, unpack, unpack_frame
+from utils.prompts import (
+    build_batch_prompt, build_insight_prompt, encode_summary, fingerprint, split_batch_response
+)
+from utils.streaming import TextStream, paginate, stream_to_chat
+from utils.governor import AIGovernor, CircuitOpen
+from utils.outbox import Outbox
 
 # Configure logging
 logging.basicConfig(
@@ -30,21 +46,149 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize Flask app for Render
-app = Flask(__name__)
-
 # Initialize components
-data_client = UniversalDataClient()
-analyzer = ComprehensiveAnalyzer()
+# OHLCV, analysis and insight cache; shared across workers/replicas via CACHE_URL
+cache = create_cache(config.CACHE_URL, maxsize=config.ANALYSIS_CACHE_SIZE)
+data_client = UniversalDataClient(cache=cache, ttl=config.CACHE_DURATION)
+analyzer = ComprehensiveAnalyzer(
+    correlation_universe=config.CRYPTO_SYMBOLS + config.STOCK_SYMBOLS + config.FOREX_PAIRS,
+    correlation_window=config.CORRELATION_WINDOW,
+    signal_params=load_signal_params(config.SIGNAL_PARAMS_FILE),
+    account_size=config.ACCOUNT_SIZE,
+    risk_per_trade=config.MAX_RISK_PER_TRADE,
+    simulation_paths=config.MONTE_CARLO_PATHS,
+    simulation_horizon=config.MONTE_CARLO_HORIZON,
+    simulation_method=config.MONTE_CARLO_METHOD,
+    profile=config.ANALYZER_PROFILING
+)
+
+# Analyses and report rendering run here, keeping the event loop free for
+# updates, HTTP requests and Gemini streams
+analysis_pool = ThreadPoolExecutor(max_workers=config.ANALYSIS_WORKERS, thread_name_prefix="analysis")
+
+# Quick and risk analyses run only some layers; each gets the report of what it ran
+REPORT_FORMATTERS = {"quick": format_quick_report, "risk": format_risk_report}
 
 # Initialize Gemini AI
 genai.configure(api_key=config.GEMINI_API_KEY)
-gemini_model = genai.GenerativeModel(config.GEMINI_MODEL)
+if config.GEMINI_ENDPOINT:
+    from utils.fake_gemini import FakeGenerativeModel
+    gemini_model = FakeGenerativeModel(config.GEMINI_ENDPOINT)
+else:
+    gemini_model = genai.GenerativeModel(config.GEMINI_MODEL)
+
+# Every Gemini call goes through the governor (concurrency, deadline, circuit)
+ai_governor = AIGovernor(
+    max_concurrency=config.GEMINI_CONCURRENCY,
+    timeout=config.GEMINI_TIMEOUT,
+    retries=config.GEMINI_RETRIES,
+    failure_threshold=config.GEMINI_BREAKER_THRESHOLD,
+    reset_after=config.GEMINI_BREAKER_RESET
+)
 
 class PrometheusUltraBot:
     def __init__(self):
-        self.user_sessions: Dict[int, Dict] = {}
-        self.analysis_cache: Dict[str, Dict] = {}
+        # Rendered results ("analysis"), Gemini insights ("insights") and
+        # per-user token buckets ("quotas") live in the shared cache backend
+        self.cache = cache
+        
+        # Running jobs keyed on (symbol, interval, analysis_type) so that
+        # concurrent identical requests share one fetch/analysis/Gemini call
+        self.pending_analyses: Dict[Tuple[str, str, str], asyncio.Future] = {}
+        
+        # Gemini answers being streamed, keyed on the summary fingerprint
+        self.pending_insights: Dict[str, TextStream] = {}
+        self.background_tasks: Set[asyncio.Task] = set()
+        
+        # Chat-triggered analyses go through a bounded, rate-limited queue
+        self.scheduler = AnalysisScheduler(
+            self.get_analysis,
+            workers=config.ANALYSIS_WORKERS,
+            max_queue=config.ANALYSIS_QUEUE_SIZE,
+            tokens_per_minute=config.USER_TOKENS_PER_MINUTE,
+            burst=config.USER_TOKEN_BURST,
+            max_pending=config.USER_MAX_PENDING,
+            exempt=config.ADMIN_IDS,
+            cache=cache
+        )
+        
+    async def get_analysis(self, symbol: str, analysis_type: str,
+                           interval: str = "1h") -> Optional[Dict]:
+        """
+        Analysis result and rendered report, shared across users
+        
+        Returns:
+            Dict with the msgpack-packed "result" (see AnalysisResult.from_bytes)
+            and the rendered "report", or None when there is no data
+        """
+        job_key = (symbol, interval, analysis_type)
+        job = self.pending_analyses.get(job_key)
+        if job is None:
+            job = asyncio.ensure_future(self._run_analysis(symbol, analysis_type, interval))
+            self.pending_analyses[job_key] = job
+            job.add_done_callback(lambda _: self.pending_analyses.pop(job_key, None))
+        
+        # A cancelled waiter must not cancel the job other users wait on
+        return await asyncio.shield(job)
+    
+    async def _run_analysis(self, symbol: str, analysis_type: str,
+                            interval: str) -> Optional[Dict]:
+        """
+        Fetch, analyze and render unless the last candle is cached
+        
+        Gemini is not awaited here: the report goes out as soon as the
+        analysis is done and insights follow as a stream (see send_insights).
+        """
+        price_data = await data_client.fetch_data(symbol, interval=interval)
+        if price_data is None or price_data.empty:
+            return None
+        
+        last_candle = price_data.index[-1]
+        candle = last_candle.isoformat() if hasattr(last_candle, "isoformat") else str(last_candle)
+        cache_key = f"{symbol}|{interval}|{candle}|{analysis_type}"
+        cached = await self.cache.get("analysis", cache_key)
+        if cached is not None:
+            entry = unpack(cached)
+            # Entries written before a result layout change count as misses
+            if AnalysisResult.readable(entry["result"]):
+                return entry
+        
+        entry = await asyncio.get_running_loop().run_in_executor(
+            analysis_pool, self._analyze_and_render, symbol, price_data, analysis_type
+        )
+        await self.cache.set("analysis", cache_key, pack(entry), config.ANALYSIS_CACHE_TTL)
+        return entry
+    
+    @staticmethod
+    def _analyze_and_render(symbol: str, price_data, analysis_type: str) -> Dict:
+        """Analysis and rendered report (CPU-bound, runs on analysis_pool)"""
+        analysis_result = analyzer.analyze(symbol, price_data, analysis_type)
+        return {
+            "result": analysis_result.to_bytes(),
+            "report": REPORT_FORMATTERS.get(analysis_type, format_analysis_report)(analysis_result),
+            "cached_at": datetime.now().timestamp()
+        }
+    
+    async def get_portfolio(self, symbols: List[str], method: str = "risk_parity",
+                            account_size: float = None) -> Dict:
+        """
+        Allocation across several symbols
+        
+        Histories are fetched concurrently and the covariance/weights are
+        computed off the event loop, so other chats stay responsive.
+        """
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        frames = await asyncio.gather(*(
+            data_client.fetch_data(symbol, period=config.PORTFOLIO_PERIOD) for symbol in symbols
+        ))
+        return await asyncio.to_thread(
+            size_portfolio,
+            dict(zip(symbols, frames)),
+            method=method,
+            account_size=account_size or config.ACCOUNT_SIZE,
+            max_risk_per_trade=config.MAX_RISK_PER_TRADE,
+            target_volatility=config.PORTFOLIO_TARGET_VOLATILITY
+        )
         
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
@@ -135,6 +279,78 @@ Ben, 7 katmanlı derin analiz sistemi ile donatılmış en gelişmiş yatırım
         symbol = context.args[0].upper()
         await self.perform_analysis(update, symbol, "risk")
     
+    async def scan_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /tara command"""
+        symbols = list(dict.fromkeys(arg.upper() for arg in context.args or []))
+        symbols = symbols or config.CRYPTO_SYMBOLS[:config.MAX_ASSETS_PER_REQUEST]
+        if len(symbols) > config.MAX_ASSETS_PER_REQUEST:
+            await update.message.reply_text(
+                f"⚠️ En fazla {config.MAX_ASSETS_PER_REQUEST} sembol girebilirsiniz."
+            )
+            return
+        
+        message = await update.message.reply_text(f"🔎 {len(symbols)} sembol taranıyor...")
+        try:
+            try:
+                jobs = await self.scheduler.submit_many(update.effective_user.id, symbols, "quick")
+            except (RateLimited, asyncio.QueueFull) as e:
+                await message.edit_text(self.busy_text(e))
+                return
+            
+            entries = await asyncio.gather(
+                *(asyncio.shield(job.future) for job in jobs), return_exceptions=True
+            )
+            results, missing = [], []
+            for symbol, entry in zip(symbols, entries):
+                if isinstance(entry, dict):
+                    results.append(AnalysisResult.from_bytes(entry["result"]))
+                else:
+                    missing.append(symbol)
+            
+            if not results:
+                await message.edit_text("❌ Taranan semboller için veri bulunamadı.")
+                return
+            
+            await message.edit_text(format_scan_report(results, missing), parse_mode='Markdown')
+            if ai_governor.available():
+                self.spawn(self.send_scan_insights(results, update.message))
+                
+        except Exception as e:
+            logger.error(f"Scan error: {e}", exc_info=True)
+            await message.edit_text("❌ Tarama sırasında hata oluştu. Lütfen daha sonra tekrar deneyin.")
+    
+    async def portfolio_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /portfoy command"""
+        args = [arg.upper() for arg in context.args or []]
+        method = "volatility_target" if args and args[0] == "VOL" else "risk_parity"
+        symbols = args[1:] if args and args[0] in ("VOL", "RP") else args
+        
+        if len(symbols) < 2:
+            await update.message.reply_text(
+                "⚠️ Lütfen en az iki sembol belirtin.\n"
+                "Örnek: `/portfoy BTC ETH AAPL` veya `/portfoy vol BTC ETH AAPL`",
+                parse_mode='Markdown'
+            )
+            return
+        if len(symbols) > config.MAX_ASSETS_PER_REQUEST:
+            await update.message.reply_text(
+                f"⚠️ En fazla {config.MAX_ASSETS_PER_REQUEST} sembol girebilirsiniz."
+            )
+            return
+        
+        loading_msg = await update.message.reply_text("💼 Portföy hesaplanıyor...")
+        try:
+            portfolio = await self.get_portfolio(symbols, method)
+            if "error" in portfolio:
+                await loading_msg.edit_text(f"❌ Portföy hesaplanamadı: {portfolio['error']}")
+                return
+            await loading_msg.edit_text(format_portfolio_report(portfolio), parse_mode='Markdown')
+        except Exception as e:
+            logger.error(f"Portfolio error: {e}")
+            await loading_msg.edit_text(
+                "❌ Portföy hesaplanırken hata oluştu. Lütfen daha sonra tekrar deneyin."
+            )
+    
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /yardim command"""
         help_text = """
@@ -145,6 +361,8 @@ Ben, 7 katmanlı derin analiz sistemi ile donatılmış en gelişmiş yatırım
 /analiz [sembol] - Tam detaylı 7 katman analiz
 /hizli [sembol] - Hızlı özet analiz
 /risk [sembol] - Risk yönetimi analizi
+/portfoy [semboller] - Risk paritesi portföy dağılımı
+/tara [semboller] - Çoklu sembol taraması
 /yardim - Bu mesajı göster
 
 *Kullanım Örnekleri:*
@@ -152,6 +370,9 @@ Ben, 7 katmanlı derin analiz sistemi ile donatılmış en gelişmiş yatırım
 • `/hizli AAPL` - Apple hızlı analiz
 • `ETH` - Direkt sembol yazımı
 • `/risk TSLA` - Tesla risk analizi
+• `/portfoy BTC ETH AAPL` - Risk paritesi dağılımı
+• `/portfoy vol BTC ETH AAPL` - Volatilite hedefli dağılım
+• `/tara BTC ETH SOL` - Hızlı çoklu tarama
 
 *Analiz Katmanları:*
 1. 📊 Fiyat Hareketi (38+ formasyon)
@@ -269,20 +490,76 @@ Risk: $200 (2%)
             symbol = data.replace("symbol_", "")
             await self.perform_analysis_callback(query, symbol, "full")
     
+    async def schedule_analysis(self, user_id: int, symbol: str, analysis_type: str,
+                                show, started_text: str) -> Optional[Dict]:
+        """
+        Queue an analysis and keep the user's status message current
+        
+        `show` edits the status message. A job still waiting after a short
+        grace period gets its queue position shown, refreshed at most every
+        QUEUE_STATUS_INTERVAL seconds; `started_text` replaces it once a
+        worker picks the job up.
+        
+        Raises:
+            RateLimited, asyncio.QueueFull: The request was not admitted
+        """
+        job = await self.scheduler.submit(user_id, symbol, analysis_type)
+        
+        shown = None
+        timeout = 0.5
+        while not job.started.is_set():
+            try:
+                await asyncio.wait_for(job.started.wait(), timeout)
+                break
+            except asyncio.TimeoutError:
+                pass
+            position = self.scheduler.position(job)
+            if position != shown:
+                shown = position
+                await show(
+                    f"🔍 *{symbol}* analiz ediliyor...\n"
+                    f"⏳ Sıradaki yeriniz: {position + 1}"
+                )
+            timeout = config.QUEUE_STATUS_INTERVAL
+        
+        if shown is not None:
+            await show(started_text)
+        
+        # A user leaving must not cancel the job others share
+        return await asyncio.shield(job.future)
+    
+    @staticmethod
+    def busy_text(error: Exception) -> str:
+        """Why a request was not queued"""
+        if isinstance(error, RateLimited):
+            return (
+                f"⏱️ Çok fazla istek gönderdiniz.\n"
+                f"Lütfen {max(int(error.retry_after), 1)} saniye sonra tekrar deneyin."
+            )
+        return "🚦 Sistem şu anda çok yoğun. Lütfen birkaç dakika sonra tekrar deneyin."
+    
     async def perform_analysis(self, update: Update, symbol: str, analysis_type: str):
         """Perform analysis and send results"""
         try:
             # Send initial message
-            message = await update.message.reply_text(
+            started_text = (
                 f"🔍 *{symbol}* analiz ediliyor...\n"
-                f"7 katmanlı tarama başlatıldı ⚡",
-                parse_mode='Markdown'
+                f"7 katmanlı tarama başlatıldı ⚡"
             )
+            message = await update.message.reply_text(started_text, parse_mode='Markdown')
             
-            # Get data
-            price_data = await data_client.fetch_data(symbol)
+            # Get data, analysis and report (queued; cached per candle)
+            try:
+                analysis = await self.schedule_analysis(
+                    update.effective_user.id, symbol, analysis_type,
+                    lambda text: message.edit_text(text, parse_mode='Markdown'),
+                    started_text
+                )
+            except (RateLimited, asyncio.QueueFull) as e:
+                await message.edit_text(self.busy_text(e))
+                return
             
-            if price_data is None or price_data.empty:
+            if analysis is None:
                 await message.edit_text(
                     f"❌ *{symbol}* için veri bulunamadı.\n"
                     f"Lütfen sembolü kontrol edin.",
@@ -290,14 +567,7 @@ Risk: $200 (2%)
                 )
                 return
             
-            # Perform analysis
-            analysis_result = analyzer.analyze(symbol, price_data, analysis_type)
-            
-            # Enhance with Gemini AI
-            enhanced_result = await self.enhance_with_ai(analysis_result, symbol)
-            
-            # Format and send report
-            report = format_analysis_report(enhanced_result)
+            report = analysis["report"]
             
             # Split long messages
             if len(report) > 4000:
@@ -309,6 +579,8 @@ Risk: $200 (2%)
                         await update.message.reply_text(part, parse_mode='Markdown')
             else:
                 await message.edit_text(report, parse_mode='Markdown')
+            
+            self.spawn(self.send_insights(analysis, update.message))
                 
         except Exception as e:
             logger.error(f"Analysis error: {e}", exc_info=True)
@@ -326,25 +598,28 @@ Risk: $200 (2%)
     async def perform_analysis_callback(self, query, symbol: str, analysis_type: str):
         """Perform analysis for callback queries"""
         try:
-            await query.edit_message_text(
-                f"🔍 *{symbol}* analiz ediliyor...\n⏳ Lütfen bekleyin",
-                parse_mode='Markdown'
-            )
+            started_text = f"🔍 *{symbol}* analiz ediliyor...\n⏳ Lütfen bekleyin"
+            await query.edit_message_text(started_text, parse_mode='Markdown')
             
-            price_data = await data_client.fetch_data(symbol)
+            try:
+                analysis = await self.schedule_analysis(
+                    query.from_user.id, symbol, analysis_type,
+                    lambda text: query.edit_message_text(text, parse_mode='Markdown'),
+                    started_text
+                )
+            except (RateLimited, asyncio.QueueFull) as e:
+                await query.edit_message_text(self.busy_text(e))
+                return
             
-            if price_data is None or price_data.empty:
+            if analysis is None:
                 await query.edit_message_text(
                     f"❌ *{symbol}* için veri bulunamadı.",
                     parse_mode='Markdown'
                 )
                 return
             
-            analysis_result = analyzer.analyze(symbol, price_data, analysis_type)
-            enhanced_result = await self.enhance_with_ai(analysis_result, symbol)
-            report = format_analysis_report(enhanced_result)
-            
-            await query.edit_message_text(report, parse_mode='Markdown')
+            await query.edit_message_text(analysis["report"], parse_mode='Markdown')
+            self.spawn(self.send_insights(analysis, query.message))
             
         except Exception as e:
             logger.error(f"Callback analysis error: {e}")
@@ -353,64 +628,241 @@ Risk: $200 (2%)
                 parse_mode='Markdown'
             )
     
-    async def enhance_with_ai(self, analysis_result: Dict, symbol: str) -> Dict:
-        """Enhance analysis with Gemini AI insights"""
+    def spawn(self, coro) -> asyncio.Task:
+        """Run a coroutine past the handler that started it"""
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+    
+    async def insight_stream(self, analysis_result: AnalysisResult) -> Optional[TextStream]:
+        """
+        Gemini insights for a result, as a stream chats can follow
+        
+        The prompt carries a compact encoding of the result (see
+        utils/prompts.py). A cached answer for the same encoding, from any
+        worker or replica, is returned complete; otherwise one streaming
+        Gemini call is shared by every chat asking while it runs. None
+        while the Gemini circuit is open, so the AI part is skipped.
+        """
+        summary = encode_summary(analysis_result)
+        insight_key = fingerprint(summary)
+        stream = self.pending_insights.get(insight_key)
+        if stream is not None:
+            return stream
+        
+        cached = await self.cache.get("insights", insight_key)
+        if cached is not None:
+            return TextStream(cached.decode(), done=True)
+        
+        stream = self.pending_insights.get(insight_key)
+        if stream is None:
+            if not ai_governor.available():
+                return None
+            stream = self.pending_insights[insight_key] = TextStream()
+            self.spawn(self._generate_insight(summary, insight_key, stream))
+        return stream
+    
+    async def _generate_insight(self, summary: str, insight_key: str, stream: TextStream) -> None:
+        """Feed the Gemini response into the stream; only complete answers are cached"""
+        prompt = build_insight_prompt(summary)
         try:
-            prompt = f"""
-            SEN PROMETHEUS AI ULTRA'SIN - En gelişmiş finansal analiz sistemi.
-            
-            SEMBOL: {symbol}
-            ANALİZ VERİLERİ: {str(analysis_result)[:2000]}
-            
-            Lütfen bu analizi geliştir:
-            1. Warren Buffett'in değer yatırımı perspektifinden değerlendir
-            2. George Soros'un makro zamanlama teorisini uygula
-            3. Jim Simons'ın matematiksel modelleme yaklaşımını ekle
-            4. Ray Dalio'nun All-Weather risk yönetimini dahil et
-            5. Paul Tudor Jones'un makro+teknik sentezini yap
-            
-            Özellikle şunlara odaklan:
-            - Asimetrik risk/ödül fırsatları
-            - Piyasa refleksivitesi
-            - Olası kara kuğu senaryoları
-            - Optimal pozisyon büyüklüğü
-            
-            Analizi Türkçe olarak geliştir.
-            """
-            
-            response = await gemini_model.generate_content_async(prompt)
-            analysis_result['ai_insights'] = response.text
-            
-            return analysis_result
-            
+            async for chunk in ai_governor.stream(
+                lambda: gemini_model.generate_content_async(prompt, stream=True)
+            ):
+                stream.append(chunk.text)
+            if stream.text:
+                await self.cache.set("insights", insight_key, stream.text.encode(), config.AI_INSIGHT_TTL)
+        except CircuitOpen:
+            stream.append("AI geliştirmesi geçici olarak kullanılamıyor.")
+        except asyncio.TimeoutError:
+            logger.warning(f"Gemini AI timed out after {config.GEMINI_TIMEOUT}s")
+            stream.append(("\n\n" if stream.text else "") + "AI yanıtı zaman aşımına uğradı.")
         except Exception as e:
             logger.error(f"Gemini AI error: {e}")
-            analysis_result['ai_insights'] = "AI geliştirmesi geçici olarak kullanılamıyor."
-            return analysis_result
+            stream.append(("\n\n" if stream.text else "") + "AI geliştirmesi geçici olarak kullanılamıyor.")
+        finally:
+            stream.close()
+            self.pending_insights.pop(insight_key, None)
+    
+    async def enhance_batch(self, results: List[AnalysisResult]) -> List[AnalysisResult]:
+        """
+        Brief Gemini insights for several results for about one model call
+        
+        Summaries without a cached brief are sent together, up to
+        GEMINI_BATCH_SIZE per prompt, and the answer is split back into each
+        result's ai_insights by its `### SYMBOL` sections. Batches run
+        concurrently under the governor. Briefs are cached per summary
+        fingerprint, apart from the full single-symbol insights.
+        """
+        pending = []
+        for result in results:
+            summary = encode_summary(result)
+            insight_key = f"brief:{fingerprint(summary)}"
+            cached = await self.cache.get("insights", insight_key)
+            if cached is not None:
+                result.ai_insights = cached.decode()
+            else:
+                pending.append((result, summary, insight_key))
+        
+        size = config.GEMINI_BATCH_SIZE
+        await asyncio.gather(*(
+            self._enhance_batch(pending[i:i + size]) for i in range(0, len(pending), size)
+        ))
+        return results
+    
+    async def _enhance_batch(self, batch: List[Tuple[AnalysisResult, str, str]]) -> None:
+        prompt = build_batch_prompt({result.symbol: summary for result, summary, _ in batch})
+        text = ""
+        try:
+            async for chunk in ai_governor.stream(
+                lambda: gemini_model.generate_content_async(prompt, stream=True)
+            ):
+                text += chunk.text
+        except CircuitOpen:
+            pass
+        except Exception as e:
+            logger.error(f"Gemini batch error: {e}")
+        
+        sections = split_batch_response(text, [result.symbol for result, _, _ in batch])
+        for result, _, insight_key in batch:
+            insight = sections.get(result.symbol)
+            if insight:
+                result.ai_insights = insight
+                await self.cache.set("insights", insight_key, insight.encode(), config.AI_INSIGHT_TTL)
+            else:
+                result.ai_insights = "AI geliştirmesi geçici olarak kullanılamıyor."
+    
+    async def send_scan_insights(self, results: List[AnalysisResult], anchor) -> None:
+        """Batched Gemini insights of a scan, as one follow-up in the chat of `anchor`"""
+        try:
+            message = await anchor.reply_text("🤖 GEMİNİ AI İÇGÖRÜLERİ\n\nHazırlanıyor... ▌")
+            await self.enhance_batch(results)
+            pages = paginate(format_scan_insights(results))
+            await message.edit_text(pages[0])
+            for page in pages[1:]:
+                await anchor.reply_text(page)
+        except Exception as e:
+            logger.error(f"Scan insight delivery error: {e}")
+    
+    async def send_insights(self, analysis: Dict, anchor) -> None:
+        """Stream Gemini insights for a delivered report into the chat of `anchor`"""
+        try:
+            stream = await self.insight_stream(AnalysisResult.from_bytes(analysis["result"]))
+            if stream is None:
+                return
+            await stream_to_chat(
+                stream, anchor, "🤖 GEMİNİ AI İÇGÖRÜLERİ\n\n", config.INSIGHT_EDIT_INTERVAL
+            )
+        except Exception as e:
+            logger.error(f"Insight delivery error: {e}")
 
 # Initialize bot
 bot = PrometheusUltraBot()
 
-# Flask routes for Render
-@app.route('/health', methods=['GET'])
-def health_check():
+# Every outbound Bot API call is paced by the outbox; gunicorn workers share
+# the bot's global limit
+outbox = Outbox(
+    global_rate=config.TELEGRAM_GLOBAL_RATE / (config.WEB_CONCURRENCY if config.WEBHOOK_URL else 1),
+    chat_rate=config.TELEGRAM_CHAT_RATE,
+    group_rate=config.TELEGRAM_GROUP_RATE,
+    burst=config.TELEGRAM_CHAT_BURST,
+    max_retries=config.TELEGRAM_MAX_RETRIES
+)
+
+# HTTP endpoints, served on the bot's event loop
+routes = web.RouteTableDef()
+
+@routes.get('/health')
+async def health_check(request: web.Request) -> web.Response:
     """Health check endpoint for Render"""
-    return jsonify({
+    return web.json_response({
         "status": "healthy",
         "service": "Prometheus AI Ultra Bot",
+        "mode": "webhook" if config.WEBHOOK_URL else "polling",
+        "pid": os.getpid(),
         "timestamp": datetime.now().isoformat()
-    }), 200
+    })
 
-@app.route('/webhook', methods=['POST'])
-def webhook():
-    """Webhook endpoint for Telegram (if using webhooks)"""
-    # For polling mode, this isn't used
-    return jsonify({"status": "webhook_not_used"}), 200
+@routes.get('/api/stats')
+async def stats(request: web.Request) -> web.Response:
+    """Analyzer timings, analysis queue, cache, Gemini governor and outbound Telegram queue"""
+    return web.json_response({
+        **analyzer.timing_stats(),
+        "scheduler": bot.scheduler.stats(),
+        "cache": cache.stats(),
+        "gemini": ai_governor.stats(),
+        "telegram": outbox.stats()
+    })
 
-@app.route('/')
-def index():
+@routes.route('*', '/api/portfolio')
+async def portfolio_api(request: web.Request) -> web.Response:
+    """Portfolio allocation: symbols, method (risk_parity/volatility_target), account_size"""
+    params = request.query
+    if request.method == 'POST' and request.can_read_body:
+        try:
+            params = await request.json()
+        except ValueError:
+            return web.json_response({"error": "Invalid JSON body"}, status=400)
+        if not isinstance(params, dict):
+            return web.json_response({"error": "JSON body must be an object"}, status=400)
+    symbols = params.get("symbols", [])
+    if isinstance(symbols, str):
+        symbols = [s for s in symbols.split(",") if s.strip()]
+    method = params.get("method", "risk_parity")
+    
+    if not isinstance(symbols, list) or not all(isinstance(s, str) and s.strip() for s in symbols):
+        return web.json_response({"error": "symbols must be a list or comma-separated string"}, status=400)
+    if len(symbols) < 2 or len(symbols) > config.PORTFOLIO_MAX_ASSETS:
+        return web.json_response({"error": f"Provide 2-{config.PORTFOLIO_MAX_ASSETS} symbols"}, status=400)
+    if method not in METHODS:
+        return web.json_response({"error": f"method must be one of {list(METHODS)}"}, status=400)
+    try:
+        account_size = float(params.get("account_size", config.ACCOUNT_SIZE))
+    except (TypeError, ValueError):
+        account_size = None
+    if account_size is None or not math.isfinite(account_size) or account_size <= 0:
+        return web.json_response({"error": "account_size must be a positive number"}, status=400)
+    
+    try:
+        portfolio = await asyncio.wait_for(
+            bot.get_portfolio([s.strip() for s in symbols], method, account_size),
+            config.REQUEST_TIMEOUT
+        )
+    except Exception as e:
+        logger.error(f"Portfolio API error: {e}")
+        return web.json_response({"error": "Portfolio calculation failed"}, status=500)
+    
+    return web.json_response(portfolio, status=400 if "error" in portfolio else 200)
+
+@routes.post(config.WEBHOOK_PATH)
+async def webhook(request: web.Request) -> web.Response:
+    """
+    Telegram webhook: updates go straight onto the application's queue
+    
+    Telegram sends WEBHOOK_SECRET in a header so forged updates can be
+    refused. The request is acknowledged as soon as the update is queued.
+    """
+    application = request.app["telegram"]
+    if not config.WEBHOOK_URL:
+        return web.json_response({"status": "webhook_not_used"})
+    if config.WEBHOOK_SECRET and \
+            request.headers.get("X-Telegram-Bot-Api-Secret-Token") != config.WEBHOOK_SECRET:
+        return web.json_response({"error": "Forbidden"}, status=403)
+    
+    try:
+        update = Update.de_json(await request.json(), application.bot)
+    except ValueError:
+        return web.json_response({"error": "Invalid update"}, status=400)
+    await application.update_queue.put(update)
+    return web.json_response({"status": "ok"})
+
+@routes.get('/')
+async def index(request: web.Request) -> web.Response:
     """Main page"""
-    return """
+    return web.Response(text=INDEX_HTML, content_type="text/html")
+
+INDEX_HTML = """
     <html>
         <head>
             <title>PROMETHEUS AI ULTRA v1.0</title>
@@ -471,45 +923,116 @@ def index():
             </div>
         </body>
     </html>
+"""
+
+async def refresh_correlations():
+    """
+    Keep the universe-wide correlation matrix current
+    
+    Every worker keeps its own matrix, but each round only one downloads
+    a symbol: the first to claim it in the cache fetches and publishes the
+    candles, and the others feed those. Without a shared CACHE_URL every
+    worker claims every symbol. Matrix updates run on the analysis pool.
     """
+    symbols = analyzer.correlations.symbols
+    loop = asyncio.get_running_loop()
+    # Spread the fetches over the refresh period
+    step = config.CORRELATION_REFRESH / max(len(symbols), 1)
+    while True:
+        for symbol in symbols:
+            next_symbol = loop.time() + step
+            try:
+                if await cache.add("locks", f"correlations:{symbol}", b"", config.CORRELATION_REFRESH / 2):
+                    price_data = await data_client.fetch_data(symbol)
+                    if price_data is not None and not price_data.empty:
+                        await cache.set("correlations", symbol, pack_frame(price_data),
+                                        2 * config.CORRELATION_REFRESH)
+                else:
+                    # Claimed by another worker this round; give it time to publish
+                    await asyncio.sleep(step / 2)
+                    published = await cache.get("correlations", symbol)
+                    price_data = unpack_frame(published) if published is not None else None
+                
+                if price_data is not None and not price_data.empty:
+                    await loop.run_in_executor(analysis_pool, analyzer.update_correlations, symbol, price_data)
+            except Exception as e:
+                logger.error(f"Correlation refresh error for {symbol}: {e}")
+            
+            await asyncio.sleep(max(next_symbol - loop.time(), 0))
 
-async def main():
-    """Main function to run the bot"""
-    # Create Telegram application
-    application = Application.builder().token(config.TELEGRAM_TOKEN).build()
+def build_application() -> Application:
+    """Telegram application with every command and callback handler"""
+    application = Application.builder().token(config.TELEGRAM_TOKEN).rate_limiter(outbox).build()
     
-    # Add handlers
     application.add_handler(CommandHandler("start", bot.start_command))
     application.add_handler(CommandHandler("analiz", bot.analyze_command))
     application.add_handler(CommandHandler("hizli", bot.quick_command))
     application.add_handler(CommandHandler("risk", bot.risk_command))
+    application.add_handler(CommandHandler("portfoy", bot.portfolio_command))
+    application.add_handler(CommandHandler("tara", bot.scan_command))
     application.add_handler(CommandHandler("yardim", bot.help_command))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, bot.handle_message))
     application.add_handler(CallbackQueryHandler(bot.handle_callback))
+    return application
+
+async def register_webhook(bot_api) -> None:
+    """Point Telegram at WEBHOOK_URL + WEBHOOK_PATH"""
+    url = config.WEBHOOK_URL.rstrip('/') + config.WEBHOOK_PATH
+    await bot_api.set_webhook(
+        url=url,
+        secret_token=config.WEBHOOK_SECRET or None,
+        allowed_updates=Update.ALL_TYPES
+    )
+    logger.info(f"Webhook set to {url}")
+
+async def run_bot(web_app: web.Application):
+    """
+    Telegram application, analysis workers and background tasks
+    
+    Runs inside the web server's startup/cleanup context, so updates,
+    HTTP endpoints and analyses share one event loop. In webhook mode
+    updates arrive through /webhook; without WEBHOOK_URL the bot polls.
+    """
+    application = build_application()
+    web_app["telegram"] = application
     
-    # Start polling
     await application.initialize()
     await application.start()
+    bot.scheduler.start()
     
-    logger.info("🤖 PROMETHEUS AI ULTRA Bot started!")
+    if not config.WEBHOOK_URL:
+        await application.updater.start_polling()
+    elif not config.WEBHOOK_REGISTERED:
+        await register_webhook(application.bot)
     
-    # Keep running
-    await application.updater.start_polling()
+    # Background refresh of the correlation matrix
+    correlation_task = asyncio.create_task(refresh_correlations())
     
-    # Run Flask app in separate thread
-    import threading
-    flask_thread = threading.Thread(
-        target=lambda: app.run(
-            host='0.0.0.0',
-            port=int(os.environ.get('PORT', 5000)),
-            debug=False,
-            use_reloader=False
-        )
-    )
-    flask_thread.start()
+    logger.info(f"🤖 PROMETHEUS AI ULTRA Bot started ({'webhook' if config.WEBHOOK_URL else 'polling'} mode)")
+    
+    yield
     
-    # Wait for shutdown
-    await asyncio.Event().wait()
+    correlation_task.cancel()
+    await bot.scheduler.stop()
+    if application.updater.running:
+        await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+    analysis_pool.shutdown(wait=False, cancel_futures=True)
+    await cache.close()
+
+async def create_web_app() -> web.Application:
+    """
+    aiohttp application factory
+    
+    Entry point for `python app.py` and for gunicorn's
+    aiohttp.GunicornWebWorker (see gunicorn.conf.py), where every worker
+    process builds its own bot on its own loop.
+    """
+    web_app = web.Application()
+    web_app.add_routes(routes)
+    web_app.cleanup_ctx.append(run_bot)
+    return web_app
 
 if __name__ == '__main__':
     # Check for required environment variables
@@ -517,5 +1040,5 @@ if __name__ == '__main__':
         logger.error("❌ TELEGRAM_TOKEN ve GEMINI_API_KEY environment variables gereklidir!")
         exit(1)
     
-    # Run the bot
-    asyncio.run(main())
+    # Run the bot and HTTP server on one event loop
+    web.run_app(create_web_app(), host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
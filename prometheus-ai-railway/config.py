@@ -10,14 +10,45 @@ class Config:
     BOT_USERNAME = "PrometheusUltraBot"
     ADMIN_IDS = []  # Add admin Telegram IDs if needed
     
+    # Webhook mode (e.g. https://prometheus-ultra-bot.onrender.com); polls when empty
+    WEBHOOK_URL = os.environ.get('WEBHOOK_URL', '')
+    WEBHOOK_PATH = '/webhook'
+    WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET', '')  # Checked on every update
+    WEBHOOK_REGISTERED = False  # Set by gunicorn.conf.py once the master has registered it
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 2))  # gunicorn workers in webhook mode
+    
+    # Outbound Telegram requests (utils/outbox.py); the global rate is split across workers
+    TELEGRAM_GLOBAL_RATE = 30  # Requests per second for the whole bot
+    TELEGRAM_CHAT_RATE = 1.0  # Per private chat, per second
+    TELEGRAM_GROUP_RATE = 20 / 60  # Per group or channel, per second
+    TELEGRAM_CHAT_BURST = 3  # Requests a chat may get back to back
+    TELEGRAM_MAX_RETRIES = 3  # RetryAfter retries per request
+    
     # Analysis settings
     DEFAULT_TIMEFRAMES = ['1h', '4h', '1d', '1w']
     MAX_ASSETS_PER_REQUEST = 5
     
     # Data settings
+    # Cache backend: empty for per-process memory, sqlite:///data/cache.db
+    # on a volume shared by the workers, or redis://host:6379/0
+    CACHE_URL = os.environ.get('CACHE_URL', '')
     CACHE_DURATION = 300  # 5 minutes
+    ANALYSIS_CACHE_SIZE = 512  # Entries per namespace in the memory backend
+    ANALYSIS_CACHE_TTL = 3600  # Entries are keyed per candle; this only bounds memory
+    AI_INSIGHT_TTL = 3600
     REQUEST_TIMEOUT = 30
     
+    # Analysis queue (per worker): concurrent analyses (threads of the
+    # analysis pool), waiting jobs before refusing new ones, and per-user
+    # token buckets (quick=1, risk=1, full=2 tokens) kept in the cache
+    # backend, i.e. shared when CACHE_URL is set
+    ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', 4))
+    ANALYSIS_QUEUE_SIZE = 100
+    USER_TOKENS_PER_MINUTE = 6
+    USER_TOKEN_BURST = 9
+    USER_MAX_PENDING = 3  # Queued or running analyses per user and worker
+    QUEUE_STATUS_INTERVAL = 5  # Seconds between queue position updates
+    
     # Supported assets
     CRYPTO_SYMBOLS = [
         'BTC', 'ETH', 'BNB', 'XRP', 'ADA', 'SOL', 'DOGE', 'DOT', 
@@ -36,11 +67,36 @@ class Config:
     
     # Risk management
     MAX_RISK_PER_TRADE = 0.02  # 2%
+    ACCOUNT_SIZE = 10000
     MIN_RISK_REWARD_RATIO = 2.0
+    CORRELATION_WINDOW = 168  # 7 days of 1h candles
+    CORRELATION_REFRESH = 3600  # Refresh the whole universe once per candle
+    MONTE_CARLO_PATHS = 4000  # Simulated paths per target-probability estimate
+    MONTE_CARLO_HORIZON = 120  # Bars per path (5 days of 1h candles)
+    MONTE_CARLO_METHOD = os.environ.get('MONTE_CARLO_METHOD', 'garch')  # or 'bootstrap'
+    
+    # Portfolio sizing (/portfoy and /api/portfolio)
+    PORTFOLIO_PERIOD = '1mo'
+    PORTFOLIO_TARGET_VOLATILITY = 0.20  # Annualized, for volatility targeting
+    PORTFOLIO_MAX_ASSETS = 50  # API limit; the chat command uses MAX_ASSETS_PER_REQUEST
+    
+    # Final-signal weights/thresholds written by analysis_engine/optimizer.py
+    SIGNAL_PARAMS_FILE = os.environ.get('SIGNAL_PARAMS_FILE', 'signal_params.json')
+    
+    # Per-layer timing of every analysis (exposed at /api/stats)
+    ANALYZER_PROFILING = os.environ.get('ANALYZER_PROFILING', '').lower() in ('1', 'true', 'yes')
     
     # Gemini AI settings
     GEMINI_MODEL = "gemini-1.5-flash"
     MAX_TOKENS = 4000
     TEMPERATURE = 0.7
+    INSIGHT_EDIT_INTERVAL = 1.5  # Seconds between edits of a streaming insight message
+    GEMINI_CONCURRENCY = int(os.environ.get('GEMINI_CONCURRENCY', 4))  # Upper bound; lowered on quota errors
+    GEMINI_TIMEOUT = 30  # Seconds per call, including queueing and retries
+    GEMINI_RETRIES = 2  # Retries on quota errors before the first chunk
+    GEMINI_BREAKER_THRESHOLD = 5  # Consecutive failures that open the circuit
+    GEMINI_BREAKER_RESET = 60  # Seconds before a probe call is let through
+    GEMINI_BATCH_SIZE = 8  # Symbol summaries per batched insight prompt (/tara)
+    GEMINI_ENDPOINT = os.environ.get('GEMINI_ENDPOINT', '')  # utils/fake_gemini.py server, for load tests
 
 config = Config()
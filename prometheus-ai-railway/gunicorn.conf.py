@@ -0,0 +1,44 @@
+"""
+Gunicorn settings for webhook mode
+
+    gunicorn app:create_web_app -c gunicorn.conf.py
+
+Every worker is an aiohttp worker running its own bot, analyzer and
+caches on its own event loop; Telegram spreads webhook updates over them.
+Polling cannot be shared between processes, so without WEBHOOK_URL a
+single worker runs.
+"""
+
+import asyncio
+import os
+
+# Not imported as `config`: gunicorn would read it as its own config setting
+from config import config as bot_config
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = "aiohttp.GunicornWebWorker"
+workers = bot_config.WEB_CONCURRENCY if bot_config.WEBHOOK_URL else 1
+timeout = 120
+graceful_timeout = 30
+
+
+def when_ready(server):
+    """Register the webhook once in the master so the workers skip it"""
+    if not bot_config.WEBHOOK_URL:
+        return
+
+    # Not via app.register_webhook: importing app here would build the
+    # analyzer and clients in the master before the workers fork
+    from telegram import Bot, Update
+
+    async def register():
+        async with Bot(bot_config.TELEGRAM_TOKEN) as bot_api:
+            await bot_api.set_webhook(
+                url=bot_config.WEBHOOK_URL.rstrip('/') + bot_config.WEBHOOK_PATH,
+                secret_token=bot_config.WEBHOOK_SECRET or None,
+                allowed_updates=Update.ALL_TYPES
+            )
+
+    asyncio.run(register())
+    bot_config.WEBHOOK_REGISTERED = True
+    server.log.info("Webhook registered")
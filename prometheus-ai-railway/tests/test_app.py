@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+app = pytest.importorskip("app")
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from analysis_engine.benchmark import synthetic_ohlcv
+from utils.cache import MemoryCache
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    """A bot with its own cache, fed synthetic candles, counting analyses"""
+    frames = {"data": synthetic_ohlcv(300)}
+    fetches, analyses = [], []
+
+    async def fetch_data(symbol, **kwargs):
+        fetches.append(symbol)
+        await asyncio.sleep(0.01)
+        return frames["data"]
+
+    render = app.PrometheusUltraBot._analyze_and_render
+
+    def counted(symbol, price_data, analysis_type):
+        analyses.append((symbol, analysis_type))
+        return render(symbol, price_data, analysis_type)
+
+    monkeypatch.setattr(app.data_client, "fetch_data", fetch_data)
+    monkeypatch.setattr(app.PrometheusUltraBot, "_analyze_and_render", staticmethod(counted))
+    instance = app.PrometheusUltraBot()
+    instance.cache = MemoryCache()
+    instance.frames, instance.fetches, instance.analyses = frames, fetches, analyses
+    return instance
+
+
+def test_identical_requests_share_one_job(bot):
+    async def scenario():
+        return await asyncio.gather(*(bot.get_analysis("BTC", "quick") for _ in range(3)),
+                                    bot.get_analysis("BTC", "risk"))
+
+    entries = asyncio.run(scenario())
+    assert entries[0] is entries[1] is entries[2]
+    assert bot.fetches == ["BTC", "BTC"]
+    assert sorted(bot.analyses) == [("BTC", "quick"), ("BTC", "risk")]
+    assert bot.pending_analyses == {}
+
+
+def test_reports_are_reused_until_a_new_candle(bot):
+    async def scenario():
+        first = await bot.get_analysis("BTC", "full")
+        again = await bot.get_analysis("BTC", "full")
+        bot.frames["data"] = synthetic_ohlcv(301)
+        newer = await bot.get_analysis("BTC", "full")
+        return first, again, newer
+
+    first, again, newer = asyncio.run(scenario())
+    assert again["report"] == first["report"]
+    assert len(bot.fetches) == 3
+    assert bot.analyses == [("BTC", "full"), ("BTC", "full")]
+    assert newer["cached_at"] > first["cached_at"]
+
+
+def test_a_cancelled_waiter_leaves_the_job_running(bot):
+    async def scenario():
+        impatient = asyncio.create_task(bot.get_analysis("ETH", "quick"))
+        patient = asyncio.create_task(bot.get_analysis("ETH", "quick"))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        return await patient, impatient.cancelled()
+
+    entry, cancelled = asyncio.run(scenario())
+    assert cancelled
+    assert entry["report"]
+    assert bot.analyses == [("ETH", "quick")]
+
+
+class _Application:
+    """The parts of telegram.ext.Application the webhook touches"""
+
+    def __init__(self):
+        self.bot = None
+        self.update_queue = asyncio.Queue()
+
+
+async def _request(method, path, telegram=None, **kwargs):
+    """One request against the routes, without starting the bot"""
+    web_app = web.Application()
+    web_app.add_routes(app.routes)
+    web_app["telegram"] = telegram or _Application()
+    async with TestClient(TestServer(web_app)) as client:
+        response = await client.request(method, path, **kwargs)
+        return response.status, await response.json()
+
+
+def test_health_and_stats():
+    status, health = asyncio.run(_request("GET", "/health"))
+    assert status == 200 and health["status"] == "healthy"
+
+    status, stats = asyncio.run(_request("GET", "/api/stats"))
+    assert status == 200
+    assert {"scheduler", "cache", "gemini", "telegram"} <= set(stats)
+
+
+def test_webhook_checks_the_secret_and_queues_updates(monkeypatch):
+    monkeypatch.setattr(app.config, "WEBHOOK_URL", "https://bot.example")
+    monkeypatch.setattr(app.config, "WEBHOOK_SECRET", "s3cret")
+    telegram = _Application()
+    update = {"update_id": 7}
+
+    status, _ = asyncio.run(_request("POST", app.config.WEBHOOK_PATH, telegram, json=update))
+    assert status == 403
+    status, body = asyncio.run(_request(
+        "POST", app.config.WEBHOOK_PATH, telegram, json=update,
+        headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"}
+    ))
+    assert (status, body) == (200, {"status": "ok"})
+    assert telegram.update_queue.get_nowait().update_id == 7
+
+
+@pytest.mark.parametrize("params", [
+    {"symbols": "BTC"},
+    {"symbols": "BTC,ETH", "method": "equal"},
+    {"symbols": "BTC,ETH", "account_size": "-5"},
+    {"symbols": "BTC,ETH", "account_size": "nan"},
+])
+def test_portfolio_api_rejects_bad_parameters(params):
+    status, body = asyncio.run(_request("GET", "/api/portfolio", params=params))
+    assert status == 400 and "error" in body
@@ -0,0 +1,72 @@
+import numpy as np
+
+from analysis_engine.backtester import (
+    FEATURES, SignalBacktester, confidence_scores, risk_levels, signal_features, simulate_trades
+)
+from analysis_engine.benchmark import synthetic_ohlcv
+from analysis_engine.signal_params import DEFAULT_SIGNAL_PARAMS
+
+
+def test_features_use_only_past_bars():
+    data = synthetic_ohlcv(1200, seed=3)
+    features, _ = signal_features(data)
+
+    for end in (400, 777, 1100):
+        prefix, _ = signal_features(data.iloc[:end])
+        np.testing.assert_array_equal(prefix[-1], features[end - 1])
+
+
+def test_reward_risk_rules_are_modelled():
+    features, _ = signal_features(synthetic_ohlcv(3000, seed=1))
+    excellent = features[:, FEATURES.index("rr_excellent")]
+    good = features[:, FEATURES.index("rr_good")]
+
+    assert excellent.any() and good.any()
+    assert not (excellent * good).any()
+
+
+def test_risk_levels_match_the_reward_risk_rules():
+    data = synthetic_ohlcv(3000, seed=1)
+    features, _ = signal_features(data)
+    stop, target = risk_levels(data)
+    close = data['Close'].to_numpy()
+
+    quoted = np.isfinite(target)
+    assert quoted.any() and (stop[quoted] < close[quoted]).all()
+    rr = np.where(quoted, (target - close) / (close - stop), 0.0)
+    np.testing.assert_array_equal(rr >= 3, features[:, FEATURES.index("rr_excellent")] == 1)
+
+
+def test_trades_use_per_signal_levels():
+    close = np.full(20, 100.0)
+    high, low = close + 1, close - 1
+    high[6] = 111                                  # reaches the first trade's target
+    atr = np.full(20, 1.0)
+    entries = np.zeros(20, dtype=bool)
+    entries[[2, 12]] = True
+    stops = np.full(20, np.nan)
+    targets = np.full(20, np.nan)
+    stops[2], targets[2] = 95.0, 110.0
+    stops[12], targets[12] = 101.0, 90.0           # beyond the entry: ATR fallback
+
+    trades = simulate_trades(close, high, low, close, atr, entries, max_bars=5,
+                             stops=stops, targets=targets)
+    assert trades["stop"].tolist() == [95.0, 98.0]
+    assert trades["outcome"].tolist() == ["target", "timeout"]
+    assert trades["exit"][0] == 110.0
+
+
+def test_scores_are_weighted_feature_sums():
+    features, _ = signal_features(synthetic_ohlcv(800, seed=2))
+    weights = DEFAULT_SIGNAL_PARAMS["weights"]
+
+    expected = sum(features[:, i] * weights[name] for i, name in enumerate(FEATURES))
+    np.testing.assert_allclose(confidence_scores(features, weights), expected)
+
+
+def test_run_reports_trade_statistics():
+    result = SignalBacktester(entry_decisions=("BUY", "STRONG_BUY")).run("TEST", synthetic_ohlcv(3000))
+
+    assert result["bars"] == 3000
+    assert result["trades"] > 0
+    assert 0 <= result["hit_rate"] <= 100
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pandas_ta")
+
+from analysis_engine.benchmark import compare, synthetic_ohlcv
+
+
+@pytest.mark.parametrize("bars", [50, 200, 1000])
+def test_synthetic_ohlcv_is_seeded_and_consistent(bars):
+    for seed in range(30):
+        frame = synthetic_ohlcv(bars, seed)
+        assert len(frame) == bars
+        assert (frame["High"] >= frame[["Open", "Close"]].max(axis=1)).all()
+        assert (frame["Low"] <= frame[["Open", "Close"]].min(axis=1)).all()
+        assert frame.equals(synthetic_ohlcv(bars, seed))
+
+
+def test_compare_flags_relative_and_absolute_slowdowns():
+    def case(total, sections):
+        return {"bars": 1000, "analysis_type": "full", "wall_ms": {"median": total}, "sections": sections}
+
+    baseline = {"cases": [case(100.0, {"technical_indicators": 60.0, "fibonacci": 0.5})]}
+    current = {"cases": [case(104.0, {"technical_indicators": 90.0, "fibonacci": 1.5})]}
+
+    regressions = compare(current, baseline)
+    assert [r["section"] for r in regressions] == ["technical_indicators"]
+    assert np.isclose(regressions[0]["ratio"], 1.5)
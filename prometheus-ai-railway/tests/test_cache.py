@@ -0,0 +1,88 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.cache import MemoryCache, SQLiteCache, create_cache, pack, pack_frame, unpack, unpack_frame
+from utils.scheduler import AnalysisScheduler, RateLimited
+
+
+async def _noop(symbol, analysis_type):
+    return symbol
+
+
+def test_frame_round_trip_keeps_index_and_timezone():
+    index = pd.date_range("2024-01-01", periods=5, freq="h", tz="Europe/Istanbul")
+    frame = pd.DataFrame(np.arange(20, dtype=float).reshape(5, 4) * 1.5,
+                         index=index, columns=["Open", "High", "Low", "Close"])
+
+    restored = unpack_frame(pack_frame(frame))
+
+    assert restored.index.equals(frame.index)
+    assert str(restored.index.tz) == "Europe/Istanbul"
+    assert list(restored.columns) == list(frame.columns)
+    np.testing.assert_array_equal(restored.to_numpy(), frame.to_numpy())
+
+
+def test_entries_expire_and_count_hits():
+    async def scenario():
+        cache = MemoryCache()
+        await cache.set("analysis", "a", pack({"x": 1}), ttl=60)
+        await cache.set("analysis", "b", b"gone", ttl=-1)
+        return cache, await cache.get("analysis", "a"), await cache.get("analysis", "b")
+
+    cache, hit, expired = asyncio.run(scenario())
+    assert unpack(hit) == {"x": 1}
+    assert expired is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_sqlite_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def scenario():
+        writer, reader = SQLiteCache(path), create_cache(f"sqlite:///{path}")
+        await writer.set("insights", "k", "text".encode(), ttl=60)
+        value = await reader.get("insights", "k")
+        await writer.close()
+        await reader.close()
+        return value
+
+    assert asyncio.run(scenario()) == b"text"
+
+
+def test_token_buckets_are_shared_through_the_cache(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def scenario():
+        workers = [AnalysisScheduler(_noop, tokens_per_minute=6, burst=2, max_pending=10,
+                                     cache=SQLiteCache(path)) for _ in range(2)]
+        for scheduler in workers:
+            scheduler.start()
+        await workers[0].submit(7, "BTC", "full")        # 2 tokens: the whole burst
+        with pytest.raises(RateLimited) as limited:
+            await workers[1].submit(7, "ETH", "quick")
+        await workers[1].submit(8, "ETH", "quick")       # Other users are unaffected
+        for scheduler in workers:
+            await scheduler.stop()
+        return limited.value.retry_after
+
+    assert 5 < asyncio.run(scenario()) <= 10
+
+
+def test_add_claims_a_key_once_until_it_expires(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def scenario():
+        outcomes = []
+        for first, second in ((MemoryCache(),) * 2, (SQLiteCache(path), SQLiteCache(path))):
+            outcomes.append([
+                await first.add("locks", "job", b"", ttl=0.05),
+                await second.add("locks", "job", b"", ttl=0.05),
+            ])
+            await asyncio.sleep(0.1)
+            outcomes[-1].append(await second.add("locks", "job", b"", ttl=0.05))
+        return outcomes
+
+    assert asyncio.run(scenario()) == [[True, False, True], [True, False, True]]
@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pandas_ta")
+
+from analysis_engine.benchmark import synthetic_ohlcv
+from analysis_engine.comprehensive_analyzer import ANALYSIS_LAYERS, ComprehensiveAnalyzer
+from analysis_engine.ohlcv import OHLCV
+
+
+@pytest.mark.parametrize("analysis_type", ["full", "quick", "risk"])
+def test_analyze_runs_on_synthetic_ohlcv(analysis_type):
+    result = ComprehensiveAnalyzer().analyze("TEST", synthetic_ohlcv(500), analysis_type)
+
+    assert result.symbol == "TEST"
+    assert result.analysis_type == analysis_type
+    assert result.current_price > 0
+    assert result.signal.decision
+    volume = result.layers["technical_indicators"]["volume"]
+    assert np.isfinite(volume["mfi"]["value"])
+    assert np.isfinite(volume["vwap"]["value"])
+    ran = {name for name in ANALYSIS_LAYERS["full"] if name in result.layers}
+    assert ran == set(ANALYSIS_LAYERS[analysis_type])
+
+
+def _comparable(result):
+    result.timestamp = result.signal.next_review = 0
+    result.timings = {}
+    result.layers.get("fundamental_analysis", {}).get("general", {}).pop("analysis_time", None)
+    return result.to_bytes()
+
+
+def test_concurrent_analyses_match_sequential():
+    jobs = [(f"S{seed}", synthetic_ohlcv(400, seed=seed), analysis_type)
+            for seed in range(4) for analysis_type in ("full", "quick", "risk")]
+
+    sequential = ComprehensiveAnalyzer(profile=True)
+    expected = [_comparable(sequential.analyze(*job)) for job in jobs]
+
+    concurrent = ComprehensiveAnalyzer(profile=True)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda job: concurrent.analyze(*job), jobs))
+
+    assert [_comparable(result) for result in results] == expected
+    assert concurrent.indicators_calculated == sequential.indicators_calculated
+    assert concurrent.timing_stats()["analyses_profiled"] == len(jobs)
+
+
+@pytest.mark.parametrize("analysis_type", ["full", "quick", "risk"])
+def test_array_entry_point_matches_dataframe(analysis_type):
+    data = synthetic_ohlcv(600, seed=5)
+    bars = OHLCV(*(data[c].to_numpy() for c in ("Open", "High", "Low", "Close", "Volume")),
+                 timestamps=data.index.as_unit("ns").asi8)
+
+    expected = ComprehensiveAnalyzer().analyze("TEST", data, analysis_type)
+    result = ComprehensiveAnalyzer().analyze_arrays("TEST", bars, analysis_type)
+
+    assert _comparable(result) == _comparable(expected)
+
+
+def test_flat_prices_size_no_position():
+    data = synthetic_ohlcv(300)
+    data[["Open", "High", "Low", "Close"]] = 100.0
+    result = ComprehensiveAnalyzer().analyze("FLAT", data, "risk")
+    assert result.risk.position_value == 0
+    assert result.risk.stop_percent == 0
+
+    sizing = ComprehensiveAnalyzer()._calculate_position_sizing(100.0, 100.0, 0.0)
+    assert sizing["position_size_units"] == 0 and sizing["position_value"] == 0
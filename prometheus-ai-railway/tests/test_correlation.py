@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from analysis_engine.correlation import CorrelationMatrix
+
+HOUR = 3600 * 10**9
+
+
+def _universe(bars=600, seed=5):
+    """Hourly closes of three related assets; STOCK misses its off-hours bars"""
+    rng = np.random.default_rng(seed)
+    market = 0.01 * rng.standard_normal(bars)
+    returns = {
+        "BTC": market + 0.004 * rng.standard_normal(bars),
+        "ETH": 1.3 * market + 0.008 * rng.standard_normal(bars),
+        "STOCK": -0.5 * market + 0.01 * rng.standard_normal(bars),
+    }
+    timestamps = np.arange(bars, dtype=np.int64) * HOUR
+    series = {}
+    for symbol, r in returns.items():
+        closes = 100 * np.exp(np.cumsum(r))
+        keep = np.ones(bars, dtype=bool)
+        if symbol == "STOCK":
+            keep = (np.arange(bars) % 24) < 8
+        series[symbol] = (timestamps[keep], closes[keep])
+    return series
+
+
+def _expected(series, upto, window, min_periods):
+    returns = {}
+    for symbol, (ts, closes) in series.items():
+        seen = ts <= upto
+        returns[symbol] = pd.Series(np.diff(np.log(closes[seen])), index=ts[seen][1:])
+    frame = pd.DataFrame(returns).sort_index().iloc[-window:]
+    return frame.corr(min_periods=min_periods)
+
+
+def test_incremental_updates_match_pandas_pairwise_correlation():
+    series = _universe()
+    matrix = CorrelationMatrix(["BTC", "ETH", "STOCK"], window=168, min_periods=30)
+
+    # Every refresh sees the last 200 bars, as the data client serves them
+    for end in range(100, 600, 37):
+        upto = end * HOUR
+        for symbol, (ts, closes) in series.items():
+            seen = ts <= upto
+            matrix.update(symbol, ts[seen][-200:], closes[seen][-200:])
+
+        expected = _expected(series, upto, 168, 30)
+        np.testing.assert_allclose(matrix.matrix(), expected.to_numpy(), atol=1e-9)
+
+
+def test_correlations_skip_symbols_without_enough_shared_bars():
+    series = _universe(bars=100)
+    matrix = CorrelationMatrix(["BTC", "ETH", "STOCK"], window=168, min_periods=40)
+    for symbol, (ts, closes) in series.items():
+        matrix.update(symbol, ts, closes)
+
+    btc = matrix.correlations("BTC")
+    assert set(btc) == {"ETH"}           # STOCK shares only 35 bars with BTC
+    assert btc["ETH"]["correlation"] > 0.5
+    assert btc["ETH"]["observations"] == 99
+    assert matrix.most_correlated("btc")[0]["symbol"] == "ETH"
+    assert matrix.correlations("UNKNOWN") == {}
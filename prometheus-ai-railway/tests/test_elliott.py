@@ -0,0 +1,53 @@
+from analysis_engine.benchmark import synthetic_ohlcv
+from analysis_engine.elliott import IMPULSE, ZIGZAG, ElliottWaveCounter, WaveCount, _passes_rules
+from analysis_engine.swing_detector import zigzag
+
+
+def _swings(data):
+    swings = zigzag(data['High'].to_numpy(), data['Low'].to_numpy(), data['Close'].to_numpy())
+    return data.index.asi8[swings["index"]], swings["price"], swings["kind"]
+
+
+def test_textbook_impulse_then_zigzag():
+    prices = [100, 120, 108, 150, 138, 160, 145, 152, 130]
+    kinds = [-1, 1, -1, 1, -1, 1, -1, 1, -1]
+    counter = ElliottWaveCounter()
+
+    counter.update(range(6), prices[:6], kinds[:6])
+    assert counter.summary(158)["wave_count"] == IMPULSE
+
+    counter.update(range(9), prices, kinds)
+    summary = counter.summary(131)
+    assert summary["wave_count"] == ZIGZAG
+    assert summary["current_wave"] == "complete"
+
+
+def test_hard_rules():
+    # Wave 2 retracing all of wave 1
+    assert not _passes_rules(WaveCount(IMPULSE, 1, ((0, 100), (1, 120), (2, 99))))
+    # Wave 4 entering wave 1
+    assert not _passes_rules(WaveCount(IMPULSE, 1, ((0, 100), (1, 120), (2, 110), (3, 150), (4, 119))))
+    # Wave 3 the shortest
+    assert not _passes_rules(WaveCount(IMPULSE, 1, ((0, 100), (1, 130), (2, 120), (3, 140), (4, 135), (5, 170))))
+    assert _passes_rules(WaveCount(IMPULSE, 1, ((0, 100), (1, 120), (2, 110), (3, 150), (4, 135), (5, 160))))
+
+
+def test_incremental_counts_match_rebuild():
+    data = synthetic_ohlcv(2500, seed=3)
+    counter = ElliottWaveCounter()
+    replayed = 0
+
+    for end in range(300, len(data), 7):
+        keys, prices, kinds = _swings(data.iloc[end - 300:end])
+        replayed += counter.update(keys, prices, kinds)
+
+        fresh = ElliottWaveCounter()
+        fresh.update(keys, prices, kinds)
+        assert sorted(counter._open) == sorted(fresh._open), end
+        assert sorted(counter._done) == sorted(fresh._done), end
+        current = float(data['Close'].iloc[end - 1])
+        assert counter.summary(current) == fresh.summary(current), end
+
+    # Sliding windows replay the changed tail, not the whole window
+    updates = len(range(300, len(data), 7))
+    assert replayed < updates * fresh.max_pivots / 2
@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.governor import AIGovernor, CircuitBreaker, CircuitOpen
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+def _stream(*chunks, fail_first=0, delay=0.0):
+    """Model call factory: `fail_first` quota errors, then the chunks"""
+    calls = {"count": 0}
+
+    async def call():
+        calls["count"] += 1
+        if calls["count"] <= fail_first:
+            raise QuotaError("Resource has been exhausted")
+
+        async def response():
+            for chunk in chunks:
+                await asyncio.sleep(delay)
+                yield chunk
+        return response()
+    return call
+
+
+async def _collect(governor, call):
+    return [chunk async for chunk in governor.stream(call)]
+
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker(threshold=2, reset_after=0.05)
+    breaker.check()
+    breaker.failure()
+    breaker.check()
+    breaker.failure()
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+    time.sleep(0.06)
+    breaker.check()                 # The single half-open probe
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(threshold=1, reset_after=0.01)
+    breaker.failure()
+    time.sleep(0.02)
+    breaker.check()
+    breaker.failure()
+    assert breaker.state == "open"
+
+
+def test_quota_errors_halve_the_limit_and_successes_raise_it():
+    governor = AIGovernor(max_concurrency=8, retries=2, backoff=0.001)
+
+    chunks = asyncio.run(_collect(governor, _stream("a", "b", fail_first=2)))
+
+    assert chunks == ["a", "b"]
+    assert governor.retried == 2
+    assert 2 <= governor.limit < 3          # 8 -> 4 -> 2, then + 1/2
+    for _ in range(20):
+        asyncio.run(_collect(governor, _stream("c")))
+    assert 5 <= governor.limit <= 8
+    assert governor.breaker.state == "closed"
+
+
+def test_exhausted_retries_count_as_failure():
+    governor = AIGovernor(retries=1, backoff=0.001, failure_threshold=1)
+
+    with pytest.raises(QuotaError):
+        asyncio.run(_collect(governor, _stream("a", fail_first=5)))
+    assert governor.failed == 1
+    assert governor.breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        asyncio.run(_collect(governor, _stream("a")))
+    assert governor.refused == 1
+
+
+def test_model_timeout_counts_against_breaker():
+    governor = AIGovernor(timeout=0.05, failure_threshold=1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(_collect(governor, _stream("a", delay=1)))
+    assert governor.timeouts == 1
+    assert governor.breaker.state == "open"
+
+
+def test_waiting_for_a_slot_does_not_count_against_breaker():
+    async def scenario():
+        governor = AIGovernor(max_concurrency=1, timeout=0.05, failure_threshold=1)
+        await governor._acquire(1)              # Another call holds the only slot
+        with pytest.raises(asyncio.TimeoutError):
+            await _collect(governor, _stream("a"))
+        return governor
+
+    governor = asyncio.run(scenario())
+    assert governor.timeouts == 1
+    assert governor.breaker.state == "closed" and governor.breaker.failures == 0
+    assert governor.waiting == 0
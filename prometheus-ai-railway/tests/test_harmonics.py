@@ -0,0 +1,55 @@
+import numpy as np
+
+from analysis_engine.harmonics import leg_ratios, scan_harmonics
+from analysis_engine.swing_detector import HIGH, LOW
+
+# Textbook bullish Gartley: B at 0.618 XA, C at 0.618 AB, D at 0.786 XA
+X, A = 100.0, 200.0
+B = A - 0.618 * (A - X)
+C = B + 0.618 * (A - B)
+D = A - 0.786 * (A - X)
+
+
+def _swings(prices, first_kind=LOW):
+    kinds = [first_kind * (-1) ** i for i in range(len(prices))]
+    return {"index": np.arange(len(prices)) * 10, "price": np.array(prices),
+            "kind": np.array(kinds, dtype=np.int8)}
+
+
+def test_leg_ratios_are_mirror_invariant():
+    points = np.array([[X, A, B, C, D]])
+    ratios = leg_ratios(points)
+    np.testing.assert_allclose(leg_ratios(300 - points), ratios)
+    np.testing.assert_allclose(ratios[0, :4], [0.618, 0.618, (C - D) / (C - B), 0.786])
+    assert np.isnan(leg_ratios(points[:, :4])[0, 2])
+
+
+def _completed(swings, current_price):
+    return [p for p in scan_harmonics(swings, current_price, 50) if p["status"] == "completed"]
+
+
+def test_completed_gartley_in_both_directions():
+    bullish = _completed(_swings([X, A, B, C, D]), D + 1)
+    assert [(p["name"], p["status"], p["direction"]) for p in bullish] == [
+        ("Gartley", "completed", "bullish")]
+    assert bullish[0]["score"] == 1.0
+    assert bullish[0]["bars_since_completion"] == 50 - 1 - 40
+    assert bullish[0]["points"]["D"] == {"index": 40, "price": D}
+
+    mirrored = [300 - p for p in (X, A, B, C, D)]
+    bearish = _completed(_swings(mirrored, HIGH), 300 - D - 1)
+    assert [(p["name"], p["direction"]) for p in bearish] == [("Gartley", "bearish")]
+
+
+def test_forming_pattern_reports_completion_zone():
+    swings = _swings([X, A, B, C])
+    forming = {p["name"]: p for p in scan_harmonics(swings, D, 40)}
+    assert set(forming) == {"Gartley", "Crab"}
+    gartley = forming["Gartley"]
+    assert gartley["status"] == "forming"
+    assert gartley["completion_zone"]["low"] < D < gartley["completion_zone"]["high"]
+    assert gartley["in_completion_zone"]
+
+    # Price moving away from D, or far through the zone, is no pattern
+    assert scan_harmonics(swings, C + 1, 40) == []
+    assert "Gartley" not in {p["name"] for p in scan_harmonics(swings, X - 20, 40)}
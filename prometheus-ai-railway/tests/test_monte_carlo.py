@@ -0,0 +1,63 @@
+import numpy as np
+
+from analysis_engine.monte_carlo import (
+    first_passage, garch_filter, simulate_log_paths, target_probabilities
+)
+
+
+def _close(returns, start=100.0):
+    return start * np.exp(np.concatenate(([0.0], np.cumsum(returns))))
+
+
+def test_first_passage_bars():
+    paths = np.array([[0.01, 0.03, 0.02, 0.05],
+                      [-0.01, -0.02, -0.04, 0.00]])
+    assert first_passage(paths, np.array([0.02, 0.05]), upper=True).tolist() == [[1, 3], [4, 4]]
+    assert first_passage(paths, np.array([-0.03]), upper=False).tolist() == [[4], [2]]
+
+
+def test_garch_filter_recursion():
+    returns = np.array([0.01, -0.03, 0.02, 0.0])
+    variance = garch_filter(returns, 0.1, 0.8)
+    assert len(variance) == 5 and variance[0] == returns.var()
+    omega = returns.var() * 0.1
+    assert np.isclose(variance[2], omega + 0.1 * 0.03 ** 2 + 0.8 * variance[1])
+
+
+def test_symmetric_returns_give_even_odds():
+    rng = np.random.default_rng(0)
+    half = 0.01 * rng.standard_normal(500)
+    close = _close(rng.permutation(np.concatenate((half, -half))))
+    current = close[-1]
+    up, down = current * np.exp(0.05), current * np.exp(-0.05)
+
+    result = target_probabilities(close, [up], down, horizon=400, paths=4000,
+                                  method="bootstrap", seed=1)
+    target = result["targets"][0]
+    assert abs(target["hit_probability"] - 0.5) < 0.04
+    assert abs(target["hit_probability"] + target["stop_first_probability"] - 1) < 0.02
+    # The stop may still be hit after the target
+    assert target["stop_first_probability"] < result["stop_probability"]
+    assert target["expected_bars"] > 1
+    assert result == target_probabilities(close, [up], down, horizon=400, paths=4000,
+                                          method="bootstrap", seed=1)
+
+
+def test_garch_paths_carry_current_volatility():
+    rng = np.random.default_rng(2)
+    calm_end = 0.01 * rng.standard_normal(1000)
+    calm_end[-20:] *= 0.2
+    wild_end = calm_end.copy()
+    wild_end[-20:] *= 25
+
+    spread = {}
+    for name, returns in (("calm", calm_end), ("wild", wild_end)):
+        paths = simulate_log_paths(returns, 5, 3000, "garch", np.random.default_rng(3))
+        assert paths.shape == (3000, 5)
+        spread[name] = paths[:, -1].std()
+    assert spread["wild"] > 2 * spread["calm"]
+
+
+def test_rejected_inputs():
+    assert "error" in target_probabilities(_close(np.zeros(10)), [101], 99)
+    assert "error" in target_probabilities(_close(np.full(100, 0.001)), [101], 99, method="normal")
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from analysis_engine.ohlcv import OHLCV
+
+
+def _session_bars(days=40):
+    """Hourly stock bars: 7 a day on weekdays, with overnight and weekend gaps"""
+    sessions = pd.bdate_range("2024-01-01", periods=days)
+    index = pd.DatetimeIndex([day + pd.Timedelta(hours=14 + h) for day in sessions for h in range(7)])
+    close = np.linspace(100, 110, len(index))
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": np.ones(len(index))}, index=index)
+
+
+def test_interval_ignores_session_and_weekend_gaps():
+    data = _session_bars()
+    intervals = {OHLCV.from_frame(data.iloc[:end]).interval_seconds for end in range(8, len(data) + 1)}
+    assert intervals == {3600}
+
+
+def test_untimed_and_short_series_have_no_interval():
+    close = np.arange(5.0)
+    assert OHLCV(close, close, close, close).interval_seconds == 0
+    assert OHLCV.from_frame(_session_bars().iloc[:1]).interval_seconds == 0
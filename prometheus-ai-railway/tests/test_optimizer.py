@@ -0,0 +1,77 @@
+import json
+
+import numpy as np
+import pytest
+
+from analysis_engine.benchmark import synthetic_ohlcv
+from analysis_engine.optimizer import (
+    SharedPriceArrays, WalkForwardOptimizer, sample_candidates, walk_forward_blocks
+)
+from analysis_engine.signal_params import DEFAULT_SIGNAL_PARAMS, load_signal_params, save_signal_params
+
+
+def test_walk_forward_blocks_cover_the_bars_after_warmup():
+    blocks = walk_forward_blocks(1000, 200, 4)
+    assert blocks == [(200, 400), (400, 600), (600, 800), (800, 1000)]
+
+
+def test_candidates_are_seeded_and_keep_bands_ordered():
+    candidates = sample_candidates(50, seed=7)
+    assert candidates[0] is DEFAULT_SIGNAL_PARAMS
+    assert candidates == sample_candidates(50, seed=7)
+    for params in candidates[1:]:
+        bands = [params["thresholds"][label] for label in ("STRONG_BUY", "BUY", "HOLD", "SELL")]
+        assert all(a - b >= 5 for a, b in zip(bands, bands[1:]))
+        assert 65 <= params["rsi_overbought"] <= 80 and 20 <= params["rsi_oversold"] <= 35
+        assert params["weights"]["strong_trend"] == DEFAULT_SIGNAL_PARAMS["weights"]["strong_trend"]
+
+
+def test_shared_arrays_attach_read_only():
+    source = {"BTC": {"close": np.arange(5.0), "features": np.ones((3, 2))}}
+    shared = SharedPriceArrays.create(source)
+    try:
+        attached = SharedPriceArrays.attach(shared.shm.name, shared.layout)
+        np.testing.assert_array_equal(attached.arrays["BTC"]["features"], np.ones((3, 2)))
+        with pytest.raises(ValueError):
+            attached.arrays["BTC"]["close"][0] = 1.0
+        shared.arrays["BTC"]["close"][0] = 9.0
+        assert attached.arrays["BTC"]["close"][0] == 9.0
+        attached.close()
+    finally:
+        shared.close()
+
+
+def test_process_pool_matches_serial_evaluation():
+    datasets = {f"S{seed}": synthetic_ohlcv(900, seed=seed) for seed in range(2)}
+    settings = dict(candidates=12, folds=2, seed=3, min_trades=1,
+                    entry_decisions=("STRONG_BUY", "BUY"), warmup=200)
+
+    serial = WalkForwardOptimizer(workers=1, **settings).run(datasets)
+    pooled = WalkForwardOptimizer(workers=2, **settings).run(datasets)
+
+    assert pooled == serial
+    assert [fold["fold"] for fold in serial["walk_forward"]] == [1, 2]
+    assert serial["symbols"] == ["S0", "S1"]
+    assert serial["out_of_sample"]["trades"] > 0
+
+
+def test_signal_params_round_trip(tmp_path):
+    path = tmp_path / "params.json"
+    params = sample_candidates(2, seed=1)[1]
+    save_signal_params(params, str(path), metadata={"seed": 1})
+    loaded = load_signal_params(str(path))
+    assert {k: loaded[k] for k in params} == params
+    assert load_signal_params(str(tmp_path / "missing.json")) == DEFAULT_SIGNAL_PARAMS
+
+
+@pytest.mark.parametrize("stored", [
+    {"weights": {"golden_cross": "strong"}},
+    {"thresholds": {"BUY": None}},
+    {"rsi_oversold": "NaN"},
+    {"weights": ["golden_cross", 30]},
+    ["not", "an", "object"],
+])
+def test_bad_signal_params_fall_back_to_defaults(tmp_path, stored):
+    path = tmp_path / "params.json"
+    path.write_text(json.dumps(stored))
+    assert load_signal_params(str(path)) == DEFAULT_SIGNAL_PARAMS
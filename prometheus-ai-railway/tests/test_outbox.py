@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("telegram")
+
+from telegram.error import RetryAfter
+
+from utils.outbox import Outbox
+
+
+class _Api:
+    """Bot API stand-in; calls block until the gate opens and log their text"""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.flood = 0
+
+    def endpoint(self, text):
+        async def call():
+            await self.gate.wait()
+            if self.flood:
+                self.flood -= 1
+                raise RetryAfter(0)
+            self.calls.append(text)
+            return text
+        return call
+
+
+async def _send(outbox, api, endpoint, text, **data):
+    return await outbox.process_request(api.endpoint(text), (), {}, endpoint, data, None)
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_queued_edits_of_one_message_merge():
+    async def scenario():
+        api = _Api()
+        outbox = Outbox(global_rate=1000, chat_rate=1000, burst=100)
+        await outbox.initialize()
+        api.gate.clear()
+        first = asyncio.create_task(_send(outbox, api, "sendMessage", "report", chat_id=1))
+        await _settle()
+        edits = [asyncio.create_task(_send(outbox, api, "editMessageText", f"part {i}",
+                                           chat_id=1, message_id=7))
+                 for i in range(3)]
+        other = asyncio.create_task(_send(outbox, api, "editMessageText", "other",
+                                          chat_id=1, message_id=8))
+        await _settle()
+        queued = outbox.stats()
+        api.gate.set()
+        results = await asyncio.gather(first, *edits, other)
+        await outbox.shutdown()
+        return queued, results, api.calls, outbox.stats()
+
+    queued, results, calls, stats = asyncio.run(scenario())
+    assert queued["queued"] == 2 and queued["in_flight"] == 1
+    # Superseded callers get the result of the edit that replaced theirs
+    assert results == ["report", "part 2", "part 2", "part 2", "other"]
+    assert calls == ["report", "part 2", "other"]
+    assert stats["merged"] == 2
+    assert stats["sent"] == 3
+    assert stats["queued"] == 0
+
+
+def test_edits_of_different_chats_do_not_merge():
+    async def scenario():
+        api = _Api()
+        outbox = Outbox(global_rate=1000, chat_rate=1000, burst=100)
+        await outbox.initialize()
+        results = await asyncio.gather(*(
+            _send(outbox, api, "editMessageText", f"chat {chat}", chat_id=chat, message_id=7)
+            for chat in (1, 2)
+        ))
+        await outbox.shutdown()
+        return results, outbox.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == ["chat 1", "chat 2"]
+    assert stats["merged"] == 0
+    assert stats["sent"] == 2
+
+
+def test_flood_control_pauses_and_retries():
+    async def scenario():
+        api = _Api()
+        api.flood = 1
+        outbox = Outbox(global_rate=1000, chat_rate=1000, burst=100)
+        await outbox.initialize()
+        result = await asyncio.wait_for(_send(outbox, api, "sendMessage", "hello", chat_id=1), 2)
+
+        api.flood = 5
+        with pytest.raises(RetryAfter):
+            await asyncio.wait_for(outbox.process_request(
+                api.endpoint("dropped"), (), {}, "sendMessage", {"chat_id": 1}, 1), 2)
+        await outbox.shutdown()
+        return result, outbox.stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result == "hello"
+    assert stats["retried"] == 2
+    assert stats["failed"] == 1
+    assert stats["sent"] == 1
+
+
+def test_chat_rate_paces_one_chat_but_not_others():
+    async def scenario():
+        api = _Api()
+        loop = asyncio.get_running_loop()
+        outbox = Outbox(global_rate=1000, chat_rate=20, burst=1)
+        await outbox.initialize()
+        finished = {}
+
+        async def send(chat, text):
+            await _send(outbox, api, "sendMessage", text, chat_id=chat)
+            finished[text] = loop.time()
+
+        started = loop.time()
+        await asyncio.gather(*(send(1, f"a{i}") for i in range(4)), send(2, "b0"))
+        await outbox.shutdown()
+        return {text: at - started for text, at in finished.items()}, api.calls
+
+    finished, calls = asyncio.run(scenario())
+    assert [c for c in calls if c.startswith("a")] == ["a0", "a1", "a2", "a3"]
+    assert finished["a3"] >= 0.14          # 3 refills at 20/s
+    assert finished["b0"] < 0.05
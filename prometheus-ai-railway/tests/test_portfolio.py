@@ -0,0 +1,67 @@
+import numpy as np
+
+from analysis_engine.benchmark import synthetic_ohlcv
+from analysis_engine.portfolio import pairwise_covariance, return_matrix, risk_parity_weights, size_portfolio
+
+
+def test_risk_parity_equalizes_risk_contributions():
+    rng = np.random.default_rng(0)
+    returns = rng.standard_normal((500, 4)) * np.array([0.01, 0.02, 0.03, 0.05])
+    cov, _ = pairwise_covariance(returns)
+    weights = risk_parity_weights(cov)
+
+    contributions = weights * (cov @ weights)
+    assert np.isclose(weights.sum(), 1.0)
+    np.testing.assert_allclose(contributions / contributions.sum(), 0.25, atol=1e-6)
+
+
+def test_pairwise_covariance_skips_missing_bars():
+    rng = np.random.default_rng(1)
+    returns = rng.standard_normal((300, 3)) * 0.01
+    returns[::3, 2] = np.nan
+    cov, count = pairwise_covariance(returns)
+
+    assert count[0, 1] == 300 and count[0, 2] == 200
+    assert np.all(np.linalg.eigvalsh(cov) >= -1e-12)
+
+
+def test_size_portfolio_stays_within_account():
+    frames = {f"S{i}": synthetic_ohlcv(720, seed=i) for i in range(4)}
+    frames["EMPTY"] = synthetic_ohlcv(10)
+
+    for method in ("risk_parity", "volatility_target"):
+        result = size_portfolio(frames, method=method, account_size=10000)
+        assert result["skipped"] == ["EMPTY"]
+        assert {p["symbol"] for p in result["positions"]} == {"S0", "S1", "S2", "S3"}
+        assert result["invested_percent"] <= 100 + 1e-6
+        assert all(p["risk_percent"] <= 2 + 1e-6 for p in result["positions"])
+
+    assert "error" in size_portfolio(frames, method="kelly")
+
+
+def test_naive_utc_and_tz_aware_frames_align():
+    crypto = synthetic_ohlcv(720, seed=1)                    # ccxt: naive UTC
+    stock = synthetic_ohlcv(720, seed=2)
+    stock.index = stock.index.tz_localize("UTC").tz_convert("America/New_York")
+    stock = stock[stock.index.hour.isin(range(10, 16))]     # yfinance: exchange time, session only
+
+    symbols, returns = return_matrix({"BTC": crypto, "AAPL": stock})
+    assert symbols == ["BTC", "AAPL"]
+    assert len(returns) == 719                                # one row per UTC bar
+    assert np.isfinite(returns[:, 1]).sum() == len(stock) - 1
+
+    result = size_portfolio({"BTC": crypto, "AAPL": stock, "ETH": synthetic_ohlcv(720, seed=3)})
+    assert {p["symbol"] for p in result["positions"]} == {"BTC", "AAPL", "ETH"}
+
+
+def test_annualization_ignores_a_trailing_weekend_gap():
+    frames = {f"S{i}": synthetic_ohlcv(720, seed=i) for i in range(3)}
+    expected = size_portfolio(frames, method="volatility_target")
+
+    # The same bars, with the last one arriving after a weekend
+    for frame in frames.values():
+        frame.index = frame.index[:-1].append(frame.index[-1:] + np.timedelta64(48, "h"))
+    result = size_portfolio(frames, method="volatility_target")
+
+    assert np.isclose(result["portfolio_volatility"], expected["portfolio_volatility"])
+    assert result["positions"] == expected["positions"]
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from analysis_engine.profiling import LayerTimer
+
+
+def test_nested_sections_and_stats():
+    timer = LayerTimer(enabled=True, history=2)
+    for _ in range(3):
+        timer.begin()
+        with timer.section("technical"):
+            timer.call("rsi", time.sleep, 0.002)
+            timer.call("rsi", time.sleep, 0.002)
+        with timer.section("risk"):
+            pass
+        timings = timer.end()
+
+    assert set(timings) == {"technical", "technical/rsi", "risk"}
+    assert timings["technical/rsi"]["calls"] == 2
+    assert timings["technical/rsi"]["wall_ms"] >= 4
+    assert timings["technical"]["wall_ms"] >= timings["technical/rsi"]["wall_ms"]
+    # Sleeping is wall time, not CPU time
+    assert timings["technical/rsi"]["cpu_ms"] < timings["technical/rsi"]["wall_ms"]
+
+    stats = timer.stats()
+    assert list(stats)[0] == "technical"
+    assert stats["technical"]["samples"] == 2
+    assert timer.analyses == 3
+    timer.reset()
+    assert timer.stats() == {} and timer.analyses == 0
+
+
+def test_disabled_timer_is_a_pass_through():
+    timer = LayerTimer()
+    timer.begin()
+    with timer.section("technical"):
+        assert timer.call("sum", sum, [1, 2]) == 3
+    assert timer.end() == {}
+    assert timer.stats() == {}
+
+
+def test_threads_keep_their_own_sections():
+    timer = LayerTimer(enabled=True)
+    barrier = threading.Barrier(2)
+    results = {}
+
+    def analysis(name):
+        timer.begin()
+        with timer.section(name):
+            barrier.wait()
+            timer.call("inner", barrier.wait)
+        results[name] = timer.end()
+
+    threads = [threading.Thread(target=analysis, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(results["a"]) == {"a", "a/inner"}
+    assert set(results["b"]) == {"b", "b/inner"}
+    assert timer.analyses == 2
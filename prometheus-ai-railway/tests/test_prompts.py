@@ -0,0 +1,81 @@
+from analysis_engine.result_model import AnalysisResult, FinalSignal, RiskSummary, Target, TechnicalSummary
+from utils.prompts import (
+    build_batch_prompt, build_insight_prompt, encode_summary, fingerprint, split_batch_response
+)
+
+
+def _result(analysis_type="full", layers=("technical_indicators", "market_structure", "risk_management"),
+            price=43012.345, timestamp=1700000000.0) -> AnalysisResult:
+    available = {
+        "technical_indicators": {},
+        "market_structure": {"market_regime": "trending", "wyckoff_analysis": {"phase": "markup"}},
+        "sentiment_analysis": {"score": 0.4213},
+        "risk_management": {},
+    }
+    return AnalysisResult(
+        symbol="BTC",
+        analysis_type=analysis_type,
+        timestamp=timestamp,
+        current_price=price,
+        price_change_24h=2.345,
+        technical=TechnicalSummary(rsi=61.7, rsi_signal="neutral", macd_signal="bullish",
+                                   golden_cross=True, market_trend="uptrend", sentiment="GREED"),
+        risk=RiskSummary(atr_percent=1.84, stop_loss_levels={"technical": 42100.0}, best_rr_ratio=2.44,
+                         best_target=Target("Resistance", 44650.0, 3.81, 41.6, 23.2),
+                         var_95=2.71, cvar_95=3.9),
+        signal=FinalSignal(decision="BUY", confidence_score=34.6, signals=["MACD bullish crossover"]),
+        layers={name: available[name] for name in layers},
+    )
+
+
+def test_full_summary_is_compact_and_rounded():
+    summary = encode_summary(_result(layers=("technical_indicators", "market_structure",
+                                             "sentiment_analysis", "risk_management")))
+    assert summary.splitlines() == [
+        "sym=BTC type=full px=43010 chg24h=2.3",
+        "signal=BUY conf=35 risk=MEDIUM horizon=SHORT_TERM",
+        "rsi=62/neutral macd=bullish cross=golden adx=weak patterns=0 fib=- sentiment=GREED/0.42",
+        "trend=uptrend regime=trending phase=markup",
+        "atr=1.8 stop=42100(-2.1) target=Resistance:44650(3.8) p_hit=42 bars=23 rr=2.4",
+        "var95=2.7 cvar95=3.9 mdd=0.0 position=0 stop_pct=0.0",
+        "signals=MACD bullish crossover",
+    ]
+    assert build_insight_prompt(summary).endswith(summary)
+
+
+def test_layers_that_did_not_run_are_left_out():
+    quick = encode_summary(_result("quick", ("technical_indicators", "market_structure")))
+    assert "trend=uptrend" in quick and "rsi=62" in quick
+    assert "stop=" not in quick and "var95=" not in quick and "sentiment=" not in quick
+
+    risk = encode_summary(_result("risk", ("technical_indicators", "risk_management")))
+    assert "var95=2.7" in risk and "regime=" not in risk
+
+
+def test_fingerprint_ignores_time_and_price_noise():
+    base = fingerprint(encode_summary(_result()))
+    assert fingerprint(encode_summary(_result(price=43012.9, timestamp=1700003600.0))) == base
+    assert fingerprint(encode_summary(_result(price=43100.0))) != base
+
+
+def test_batch_prompt_lists_every_summary_in_order():
+    prompt = build_batch_prompt({"BTC": "sym=BTC", "ETH": "sym=ETH"})
+    assert prompt.index("[BTC]\nsym=BTC") < prompt.index("[ETH]\nsym=ETH")
+
+
+def test_split_batch_response_tolerates_header_drift():
+    text = """Genel görünüm olumlu.
+### BTC
+Trend güçlü.
+#### Detay
+Hacim artıyor.
+## **eth**:
+Yatay seyir.
+### SOL
+
+### BTC
+Tekrar.
+"""
+    sections = split_batch_response(text, ["BTC", "ETH", "SOL", "XRP"])
+    # "Detay" names no symbol and stays with BTC; SOL is empty and XRP missing
+    assert sections == {"BTC": "Trend güçlü.\n#### Detay\nHacim artıyor.", "ETH": "Yatay seyir."}
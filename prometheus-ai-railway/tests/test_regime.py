@@ -0,0 +1,71 @@
+import numpy as np
+
+from analysis_engine.regime import (
+    REGIMES, classify_regimes, regime_features, regime_report, scale_weights, wyckoff_phases
+)
+
+
+def _walk(returns, start=100.0):
+    close = start * np.exp(np.cumsum(returns))
+    return close, close * 1.002, close * 0.998
+
+
+def test_features_match_direct_window_statistics():
+    rng = np.random.default_rng(0)
+    close, _, _ = _walk(0.01 * rng.standard_normal(600))
+    features = regime_features(close, window=64, vol_window=20, vol_lookback=250)
+    log_price = np.log(close)
+    returns = np.diff(log_price, prepend=np.nan)
+
+    assert np.isnan(features["efficiency"][:64]).all()
+    for i in (100, 333, 599):
+        path = np.abs(returns[i - 63:i + 1]).sum()
+        assert np.isclose(features["efficiency"][i], abs(log_price[i] - log_price[i - 64]) / path)
+        vol = [returns[j - 19:j + 1].std(ddof=1) for j in range(max(i - 249, 20), i + 1)]
+        assert np.isclose(features["volatility"][i], vol[-1])
+        assert np.isclose(features["vol_percentile"][i], np.mean(np.array(vol) <= vol[-1]) * 100)
+
+    # A random walk hovers around the no-memory values
+    assert 0.35 < np.nanmedian(features["hurst"]) < 0.65
+    assert 0.8 < np.nanmedian(features["variance_ratio"]) < 1.2
+
+
+def test_trend_range_and_volatility_regimes():
+    rng = np.random.default_rng(1)
+    trend = 0.004 + 0.004 * rng.standard_normal(400)
+    level = np.zeros(400)
+    for i in range(1, 400):
+        level[i] = 0.5 * level[i - 1] + 0.01 * rng.standard_normal()
+    shock = 0.002 * rng.standard_normal(400)
+    shock[-10:] *= 25
+
+    up = regime_report(*_walk(trend))
+    assert (up["regime"], up["phase"]) == ("trending", "markup")
+    down = regime_report(*_walk(-trend))
+    assert (down["regime"], down["phase"]) == ("trending", "markdown")
+    # Stationary noise still has a top volatility decile, so judge the mix
+    ranging = classify_regimes(regime_features(_walk(np.diff(level, prepend=0.0))[0]))[300:]
+    assert np.mean(ranging == REGIMES.index("ranging")) > 0.7
+    assert regime_report(*_walk(shock))["regime"] == "high_volatility"
+
+
+def test_spring_undercuts_the_range_and_closes_back_inside():
+    close = np.full(80, 100.0)
+    high, low = close + 1, close - 1
+    low[70], close[70] = 97.0, 100.5
+    high[75], close[75] = 103.0, 99.5
+    features = regime_features(close, window=20)
+    regimes = classify_regimes(features)
+    wyckoff = wyckoff_phases(close, high, low, regimes, features, window=20)
+
+    assert np.flatnonzero(wyckoff["spring"]).tolist() == [70]
+    assert np.flatnonzero(wyckoff["upthrust"]).tolist() == [75]
+    assert wyckoff["range_low"][70] == 99.0
+
+
+def test_scale_weights_by_regime():
+    weights = {"golden_cross": 20, "rsi_oversold": 20, "volume": 10}
+    assert scale_weights(weights, "trending") == {"golden_cross": 25, "rsi_oversold": 15, "volume": 10}
+    assert scale_weights(weights, "ranging") == {"golden_cross": 15, "rsi_oversold": 25, "volume": 10}
+    assert scale_weights(weights, "normal") == weights
+    assert set(REGIMES) == {"normal", "trending", "ranging", "high_volatility"}
@@ -0,0 +1,52 @@
+import msgpack
+import numpy as np
+import pytest
+
+from analysis_engine.result_model import (
+    SCHEMA_VERSION, AnalysisResult, FinalSignal, RiskSummary, SchemaMismatch, Target
+)
+
+
+def _result() -> AnalysisResult:
+    return AnalysisResult(
+        symbol="BTC",
+        analysis_type="full",
+        timestamp=1700000000.0,
+        current_price=43000.5,
+        risk=RiskSummary(atr=250.0, best_rr_ratio=2.4, meets_minimum_rr=True,
+                         best_target=Target("Resistance", 44000.0, 2.3, 0.41, 17.0),
+                         stop_loss_levels={"technical": 42500.0}),
+        signal=FinalSignal(decision="BUY", confidence_score=35, signals=["MACD bullish crossover"]),
+        layers={"fibonacci": {"levels": {0.618: np.float64(42800.0)}}},
+        timings={"total": {"wall_ms": 12.5, "cpu_ms": 11.0, "calls": 1}},
+    )
+
+
+def test_bytes_round_trip():
+    result = _result()
+    restored = AnalysisResult.from_bytes(result.to_bytes())
+
+    assert restored.to_dict() == result.to_dict()
+    assert restored.risk.best_target == result.risk.best_target
+    assert restored.layers["fibonacci"]["levels"][0.618] == 42800.0
+    assert restored.timings == result.timings
+
+
+def test_json_round_trip():
+    result = _result()
+    restored = AnalysisResult.from_json(result.to_json())
+
+    assert restored.signal == result.signal
+    assert restored.risk.best_target == result.risk.best_target
+
+
+def test_other_schema_is_rejected():
+    row = _result().to_row()
+    stale = msgpack.packb(row[1:], use_bin_type=True)
+
+    assert AnalysisResult.readable(_result().to_bytes())
+    assert not AnalysisResult.readable(stale)
+    assert not AnalysisResult.readable(msgpack.packb([SCHEMA_VERSION + 1] + row[1:]))
+    assert not AnalysisResult.readable(b"\xc1garbage")
+    with pytest.raises(SchemaMismatch):
+        AnalysisResult.from_bytes(stale)
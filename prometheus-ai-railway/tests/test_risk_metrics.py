@@ -0,0 +1,66 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from analysis_engine.risk_metrics import (
+    drawdown_stats, lookup_var, norm_ppf, risk_report, rolling_volatility, value_at_risk
+)
+
+
+def test_norm_ppf_matches_statistics_across_tails():
+    p = np.array([1e-6, 0.001, 0.01, 0.02425, 0.05, 0.3, 0.5, 0.7, 0.95, 0.99, 0.999999])
+    expected = [NormalDist().inv_cdf(x) for x in p]
+    np.testing.assert_allclose(norm_ppf(p), expected, atol=1e-8)
+
+
+def test_var_table_against_direct_quantiles():
+    rng = np.random.default_rng(1)
+    returns = 0.0002 + 0.01 * rng.standard_normal(5000)
+    table = value_at_risk(returns, (0.95, 0.99), (1, 5))
+    assert [(row["horizon"], row["confidence"]) for row in table] == [(1, 0.95), (1, 0.99), (5, 0.95), (5, 0.99)]
+
+    for row in table:
+        h, alpha = row["horizon"], 1 - row["confidence"]
+        agg = np.sort(np.convolve(returns, np.ones(h), mode="valid"))
+        k = int(np.floor(alpha * len(agg)))
+        assert np.isclose(row["historical_var"], -np.expm1(agg[k - 1]) * 100)
+        assert np.isclose(row["historical_cvar"], -np.expm1(agg[:k].mean()) * 100)
+
+        z = NormalDist().inv_cdf(alpha)
+        param = returns.mean() * h + z * returns.std(ddof=1) * np.sqrt(h)
+        assert np.isclose(row["parametric_var"], -np.expm1(param) * 100)
+        # Normal returns: the Cornish-Fisher terms nearly vanish
+        assert abs(row["cornish_fisher_var"] - row["parametric_var"]) < 0.1
+        assert abs(row["cornish_fisher_cvar"] - row["parametric_cvar"]) < 0.15
+        assert row["historical_cvar"] > row["historical_var"]
+
+    assert value_at_risk(returns[:5]) == []
+    assert lookup_var(table, 0.99, 5) == table[3]["historical_var"]
+    assert lookup_var(table, 0.90) == 0.0
+
+
+def test_drawdown_stats():
+    close = np.array([100, 110, 99, 88, 105, 110, 121, 115, 118])
+    stats = drawdown_stats(close)
+    assert np.isclose(stats["max_drawdown"], 20.0)
+    assert stats["max_drawdown_peak_bar"] == 1
+    assert stats["max_drawdown_trough_bar"] == 3
+    assert stats["max_duration"] == 3               # bars 2-4 below the 110 peak
+    assert np.isclose(stats["current_drawdown"], (1 - 118 / 121) * 100)
+    assert stats["current_duration"] == 2
+
+
+def test_rolling_volatility_and_report():
+    rng = np.random.default_rng(4)
+    close = 100 * np.exp(np.cumsum(0.01 * rng.standard_normal(300)))
+    returns = np.diff(np.log(close))
+    vol = rolling_volatility(returns, 20)
+    assert np.isnan(vol[:19]).all()
+    expected = [returns[i - 19:i + 1].std(ddof=1) for i in range(19, len(returns))]
+    np.testing.assert_allclose(vol[19:], expected, rtol=1e-9)
+
+    report = risk_report(close, periods_per_year=365)
+    assert len(report["var_table"]) == 6
+    assert np.isclose(report["volatility"]["current"], expected[-1] * 100)
+    assert np.isclose(report["volatility"]["annualized"], expected[-1] * np.sqrt(365) * 100)
+    assert 0 < report["volatility"]["percentile"] <= 100
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from utils.scheduler import AnalysisScheduler, RateLimited
+
+
+class _Worker:
+    """Records the order jobs start in; jobs finish once the gate opens"""
+
+    def __init__(self):
+        self.started = []
+        self.gate = asyncio.Event()
+
+    async def __call__(self, symbol, analysis_type):
+        self.started.append((symbol, analysis_type))
+        await self.gate.wait()
+        return symbol
+
+
+def _scheduler(worker, **kwargs):
+    settings = dict(workers=1, tokens_per_minute=60, burst=100, max_pending=100)
+    settings.update(kwargs)
+    scheduler = AnalysisScheduler(worker, **settings)
+    scheduler.start()
+    return scheduler
+
+
+async def _blocked(scheduler):
+    """Occupy the single worker so later submissions stay queued"""
+    job = await scheduler.submit(0, "BUSY", "full")
+    await asyncio.wait_for(job.started.wait(), 1)
+    return job
+
+
+def test_identical_requests_share_one_job():
+    async def scenario():
+        worker = _Worker()
+        scheduler = _scheduler(worker)
+        first = await scheduler.submit(1, "BTC", "quick")
+        second = await scheduler.submit(2, "BTC", "quick")
+        worker.gate.set()
+        result = await first.future
+        await scheduler.stop()
+        return first is second, result, worker.started
+
+    shared, result, started = asyncio.run(scenario())
+    assert shared
+    assert result == "BTC"
+    assert started == [("BTC", "quick")]
+
+
+def test_waiting_jobs_run_by_type_priority():
+    async def scenario():
+        worker = _Worker()
+        scheduler = _scheduler(worker)
+        await _blocked(scheduler)
+        jobs = [await scheduler.submit(1, symbol, analysis_type)
+                for symbol, analysis_type in (("A", "full"), ("B", "risk"), ("C", "quick"))]
+        positions = [scheduler.position(job) for job in jobs]
+        worker.gate.set()
+        await asyncio.gather(*(job.future for job in jobs))
+        await scheduler.stop()
+        return positions, [symbol for symbol, _ in worker.started]
+
+    positions, order = asyncio.run(scenario())
+    assert positions == [2, 1, 0]
+    assert order == ["BUSY", "C", "B", "A"]
+
+
+def test_aging_lets_long_waiting_jobs_ahead():
+    async def scenario():
+        worker = _Worker()
+        scheduler = _scheduler(worker, aging=0.02)
+        await _blocked(scheduler)
+        full = await scheduler.submit(1, "A", "full")
+        await asyncio.sleep(0.1)
+        quick = await scheduler.submit(1, "B", "quick")
+        worker.gate.set()
+        await asyncio.gather(full.future, quick.future)
+        await scheduler.stop()
+        return [symbol for symbol, _ in worker.started]
+
+    assert asyncio.run(scenario()) == ["BUSY", "A", "B"]
+
+
+def test_full_queue_refuses_new_jobs_but_joins_queued_ones():
+    async def scenario():
+        worker = _Worker()
+        scheduler = _scheduler(worker, max_queue=2)
+        await _blocked(scheduler)
+        await scheduler.submit(1, "A", "quick")
+        await scheduler.submit(2, "B", "quick")
+        with pytest.raises(asyncio.QueueFull):
+            await scheduler.submit(3, "C", "quick")
+        with pytest.raises(asyncio.QueueFull):
+            await scheduler.submit_many(3, ["A", "C"], "quick")
+        joined = await scheduler.submit(3, "A", "quick")
+        await scheduler.stop()
+        return joined, scheduler.stats()
+
+    joined, stats = asyncio.run(scenario())
+    assert joined.key == ("A", "quick")
+    assert stats["queued"] == 2
+    assert stats["rejected"] == 2
+
+
+def test_token_bucket_and_pending_limit():
+    async def scenario():
+        worker = _Worker()
+        scheduler = _scheduler(worker, tokens_per_minute=6, burst=3, max_pending=2, exempt=[9])
+        await scheduler.submit(1, "A", "full")              # 2 of 3 tokens
+        with pytest.raises(RateLimited) as limited:
+            await scheduler.submit(1, "B", "full")
+        await scheduler.submit(1, "B", "quick")             # the last token
+        with pytest.raises(RateLimited):
+            await scheduler.submit(1, "C", "quick")         # 2 jobs pending
+        for symbol in "DE":
+            await scheduler.submit(9, symbol, "full")       # exempt from tokens
+        worker.gate.set()
+        await asyncio.sleep(0.05)
+        pending = scheduler.stats()["users_pending"]
+        await scheduler.stop()
+        return limited.value.retry_after, pending
+
+    retry_after, pending = asyncio.run(scenario())
+    assert 5 < retry_after <= 10
+    assert pending == 0
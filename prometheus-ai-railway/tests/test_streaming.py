@@ -0,0 +1,78 @@
+import asyncio
+
+from utils.streaming import TextStream, paginate, stream_to_chat
+
+
+class _Message:
+    def __init__(self, chat, text):
+        self.chat = chat
+        self.text = text
+
+    async def edit_text(self, text):
+        self.chat.edits += 1
+        self.text = text
+
+
+class _Chat:
+    """Stand-in for the message being replied to; keeps every reply"""
+
+    def __init__(self):
+        self.messages = []
+        self.edits = 0
+
+    async def reply_text(self, text):
+        self.messages.append(_Message(self, text))
+        return self.messages[-1]
+
+
+async def _produce(stream, chunks, delay):
+    for chunk in chunks:
+        await asyncio.sleep(delay)
+        stream.append(chunk)
+    stream.close()
+
+
+def test_paginate():
+    assert paginate("abcdefg", 3) == ["abc", "def", "g"]
+    assert paginate("", 3) == [""]
+
+
+def test_snapshots_are_throttled_and_end_with_the_full_text():
+    async def scenario():
+        stream = TextStream()
+        chunks = [f"{i} " for i in range(20)]
+        producer = asyncio.create_task(_produce(stream, chunks, 0.005))
+        seen = [snapshot async for snapshot in stream.snapshots(0.03)]
+        await producer
+        return "".join(chunks), seen
+
+    full, seen = asyncio.run(scenario())
+    # An empty placeholder, then the first chunk without waiting out the interval
+    assert seen[:2] == [("", False), ("0 ", False)]
+    assert seen[-1] == (full, True)
+    assert 3 < len(seen) < 20
+    assert all(not done for _, done in seen[:-1])
+    assert all(full.startswith(text) for text, _ in seen)
+
+
+def test_every_reader_of_a_finished_stream_gets_it_at_once():
+    async def scenario():
+        stream = TextStream("ready", done=True)
+        return [snapshot async for snapshot in stream.snapshots(10)]
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 1)) == [("ready", True)]
+
+
+def test_stream_to_chat_edits_in_place_and_continues_in_new_messages():
+    async def scenario():
+        stream = TextStream()
+        chats = [_Chat(), _Chat()]
+        readers = [asyncio.create_task(stream_to_chat(stream, chat, "AI\n", 0.02, limit=10))
+                   for chat in chats]
+        await _produce(stream, ["abc", "def", "ghijkl", "mnop"], 0.03)
+        await asyncio.gather(*readers)
+        return chats
+
+    for chat in asyncio.run(scenario()):
+        assert [m.text for m in chat.messages] == ["AI\nabcdefg", "hijklmnop"]
+        assert chat.edits >= 2
@@ -0,0 +1,54 @@
+import numpy as np
+
+from analysis_engine.swing_detector import HIGH, LOW
+from analysis_engine.support_resistance import cluster_levels, liquidity_zones, split_levels
+
+
+def _swings(points):
+    index, price, kind = zip(*points)
+    return {"index": np.array(index), "price": np.array(price, dtype=float),
+            "kind": np.array(kind, dtype=np.int8)}
+
+
+def _bars(n=100, seed=2):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.standard_normal(n))
+    return close + 1, close - 1, rng.uniform(1000, 2000, n)
+
+
+def test_clusters_split_on_gaps_and_count_touches():
+    high, low, volume = _bars()
+    swings = _swings([(10, 110.0, HIGH), (20, 95.0, LOW), (30, 110.4, HIGH),
+                      (40, 95.3, LOW), (50, 110.2, HIGH), (60, 102.0, LOW)])
+    levels = cluster_levels(swings, high, low, volume, tolerance=0.5)
+
+    by_pivots = sorted(levels, key=lambda lvl: lvl["price"])
+    assert [lvl["pivots"] for lvl in by_pivots] == [2, 1, 3]
+    top = by_pivots[-1]
+    assert top["equal_highs"] == 3 and top["equal_lows"] == 0
+    assert (top["bottom"], top["top"]) == (110.0, 110.4)
+    assert top["bars_since_touch"] == len(high) - 1 - 50
+    assert np.isclose(top["volume"], volume[[10, 30, 50]].sum())
+    assert np.isclose(top["price"], np.average([110.0, 110.4, 110.2], weights=volume[[10, 30, 50]]))
+
+    for lvl in levels:
+        near = lambda a: np.count_nonzero(np.abs(a - lvl["price"]) <= 0.25)
+        assert lvl["touches"] == near(high) + near(low)
+    assert [lvl["strength"] for lvl in levels] == sorted((lvl["strength"] for lvl in levels), reverse=True)
+    assert cluster_levels(swings, high, low, volume, tolerance=0) == []
+
+
+def test_split_levels_and_liquidity_zones():
+    high, low, volume = _bars()
+    swings = _swings([(10, 110.0, HIGH), (20, 95.0, LOW), (30, 110.4, HIGH),
+                      (40, 95.3, LOW), (50, 104.0, HIGH), (60, 102.0, LOW)])
+    levels = cluster_levels(swings, high, low, volume, tolerance=0.5)
+
+    split = split_levels(levels, 103.0)
+    assert [round(lvl["price"]) for lvl in split["support"]] == [102, 95]
+    assert [round(lvl["price"]) for lvl in split["resistance"]] == [104, 110]
+
+    zones = liquidity_zones(levels, 103.0)
+    assert [(z["type"], z["position"]) for z in zones] == [
+        ("buy_side_liquidity", "above"), ("sell_side_liquidity", "below")]
+    assert all(z["equal_touches"] == 2 for z in zones)
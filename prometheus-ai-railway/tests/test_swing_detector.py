@@ -0,0 +1,104 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from analysis_engine.benchmark import synthetic_ohlcv
+from analysis_engine.swing_detector import (
+    HIGH, LOW, active_divergence, average_true_range, find_pivots, parabolic_sar,
+    scan_divergences, zigzag
+)
+
+
+def test_parabolic_sar_matches_ta():
+    ta = pytest.importorskip("ta")
+    pd = pytest.importorskip("pandas")
+    rng = np.random.default_rng(3)
+    close = 100 * np.exp(np.cumsum(0.01 * rng.standard_normal(1500)))
+    high = close * (1 + 0.005 * rng.random(1500))
+    low = close * (1 - 0.005 * rng.random(1500))
+
+    # ta writes one case by label, so it is only positional on a RangeIndex
+    expected = ta.trend.PSARIndicator(pd.Series(high), pd.Series(low), pd.Series(close)).psar()
+
+    np.testing.assert_array_equal(parabolic_sar(high, low, close), expected.to_numpy())
+
+
+def test_pivots_need_strictly_lower_left_and_no_higher_right():
+    high = np.array([1, 2, 3, 5, 3, 5, 2, 1, 1, 4], dtype=float)
+    low = high - 1
+    pivot_high, pivot_low = find_pivots(high, low, left=2, right=2)
+    # Bar 3 ties bar 5 on the right and bar 5 has 5 on its left: only 3 counts
+    assert np.flatnonzero(pivot_high).tolist() == [3]
+    assert np.flatnonzero(pivot_low).tolist() == [7]
+    with pytest.raises(ValueError):
+        find_pivots(high, low, left=0)
+
+
+def test_zigzag_alternates_and_prunes_small_legs():
+    data = synthetic_ohlcv(3000, seed=11)
+    high, low, close = (data[c].to_numpy() for c in ("High", "Low", "Close"))
+    swings = zigzag(high, low, close, atr_multiplier=1.5)
+    idx, price, kind = swings["index"], swings["price"], swings["kind"]
+
+    assert len(idx) > 10
+    assert np.all(np.diff(idx) > 0)
+    assert np.all(kind[1:] != kind[:-1])
+    assert np.array_equal(price[kind == HIGH], high[idx[kind == HIGH]])
+    assert np.array_equal(price[kind == LOW], low[idx[kind == LOW]])
+    threshold = average_true_range(high, low, close, 14) * 1.5
+    assert np.all(np.abs(np.diff(price)) >= threshold[idx[1:]])
+
+    unpruned = zigzag(high, low, close, atr_multiplier=0)
+    assert len(unpruned["index"]) > len(idx)
+    assert np.isin(idx, unpruned["index"]).all()
+
+
+def test_zigzag_on_flat_stretches():
+    close = np.concatenate((np.full(60, 100.0), [101, 103, 106, 103, 100, 98, 100, 102], np.full(60, 102.0)))
+    high, low = close.copy(), close.copy()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        swings = zigzag(high, low, close)
+        flat = zigzag(np.full(100, 5.0), np.full(100, 5.0), np.full(100, 5.0))
+
+    assert np.isfinite(swings["price"]).all()
+    assert swings["kind"].tolist() == [HIGH, LOW, HIGH]
+    assert swings["price"].tolist() == [106.0, 98.0, 102.0]
+    assert len(flat["index"]) == 0
+
+
+def test_zigzag_prunes_after_a_missing_bar():
+    rng = np.random.default_rng(3)
+    close = 100 + np.cumsum(rng.standard_normal(400))
+    high, low = close + rng.random(400), close - rng.random(400)
+    expected = zigzag(high, low, close)
+
+    # One missing bar early on must not disable pruning for the rest
+    high[5] = low[5] = close[5] = np.nan
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        swings = zigzag(high, low, close)
+
+    later = swings["index"] > 40
+    assert later.sum() == (expected["index"] > 40).sum()
+    assert swings["price"][later].tolist() == expected["price"][expected["index"] > 40].tolist()
+
+def test_divergences_between_consecutive_swings():
+    swings = {
+        "index": np.array([10, 20, 30, 40, 50, 60]),
+        "price": np.array([100.0, 120.0, 95.0, 125.0, 98.0, 122.0]),
+        "kind": np.array([LOW, HIGH, LOW, HIGH, LOW, HIGH], dtype=np.int8),
+    }
+    oscillator = np.full(70, np.nan)
+    oscillator[[10, 20, 30, 40, 50, 60]] = [30, 70, 35, 65, 32, 68]
+
+    events = scan_divergences(swings, oscillator)
+    assert [(e["type"], e["previous_index"], e["index"]) for e in events] == [
+        ("bullish_divergence", 10, 30),          # lower low, higher oscillator
+        ("bearish_divergence", 20, 40),          # higher high, lower oscillator
+        ("hidden_bullish_divergence", 30, 50),   # higher low, lower oscillator
+        ("hidden_bearish_divergence", 40, 60),   # lower high, higher oscillator
+    ]
+    assert active_divergence(swings, events) == "hidden_bearish_divergence"
+    assert active_divergence(swings, events[:2]) is None
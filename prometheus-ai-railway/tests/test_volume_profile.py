@@ -0,0 +1,71 @@
+import numpy as np
+
+from analysis_engine.benchmark import synthetic_ohlcv
+from analysis_engine.volume_profile import VolumeProfile
+
+
+def _arrays(data):
+    return (data.index.asi8, data['High'].to_numpy(), data['Low'].to_numpy(),
+            data['Volume'].to_numpy())
+
+
+def _on_same_grid(profile, high, low, volume):
+    """The window deposited from scratch on the profile's own bucket grid"""
+    fresh = VolumeProfile(profile.num_buckets)
+    fresh.bucket_size = profile.bucket_size
+    fresh.origin = profile.origin
+    fresh.hist = np.zeros(len(profile.hist))
+    fresh._deposit(high, low, volume, 1.0)
+    fresh._trim()
+    return fresh
+
+
+def test_summary_of_a_single_price_cluster():
+    high = np.array([101.0, 101.0, 101.0, 110.0])
+    low = np.array([100.0, 100.0, 100.0, 109.0])
+    volume = np.array([1000.0, 1000.0, 1000.0, 10.0])
+    profile = VolumeProfile(num_buckets=10)
+    profile.update(None, high, low, volume)
+
+    summary = profile.summary(105.0)
+    assert 100 <= summary["poc"] <= 101
+    assert summary["value_area"]["low"] >= 100 - profile.bucket_size
+    assert summary["value_area"]["high"] <= 101 + profile.bucket_size
+    assert summary["poc_relation"] == "above"
+    assert not summary["in_value_area"]
+    assert np.isclose(profile.hist.sum(), volume.sum())
+
+
+def test_incremental_updates_match_rebuild():
+    data = synthetic_ohlcv(3000, seed=4)
+    profile = VolumeProfile()
+
+    for end in range(500, len(data), 11):
+        ts, high, low, volume = _arrays(data.iloc[end - 500:end])
+        # The last bar arrives unfinished and is replaced by the next update
+        partial = volume.copy()
+        partial[-1] *= 0.3
+        profile.update(ts, high, low, partial)
+        profile.update(ts, high, low, volume)
+
+        fresh = _on_same_grid(profile, high, low, volume)
+        assert np.isclose(profile.origin, fresh.origin), end
+        np.testing.assert_allclose(profile.hist, fresh.hist, rtol=1e-9,
+                                   atol=1e-6 * volume.sum(), err_msg=str(end))
+        current = float(data['Close'].iloc[end - 1])
+        assert profile.summary(current)["poc"] == fresh.summary(current)["poc"], end
+
+
+def test_gaps_and_history_rewrites_rebuild():
+    data = synthetic_ohlcv(1200, seed=8)
+    profile = VolumeProfile()
+    profile.update(*_arrays(data.iloc[:400]))
+
+    # A window that no longer overlaps the stored one starts over
+    ts, high, low, volume = _arrays(data.iloc[800:1200])
+    profile.update(ts, high, low, volume)
+    rebuilt = VolumeProfile()
+    rebuilt.update(None, high, low, volume)
+    assert profile.origin == rebuilt.origin
+    assert profile.bucket_size == rebuilt.bucket_size
+    np.testing.assert_allclose(profile.hist, rebuilt.hist)
@@ -0,0 +1,452 @@
+"""
+Cache backends shared by the data client, analyses and AI insights
+
+Every backend stores bytes under (namespace, key) with a per-entry TTL.
+MemoryCache serves a single process; SQLiteCache (WAL mode, on a volume
+shared by the workers) and RedisCache (any Redis-protocol server,
+including the stand-in started by `python -m utils.cache`) are shared
+across workers and replicas. The pack/unpack helpers turn OHLCV frames,
+analysis entries and insights into bytes.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import msgpack
+import numpy as np
+import pandas as pd
+from cachetools import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """
+    Namespaced byte cache with per-entry expiry
+
+    Backend failures are logged and treated as misses, so an unreachable
+    shared cache slows the bot down instead of breaking it.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def get(self, namespace: str, key: str) -> Optional[bytes]:
+        try:
+            value = await self._get(namespace, key)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Cache get {namespace}/{key} failed: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, namespace: str, key: str, value: bytes, ttl: float) -> None:
+        try:
+            await self._set(namespace, key, value, ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Cache set {namespace}/{key} failed: {e}")
+
+    async def add(self, namespace: str, key: str, value: bytes, ttl: float) -> bool:
+        """
+        Store unless a live entry exists, atomically; whether this call stored it
+
+        Lets one of several processes claim a piece of work. Backend failures
+        count as stored, so claimants go ahead rather than all stand by.
+        """
+        try:
+            return await self._add(namespace, key, value, ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Cache add {namespace}/{key} failed: {e}")
+            return True
+
+    async def delete(self, namespace: str, key: str) -> None:
+        try:
+            await self._delete(namespace, key)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Cache delete {namespace}/{key} failed: {e}")
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__, "hits": self.hits,
+                "misses": self.misses, "errors": self.errors}
+
+    async def _get(self, namespace: str, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def _set(self, namespace: str, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def _add(self, namespace: str, key: str, value: bytes, ttl: float) -> bool:
+        raise NotImplementedError
+
+    async def _delete(self, namespace: str, key: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """Per-process LRU per namespace; expired entries are dropped on read"""
+
+    def __init__(self, maxsize: int = 512):
+        super().__init__()
+        self.maxsize = maxsize
+        self._namespaces: Dict[str, LRUCache] = {}
+
+    async def _get(self, namespace: str, key: str) -> Optional[bytes]:
+        entries = self._namespaces.get(namespace)
+        entry = entries.get(key) if entries is not None else None
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            del entries[key]
+            return None
+        return entry[1]
+
+    async def _set(self, namespace: str, key: str, value: bytes, ttl: float) -> None:
+        entries = self._namespaces.get(namespace)
+        if entries is None:
+            entries = self._namespaces[namespace] = LRUCache(maxsize=self.maxsize)
+        entries[key] = (time.time() + ttl, value)
+
+    async def _add(self, namespace: str, key: str, value: bytes, ttl: float) -> bool:
+        # No await between the check and the write, so this is atomic on the loop
+        if await self._get(namespace, key) is not None:
+            return False
+        await self._set(namespace, key, value, ttl)
+        return True
+
+    async def _delete(self, namespace: str, key: str) -> None:
+        self._namespaces.get(namespace, {}).pop(key, None)
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache table in a SQLite database in WAL mode
+
+    WAL lets every worker read while one writes, so a database file on a
+    volume shared by the processes (same host) works as a shared cache.
+    Queries run in a thread to keep disk latency off the event loop.
+    Expired rows are purged every `purge_every` writes.
+    """
+
+    def __init__(self, path: str, purge_every: int = 500):
+        super().__init__()
+        self.path = path
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+            "expires REAL NOT NULL, PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+        )
+
+    def _query(self, sql: str, params: Tuple) -> Optional[tuple]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchone()
+
+    def _changes(self, sql: str, params: Tuple) -> int:
+        with self._lock:
+            return self._db.execute(sql, params).rowcount
+
+    async def _get(self, namespace: str, key: str) -> Optional[bytes]:
+        row = await asyncio.to_thread(
+            self._query, "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires >= ?",
+            (namespace, key, time.time())
+        )
+        return row[0] if row else None
+
+    async def _set(self, namespace: str, key: str, value: bytes, ttl: float) -> None:
+        await asyncio.to_thread(
+            self._query, "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+            (namespace, key, value, time.time() + ttl)
+        )
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            await asyncio.to_thread(self._query, "DELETE FROM cache WHERE expires < ?", (time.time(),))
+
+    async def _add(self, namespace: str, key: str, value: bytes, ttl: float) -> bool:
+        now = time.time()
+        changed = await asyncio.to_thread(
+            self._changes,
+            "INSERT INTO cache VALUES (?, ?, ?, ?) ON CONFLICT (namespace, key) DO UPDATE "
+            "SET value = excluded.value, expires = excluded.expires WHERE cache.expires < ?",
+            (namespace, key, value, now + ttl, now)
+        )
+        return changed > 0
+
+    async def _delete(self, namespace: str, key: str) -> None:
+        await asyncio.to_thread(
+            self._query, "DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+
+    async def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class RedisCache(CacheBackend):
+    """
+    Minimal RESP client (GET/SET PX [NX]/DEL) over one asyncio connection
+
+    Works against Redis, its drop-in replacements, or the stand-in server
+    below. Commands are serialized on the connection; a broken connection
+    is reopened on the next command.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, prefix: str = "prometheus:",
+                 timeout: float = 2.0):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        if self.password:
+            await self._roundtrip("AUTH", self.password)
+        if self.db:
+            await self._roundtrip("SELECT", str(self.db))
+
+    async def _roundtrip(self, *args) -> Any:
+        self._writer.write(encode_command(*args))
+        await self._writer.drain()
+        return await asyncio.wait_for(read_reply(self._reader), self.timeout)
+
+    async def command(self, *args) -> Any:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                if self._writer is None or self._writer.is_closing():
+                    await self._connect()
+                return await self._roundtrip(*args)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                self._close_connection()
+                raise
+
+    def _close_connection(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _get(self, namespace: str, key: str) -> Optional[bytes]:
+        return await self.command("GET", f"{self.prefix}{namespace}:{key}")
+
+    async def _set(self, namespace: str, key: str, value: bytes, ttl: float) -> None:
+        await self.command("SET", f"{self.prefix}{namespace}:{key}", value, "PX", str(int(ttl * 1000)))
+
+    async def _add(self, namespace: str, key: str, value: bytes, ttl: float) -> bool:
+        reply = await self.command("SET", f"{self.prefix}{namespace}:{key}", value,
+                                   "PX", str(int(ttl * 1000)), "NX")
+        return reply is not None
+
+    async def _delete(self, namespace: str, key: str) -> None:
+        await self.command("DEL", f"{self.prefix}{namespace}:{key}")
+
+    async def close(self) -> None:
+        self._close_connection()
+
+
+def create_cache(url: str = "", maxsize: int = 512) -> CacheBackend:
+    """
+    Backend from a URL
+
+    - "" or "memory": MemoryCache
+    - "sqlite:///path/to/cache.db": SQLiteCache
+    - "redis://[:password@]host[:port][/db]": RedisCache
+    """
+    if not url or url == "memory":
+        return MemoryCache(maxsize)
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        return SQLiteCache(parsed.path if not parsed.netloc else f"/{parsed.netloc}{parsed.path}")
+    if parsed.scheme == "redis":
+        return RedisCache(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip("/") or 0),
+            password=parsed.password
+        )
+    raise ValueError(f"Unsupported cache URL: {url}")
+
+
+# Codecs
+
+def pack_frame(frame: pd.DataFrame) -> bytes:
+    """
+    OHLCV frame as raw float64 column block plus int64 index
+
+    Much smaller and faster than pickling; the index time zone and
+    column order survive the round trip.
+    """
+    index = frame.index
+    timed = isinstance(index, pd.DatetimeIndex)
+    return msgpack.packb({
+        "columns": [str(c) for c in frame.columns],
+        "values": np.ascontiguousarray(frame.to_numpy(dtype=np.float64)).tobytes(),
+        "index": (index.as_unit('ns').asi8 if timed else np.arange(len(frame), dtype=np.int64)).tobytes(),
+        "tz": str(index.tz) if timed and index.tz is not None else None,
+        "timed": timed,
+    }, use_bin_type=True)
+
+
+def unpack_frame(data: bytes) -> pd.DataFrame:
+    payload = msgpack.unpackb(data, raw=False)
+    columns = payload["columns"]
+    values = np.frombuffer(payload["values"], dtype=np.float64).reshape(-1, len(columns))
+    index = np.frombuffer(payload["index"], dtype=np.int64)
+    if payload["timed"]:
+        index = pd.DatetimeIndex(index.view("M8[ns]"))
+        if payload["tz"]:
+            index = index.tz_localize("UTC").tz_convert(payload["tz"])
+    else:
+        index = pd.RangeIndex(len(index))
+    # Copy so the frame is writable and owns its memory
+    return pd.DataFrame(values.copy(), index=index, columns=columns)
+
+
+def pack(value: Any) -> bytes:
+    """msgpack for plain containers (analysis entries, token buckets)"""
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def unpack(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+# RESP protocol, shared by RedisCache and the stand-in server
+
+def encode_command(*args) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readuntil(b"\r\n")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode()
+    if kind == b"-":
+        raise RuntimeError(body.decode())
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        size = int(body)
+        if size < 0:
+            return None
+        return (await reader.readexactly(size + 2))[:-2]
+    if kind == b"*":
+        count = int(body)
+        return None if count < 0 else [await read_reply(reader) for _ in range(count)]
+    raise RuntimeError(f"Bad RESP reply: {line!r}")
+
+
+async def serve(host: str = "127.0.0.1", port: int = 6379) -> None:
+    """
+    In-memory Redis-protocol stand-in for local runs and tests
+
+    Implements just what RedisCache uses (PING, AUTH, SELECT, GET, SET
+    with EX/PX and NX, DEL, FLUSHDB); point CACHE_URL at a real Redis in
+    production.
+    """
+    store: Dict[bytes, Tuple[float, bytes]] = {}
+
+    def reply(value: Any) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, bytes):
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        return b"+%s\r\n" % value.encode()
+
+    def live(key: bytes) -> Optional[Tuple[float, bytes]]:
+        entry = store.get(key)
+        if entry is not None and entry[0] < time.time():
+            del store[key]
+            entry = None
+        return entry
+
+    def execute(args: list) -> bytes:
+        name = args[0].upper()
+        if name in (b"PING", b"AUTH", b"SELECT"):
+            return reply("PONG" if name == b"PING" else "OK")
+        if name == b"GET":
+            entry = live(args[1])
+            return reply(entry[1] if entry else None)
+        if name == b"SET":
+            options = [arg.upper() for arg in args[3:]]
+            if b"NX" in options and live(args[1]) is not None:
+                return reply(None)
+            expires = float("inf")
+            if len(args) >= 5 and options[0] in (b"EX", b"PX"):
+                expires = time.time() + int(args[4]) / (1 if options[0] == b"EX" else 1000)
+            store[args[1]] = (expires, args[2])
+            return reply("OK")
+        if name == b"DEL":
+            return reply(sum(store.pop(k, None) is not None for k in args[1:]))
+        if name == b"FLUSHDB":
+            store.clear()
+            return reply("OK")
+        return b"-ERR unknown command\r\n"
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                args = await read_reply(reader)
+                writer.write(execute(args))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Cache stand-in listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Redis-protocol cache stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(args.host, args.port))
@@ -0,0 +1,193 @@
+"""
+Local stand-in for the Gemini API, for load-testing the AI governor
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import AsyncIterator, Dict, Optional
+
+from aiohttp import ClientSession, web
+
+logger = logging.getLogger(__name__)
+
+
+class FakeModelError(Exception):
+    """Non-200 answer of the fake server; `code` mirrors the HTTP status"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+
+
+class _Chunk:
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _StreamedResponse:
+    """Async-iterable response with the chunk interface of the Gemini SDK"""
+
+    def __init__(self, response):
+        self._response = response
+
+    async def __aiter__(self) -> AsyncIterator[_Chunk]:
+        try:
+            async for line in self._response.content:
+                if line.strip():
+                    yield _Chunk(json.loads(line)["text"])
+        finally:
+            self._response.release()
+
+
+class FakeGenerativeModel:
+    """
+    Drop-in for genai.GenerativeModel talking to `serve()`
+
+    Only generate_content_async is provided, which is all the bot uses.
+    """
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self._session: Optional[ClientSession] = None
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        if self._session is None or self._session.closed:
+            self._session = ClientSession()
+        response = await self._session.post(f"{self.url}/generate", json={"prompt": prompt})
+        if response.status != 200:
+            message = await response.text()
+            response.release()
+            raise FakeModelError(response.status, message)
+
+        streamed = _StreamedResponse(response)
+        if stream:
+            return streamed
+        return _Chunk("".join([chunk.text async for chunk in streamed]))
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765, latency: float = 1.0,
+                chunks: int = 8, chunk_delay: float = 0.25, capacity: int = 4,
+                error_rate: float = 0.0) -> None:
+    """
+    Serve POST /generate like a streaming model with a quota
+
+    Each answer starts after `latency` seconds and arrives in `chunks`
+    newline-delimited JSON pieces `chunk_delay` apart. Requests beyond
+    `capacity` concurrent ones get 429, and `error_rate` of the rest fail
+    with 500. GET /stats reports the counters.
+    """
+    state: Dict[str, int] = {"active": 0, "peak": 0, "served": 0, "throttled": 0, "errors": 0}
+
+    async def generate(request: web.Request) -> web.StreamResponse:
+        prompt = (await request.json()).get("prompt", "")
+        if state["active"] >= capacity:
+            state["throttled"] += 1
+            return web.json_response({"error": "Resource has been exhausted"}, status=429)
+        if random.random() < error_rate:
+            state["errors"] += 1
+            return web.json_response({"error": "Internal error"}, status=500)
+
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(latency)
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+            for i in range(chunks):
+                text = f"Parça {i + 1}/{chunks}: {len(prompt)} karakterlik özet için içgörü. "
+                await response.write(json.dumps({"text": text}).encode() + b"\n")
+                await asyncio.sleep(chunk_delay)
+            await response.write_eof()
+            state["served"] += 1
+            return response
+        finally:
+            state["active"] -= 1
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response(state)
+
+    app = web.Application()
+    app.router.add_post("/generate", generate)
+    app.router.add_get("/stats", stats)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Fake model listening on {host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def load_test(url: str, requests: int, governor) -> Dict:
+    """Fire `requests` concurrent governed calls at a fake server"""
+    model = FakeGenerativeModel(url)
+    outcomes: Dict[str, int] = {}
+    latencies = []
+
+    async def one(i: int) -> None:
+        started = time.perf_counter()
+        try:
+            async for _ in governor.stream(
+                lambda: model.generate_content_async(f"istek {i}", stream=True)
+            ):
+                pass
+            outcome = "ok"
+        except Exception as e:
+            outcome = type(e).__name__
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    await model.close()
+    latencies.sort()
+    return {
+        "outcomes": outcomes,
+        "p50": round(latencies[len(latencies) // 2], 2),
+        "max": round(latencies[-1], 2),
+        "governor": governor.stats(),
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fake Gemini server and load generator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--chunk-delay", type=float, default=0.25)
+    parser.add_argument("--capacity", type=int, default=4)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--load", type=int, default=0,
+                        help="Instead of serving, send this many concurrent calls to --host/--port "
+                             "through a governor built from config")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.load:
+        from config import config
+        from utils.governor import AIGovernor
+
+        governor = AIGovernor(
+            max_concurrency=config.GEMINI_CONCURRENCY,
+            timeout=config.GEMINI_TIMEOUT,
+            retries=config.GEMINI_RETRIES,
+            failure_threshold=config.GEMINI_BREAKER_THRESHOLD,
+            reset_after=config.GEMINI_BREAKER_RESET
+        )
+        report = asyncio.run(load_test(f"http://{args.host}:{args.port}", args.load, governor))
+        print(json.dumps(report, indent=2))
+    else:
+        asyncio.run(serve(args.host, args.port, args.latency, args.chunks,
+                          args.chunk_delay, args.capacity, args.error_rate))
@@ -5,21 +5,23 @@ Formatting utilities for analysis reports
 from typing import Dict, Any, List
 from datetime import datetime
 
-def format_analysis_report(analysis_result: Dict[str, Any]) -> str:
+from analysis_engine.result_model import AnalysisResult
+
+def format_analysis_report(analysis_result: AnalysisResult) -> str:
     """
     Format analysis result into a readable Telegram message
     
     Args:
-        analysis_result: Comprehensive analysis result dictionary
+        analysis_result: Comprehensive analysis result
         
     Returns:
         Formatted message string
     """
     
-    symbol = analysis_result.get("symbol", "UNKNOWN")
-    signal = analysis_result.get("final_signal", {}).get("decision", "HOLD")
-    confidence = analysis_result.get("final_signal", {}).get("confidence_score", 0)
-    risk_level = analysis_result.get("final_signal", {}).get("risk_level", "MEDIUM")
+    symbol = analysis_result.symbol
+    signal = analysis_result.signal.decision
+    confidence = analysis_result.signal.confidence_score
+    risk_level = analysis_result.signal.risk_level
     
     # Get emoji for signal
     signal_emoji = {
@@ -39,8 +41,8 @@ def format_analysis_report(analysis_result: Dict[str, Any]) -> str:
         "VERY_LOW": "🟢"
     }.get(risk_level, "⚪")
     
-    current_price = analysis_result.get("current_price", 0)
-    price_change = analysis_result.get("price_change_24h", 0)
+    current_price = analysis_result.current_price
+    price_change = analysis_result.price_change_24h
     
     # Format price change with color
     if price_change > 0:
@@ -62,70 +64,55 @@ def format_analysis_report(analysis_result: Dict[str, Any]) -> str:
 """
     
     # Add technical summary
-    technical = analysis_result.get("technical_indicators", {})
-    momentum = technical.get("momentum", {})
-    trend = technical.get("trend", {})
+    technical = analysis_result.technical
     
     # RSI
-    rsi_info = momentum.get("rsi", {})
-    rsi_value = rsi_info.get("value", 0)
-    rsi_signal = rsi_info.get("signal", "neutral")
-    message += f"• RSI: {rsi_value:.1f} ({rsi_signal_emoji(rsi_signal)} {rsi_signal})\n"
+    rsi_signal = technical.rsi_signal
+    message += f"• RSI: {technical.rsi:.1f} ({rsi_signal_emoji(rsi_signal)} {rsi_signal})\n"
     
     # MACD
-    macd_info = momentum.get("macd", {})
-    macd_signal = macd_info.get("signal", "neutral")
+    macd_signal = technical.macd_signal
     message += f"• MACD: {macd_signal_emoji(macd_signal)} {macd_signal}\n"
     
     # Trend
-    ma_info = trend.get("moving_averages", {})
-    if ma_info.get("golden_cross"):
+    if technical.golden_cross:
         message += "• 🥇 ALTIN KESİŞİM (Güçlü Boğa)\n"
-    elif ma_info.get("death_cross"):
+    elif technical.death_cross:
         message += "• 💀 ÖLÜM KESİŞİMİ (Güçlü Ayı)\n"
     
-    trend_strength = trend.get("adx", {}).get("trend_strength", "weak")
+    trend_strength = technical.trend_strength
     message += f"• Trend Gücü: {trend_strength_emoji(trend_strength)} {trend_strength}\n"
     
     # Price action
-    price_action = analysis_result.get("price_action", {})
-    pattern_count = price_action.get("active_patterns_count", 0)
-    if pattern_count > 0:
-        message += f"• Aktif Formasyon: {pattern_count} adet\n"
+    if technical.active_patterns > 0:
+        message += f"• Aktif Formasyon: {technical.active_patterns} adet\n"
     
     # Fibonacci
-    fibonacci = analysis_result.get("fibonacci", {})
-    fib_relation = fibonacci.get("current_relation", {})
-    if fib_relation:
-        fib_level = list(fib_relation.keys())[0]
-        message += f"• Fibonacci: %{fib_level} seviyesinde\n"
+    if technical.fibonacci_level is not None:
+        message += f"• Fibonacci: %{technical.fibonacci_level} seviyesinde\n"
     
     # Sentiment
-    sentiment = analysis_result.get("sentiment_analysis", {})
-    sentiment_cat = sentiment.get("category", "NEUTRAL")
+    sentiment_cat = technical.sentiment
     message += f"• Sentiment: {sentiment_emoji(sentiment_cat)} {sentiment_cat}\n\n"
     
     # Risk Management
-    risk_mgmt = analysis_result.get("risk_management", {})
-    rr_analysis = risk_mgmt.get("risk_reward_analysis", {})
-    rr_ratio = rr_analysis.get("best_rr_ratio", 0)
+    risk = analysis_result.risk
     
     message += f"🛡️ *RİSK YÖNETİMİ*\n"
     message += f"```\n"
-    message += f"Risk/Ödül Oranı: {rr_ratio:.1f}:1\n"
+    message += f"Risk/Ödül Oranı: {risk.best_rr_ratio:.1f}:1\n"
     
-    if rr_analysis.get("meets_minimum_rr"):
+    if risk.meets_minimum_rr:
         message += f"✅ Minimum 2:1 R:R şartı sağlandı\n"
     else:
         message += f"⚠️ Minimum 2:1 R:R şartı sağlanmadı\n"
     
     # Position sizing example
-    position = risk_mgmt.get("position_sizing", {})
-    if position:
+    if risk.position_value:
         message += f"\n$10K Portföy Örneği:\n"
-        message += f"Pozisyon Büyüklüğü: ${position.get('position_value', 0):.0f}\n"
-        message += f"Risk Miktarı: ${position.get('risk_amount', 0):.0f}\n"
-        message += f"Stop Loss: %{position.get('stop_percent', 0):.1f}\n"
+        message += f"Pozisyon Büyüklüğü: ${risk.position_value:.0f}\n"
+        message += f"Risk Miktarı: ${risk.risk_amount:.0f}\n"
+        message += f"Stop Loss: %{risk.stop_percent:.1f}\n"
     
     message += f"```\n\n"
     
@@ -134,27 +121,30 @@ def format_analysis_report(analysis_result: Dict[str, Any]) -> str:
     message += f"```\n"
     
     # Entry levels
-    current_price = analysis_result.get("current_price", 0)
     message += f"Giriş Bölgesi:\n"
     message += f"• İdeal: ${current_price * 0.99:,.0f} - ${current_price * 1.01:,.0f}\n"
     
     # Stop loss
-    stop_levels = risk_mgmt.get("stop_loss_levels", {})
-    if stop_levels:
-        stop_price = stop_levels.get("technical", current_price * 0.95)
+    if risk.stop_loss_levels:
+        stop_price = risk.stop_loss_levels.get("technical", current_price * 0.95)
         stop_percent = (1 - stop_price/current_price) * 100
         message += f"Stop Loss: ${stop_price:,.0f} (%{stop_percent:.1f})\n"
     
     # Targets
-    if rr_analysis.get("best_target"):
-        target = rr_analysis["best_target"]
-        message += f"Hedef 1 ({target['type']}): ${target['price']:,.0f}\n"
-        message += f"    (%{target['distance_percent']:.1f} kazanç)\n"
+    if risk.best_target:
+        target = risk.best_target
+        message += f"Hedef 1 ({target.type}): ${target.price:,.0f}\n"
+        message += f"    (%{target.distance_percent:.1f} kazanç)\n"
+        if target.hit_probability is not None:
+            message += f"    Stoptan önce ulaşma olasılığı: %{target.hit_probability:.0f}"
+            if target.expected_bars:
+                message += f" (~{target.expected_bars:.0f} mum)"
+            message += "\n"
     
     message += f"```\n\n"
     
     # AI Insights
-    ai_insights = analysis_result.get("ai_insights", "")
+    ai_insights = analysis_result.ai_insights
     if ai_insights and len(ai_insights) < 500:
         message += f"🤖 *GEMİNİ AI İÇGÖRÜLERİ*\n"
         message += f"_{ai_insights[:400]}..._\n\n"
@@ -164,7 +154,7 @@ def format_analysis_report(analysis_result: Dict[str, Any]) -> str:
     message += f"1. ⏰ Fiyat alarmı kur: ${current_price:,.0f}\n"
     message += f"2. 📊 Tekrar kontrol: 4 saat sonra\n"
     
-    recommended_action = analysis_result.get("final_signal", {}).get("recommended_action", "")
+    recommended_action = analysis_result.signal.recommended_action
     if recommended_action:
         message += f"3. 🎯 {recommended_action}\n"
     
@@ -236,12 +226,12 @@ def sentiment_emoji(sentiment: str) -> str:
         "EXTREME_FEAR": "😱"
     }.get(sentiment, "😐")
 
-def format_quick_report(analysis_result: Dict[str, Any]) -> str:
+def format_quick_report(analysis_result: AnalysisResult) -> str:
     """Format quick analysis report"""
-    symbol = analysis_result.get("symbol", "UNKNOWN")
-    signal = analysis_result.get("final_signal", {}).get("decision", "HOLD")
-    confidence = analysis_result.get("final_signal", {}).get("confidence_score", 0)
-    current_price = analysis_result.get("current_price", 0)
+    symbol = analysis_result.symbol
+    signal = analysis_result.signal.decision
+    confidence = analysis_result.signal.confidence_score
+    current_price = analysis_result.current_price
     
     signal_emoji = {
         "STRONG_BUY": "🟢",
@@ -263,27 +253,26 @@ def format_quick_report(analysis_result: Dict[str, Any]) -> str:
     # Add key points
     points = []
     
+    technical = analysis_result.technical
+    
     # RSI
-    rsi = analysis_result.get("technical_indicators", {}).get("momentum", {}).get("rsi", {})
-    if rsi.get("value"):
-        points.append(f"RSI: {rsi['value']:.1f}")
+    if technical.rsi:
+        points.append(f"RSI: {technical.rsi:.1f}")
     
     # Trend
-    trend = analysis_result.get("market_structure", {}).get("trend", {})
-    if trend.get("primary"):
-        points.append(f"Trend: {trend['primary']}")
+    if technical.market_trend:
+        points.append(f"Trend: {technical.market_trend}")
     
     # Patterns
-    patterns = analysis_result.get("price_action", {}).get("active_patterns_count", 0)
-    if patterns > 0:
-        points.append(f"{patterns} formasyon")
+    if technical.active_patterns > 0:
+        points.append(f"{technical.active_patterns} formasyon")
     
     # Add points to message
     for point in points:
         message += f"• {point}\n"
     
     # Recommendation
-    action = analysis_result.get("final_signal", {}).get("recommended_action", "")
+    action = analysis_result.signal.recommended_action
     if action:
         message += f"\n🎯 Tavsiye: {action}\n"
     
@@ -291,10 +280,10 @@ def format_quick_report(analysis_result: Dict[str, Any]) -> str:
     
     return message
 
-def format_risk_report(analysis_result: Dict[str, Any]) -> str:
+def format_risk_report(analysis_result: AnalysisResult) -> str:
     """Format risk analysis report"""
-    symbol = analysis_result.get("symbol", "UNKNOWN")
-    risk_mgmt = analysis_result.get("risk_management", {})
+    symbol = analysis_result.symbol
+    risk = analysis_result.risk
     
     message = f"""
 🛡️ *{symbol} - RİSK ANALİZİ*
@@ -303,35 +292,97 @@ def format_risk_report(analysis_result: Dict[str, Any]) -> str:
 """
     
     # ATR
-    atr_info = risk_mgmt.get("atr", {})
-    if atr_info.get("value"):
-        message += f"• ATR: ${atr_info['value']:.2f} (%{atr_info.get('percent', 0):.1f})\n"
+    if risk.atr:
+        message += f"• ATR: ${risk.atr:.2f} (%{risk.atr_percent:.1f})\n"
     
     # Stop loss levels
-    stop_levels = risk_mgmt.get("stop_loss_levels", {})
-    if stop_levels:
+    if risk.stop_loss_levels:
         message += f"\n🛑 Stop Loss Seviyeleri:\n"
-        for level_name, level_price in stop_levels.items():
+        for level_name, level_price in risk.stop_loss_levels.items():
             message += f"• {level_name}: ${level_price:,.2f}\n"
     
     # Position sizing
-    position = risk_mgmt.get("position_sizing", {})
-    if position:
+    if risk.position_value:
         message += f"\n💰 Pozisyon Büyüklüğü:\n"
-        message += f"• Risk/İşlem: %{position.get('risk_per_trade_percent', 0):.1f}\n"
-        message += f"• Stop Mesafesi: %{position.get('stop_percent', 0):.1f}\n"
-        message += f"• Pozisyon Değeri: ${position.get('position_value', 0):.0f}\n"
+        message += f"• Risk/İşlem: %{risk.risk_per_trade_percent:.1f}\n"
+        message += f"• Stop Mesafesi: %{risk.stop_percent:.1f}\n"
+        message += f"• Pozisyon Değeri: ${risk.position_value:.0f}\n"
     
     # Risk factors
-    risk_factors = risk_mgmt.get("risk_factors", [])
-    if risk_factors:
+    if risk.risk_factors:
         message += f"\n⚠️ Risk Faktörleri:\n"
-        for factor in risk_factors[:3]:  # Show top 3
+        for factor in risk.risk_factors[:3]:  # Show top 3
             message += f"• {factor}\n"
     
     # Var and Max Drawdown
     message += f"\n📈 Risk Ölçümleri:\n"
-    message += f"• Max Drawdown: %{risk_mgmt.get('maximum_drawdown', 0):.1f}\n"
-    message += f"• VaR (%95): %{risk_mgmt.get('var_95', 0):.1f}\n"
+    message += f"• Max Drawdown: %{risk.maximum_drawdown:.1f}\n"
+    message += f"• VaR (%95): %{risk.var_95:.1f}\n"
+    
+    return message
+
+def format_portfolio_report(portfolio: Dict[str, Any]) -> str:
+    """Format portfolio allocation report"""
+    method = {
+        "risk_parity": "Risk Paritesi",
+        "volatility_target": "Volatilite Hedefi"
+    }.get(portfolio["method"], portfolio["method"])
     
+    message = f"""
+💼 *PORTFÖY DAĞILIMI - {method}*
+
+💰 Hesap: ${portfolio['account_size']:,.0f}
+📊 Yıllık Volatilite: %{portfolio['portfolio_volatility']:.1f}
+🛡️ Maks. Risk/İşlem: %{portfolio['max_risk_per_trade_percent']:.1f}
+
+📋 Pozisyonlar:
+"""
+    
+    for position in portfolio["positions"]:
+        cap_note = " (risk limiti)" if position["capped"] else ""
+        message += (
+            f"• {symbol_emoji(position['symbol'])} {position['symbol']}: "
+            f"%{position['weight_percent']:.1f} - ${position['position_value']:,.0f}{cap_note}\n"
+            f"   Risk payı: %{position['risk_contribution_percent']:.1f} | "
+            f"Stop: %{position['stop_percent']:.1f}\n"
+        )
+    
+    if portfolio["cash_percent"] > 0.05:
+        message += f"\n💵 Nakit: %{portfolio['cash_percent']:.1f}\n"
+    
+    if portfolio["skipped"]:
+        message += f"\n⚠️ Veri yetersiz: {', '.join(portfolio['skipped'])}\n"
+    
+    return message
+
+def format_scan_report(results: List[AnalysisResult], missing: List[str]) -> str:
+    """Format a multi-symbol scan, one block per symbol"""
+    message = f"\n🔎 *PİYASA TARAMASI - {len(results)} sembol*\n\n"
+    
+    for result in results:
+        signal = result.signal.decision
+        signal_emoji = {
+            "STRONG_BUY": "🟢",
+            "BUY": "✅",
+            "HOLD": "🟡",
+            "SELL": "🔴",
+            "STRONG_SELL": "🛑"
+        }.get(signal, "⚪")
+        message += (
+            f"{symbol_emoji(result.symbol)} *{result.symbol}* ${result.current_price:,.2f}\n"
+            f"   {signal_emoji} {signal} | Güven: %{result.signal.confidence_score} | "
+            f"RSI: {result.technical.rsi:.0f} | Trend: {result.technical.market_trend}\n"
+        )
+    
+    if missing:
+        message += f"\n⚠️ Veri bulunamadı: {', '.join(missing)}\n"
+    
+    message += f"\nℹ️ Detaylı analiz için: /analiz SEMBOL"
+    return message
+
+def format_scan_insights(results: List[AnalysisResult]) -> str:
+    """Plain-text Gemini insights of a scan (model text may break Markdown)"""
+    message = "🤖 GEMİNİ AI İÇGÖRÜLERİ\n"
+    for result in results:
+        message += f"\n{result.symbol}\n{result.ai_insights}\n"
     return message
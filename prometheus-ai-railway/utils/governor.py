@@ -0,0 +1,240 @@
+"""
+Concurrency, deadline, retry and circuit-breaker control for model calls
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# google.api_core exception names (and HTTP codes) meaning "slow down"
+QUOTA_ERRORS = ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable")
+QUOTA_CODES = (429, 503)
+
+
+def is_quota_error(error: Exception) -> bool:
+    return type(error).__name__ in QUOTA_ERRORS or getattr(error, "code", None) in QUOTA_CODES
+
+
+class CircuitOpen(Exception):
+    """The model is considered unhealthy; calls are refused without trying"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Circuit open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Refuses calls after `threshold` consecutive failures
+
+    States: closed (calls pass), open (calls refused for `reset_after`
+    seconds), half_open (a single probe call decides between the two).
+    """
+
+    def __init__(self, threshold: int = 5, reset_after: float = 60.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def available(self) -> bool:
+        """Whether a call would be let through now (does not reserve it)"""
+        if self.state == "open":
+            return time.monotonic() - self.opened_at >= self.reset_after
+        return not (self.state == "half_open" and self._probing)
+
+    def check(self) -> None:
+        """Admit a call or raise CircuitOpen"""
+        if self.state == "open":
+            wait = self.opened_at + self.reset_after - time.monotonic()
+            if wait > 0:
+                raise CircuitOpen(wait)
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                raise CircuitOpen(self.reset_after)
+            self._probing = True
+
+    def success(self) -> None:
+        if self.state != "closed":
+            logger.info("Model circuit closed")
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.threshold:
+            if self.state != "open":
+                logger.warning(f"Model circuit opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """An admitted call ended without a verdict (e.g. the caller went away)"""
+        self._probing = False
+
+
+class AIGovernor:
+    """
+    Gatekeeper for streamed model calls
+
+    - At most `max_concurrency` calls run at once. Quota errors halve the
+      limit and every success raises it by about one per window of
+      calls (additive increase, multiplicative decrease), so the bot
+      settles just under the provider's real quota.
+    - Quota errors before the first chunk are retried up to `retries`
+      times with jittered exponential backoff.
+    - Every call, including waiting for a slot and retries, has to finish
+      within `timeout` seconds.
+    - A circuit breaker refuses calls outright while the model keeps
+      failing, so callers can skip the AI part immediately. Running out of
+      time while still waiting for a slot is not held against the model.
+    """
+
+    def __init__(self, max_concurrency: int = 4, timeout: float = 30.0, retries: int = 2,
+                 backoff: float = 1.0, failure_threshold: int = 5, reset_after: float = 60.0):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(failure_threshold, reset_after)
+        self.limit = float(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self._slots = asyncio.Condition()
+        self.calls = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.retried = 0
+        self.refused = 0
+
+    def available(self) -> bool:
+        return self.breaker.available()
+
+    async def stream(self, call: Callable[[], Awaitable[AsyncIterable]]) -> AsyncIterator[Any]:
+        """
+        Chunks of `call()`'s streamed response, under the governor's rules
+
+        Raises:
+            CircuitOpen: The model is unhealthy; nothing was attempted
+            asyncio.TimeoutError: The deadline passed
+        """
+        try:
+            self.breaker.check()
+        except CircuitOpen:
+            self.refused += 1
+            raise
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        remaining = lambda: max(deadline - loop.time(), 0)
+        self.calls += 1
+        try:
+            await self._acquire(remaining())
+        except BaseException as e:
+            # Queueing behind our own calls says nothing about the model's health
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+            self.breaker.abandon()
+            raise
+
+        verdict = False
+        try:
+            try:
+                attempt = 0
+                while True:
+                    try:
+                        response = await asyncio.wait_for(call(), remaining())
+                        chunks = response.__aiter__()
+                        first = await asyncio.wait_for(chunks.__anext__(), remaining())
+                        break
+                    except StopAsyncIteration:
+                        first = None
+                        break
+                    except Exception as e:
+                        if not is_quota_error(e):
+                            raise
+                        self._decrease()
+                        delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                        if attempt >= self.retries or delay >= remaining():
+                            raise
+                        attempt += 1
+                        self.retried += 1
+                        logger.info(f"Model quota error, retry {attempt} in {delay:.1f}s: {e}")
+                        await asyncio.sleep(delay)
+
+                if first is not None:
+                    yield first
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), remaining())
+                        except StopAsyncIteration:
+                            break
+                        yield chunk
+            finally:
+                await self._release()
+
+            verdict = True
+            self.breaker.success()
+            await self._increase()
+        except asyncio.TimeoutError:
+            verdict = True
+            self.timeouts += 1
+            self.breaker.failure()
+            raise
+        except Exception:
+            verdict = True
+            self.failed += 1
+            self.breaker.failure()
+            raise
+        finally:
+            if not verdict:
+                self.breaker.abandon()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "limit": int(self.limit),
+            "active": self.active,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "retried": self.retried,
+            "refused": self.refused,
+        }
+
+    async def _acquire(self, timeout: float) -> None:
+        self.waiting += 1
+        try:
+            async with self._slots:
+                await asyncio.wait_for(
+                    self._slots.wait_for(lambda: self.active < int(self.limit)), timeout
+                )
+                self.active += 1
+        finally:
+            self.waiting -= 1
+
+    async def _release(self) -> None:
+        async with self._slots:
+            self.active -= 1
+            self._slots.notify()
+
+    def _decrease(self) -> None:
+        self.limit = max(1.0, self.limit / 2)
+
+    async def _increase(self) -> None:
+        before = int(self.limit)
+        self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+        if int(self.limit) > before:
+            # Nobody releases a slot for the waiters the raised limit admits
+            async with self._slots:
+                self._slots.notify_all()
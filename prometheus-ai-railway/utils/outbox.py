@@ -0,0 +1,229 @@
+"""
+Rate-limit-aware queue for outbound Telegram requests
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Coroutine, Deque, Dict, List, Optional
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from utils.scheduler import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Endpoints where a newer queued call makes an older one for the same message moot
+MERGEABLE = ("editMessageText", "editMessageReplyMarkup")
+
+
+class _Request:
+    """One queued Bot API call and the futures of every caller it answers"""
+
+    __slots__ = ("callback", "args", "kwargs", "endpoint", "merge_key", "retries", "futures")
+
+    def __init__(self, callback: Callable, args: Any, kwargs: Dict[str, Any],
+                 endpoint: str, merge_key: Optional[tuple], retries: int):
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.endpoint = endpoint
+        self.merge_key = merge_key
+        self.retries = retries
+        self.futures: List[asyncio.Future] = [asyncio.get_running_loop().create_future()]
+
+
+class _Lane:
+    """Requests of one chat, sent in order and one at a time"""
+
+    __slots__ = ("bucket", "queue", "busy", "paused_until")
+
+    def __init__(self, bucket: Optional[TokenBucket]):
+        self.bucket = bucket
+        self.queue: Deque[_Request] = deque()
+        self.busy = False
+        self.paused_until = 0.0
+
+
+class Outbox(BaseRateLimiter[int]):
+    """
+    Outbound request scheduler, plugged into the application as its rate limiter
+
+    Every Bot API call of the application (replies, edits, callback
+    answers) passes through here instead of going straight out:
+    - at most `global_rate` requests per second overall
+    - per chat, a token bucket of `chat_rate` per second (`group_rate` for
+      groups and channels) with `burst` capacity; each chat's requests
+      keep their order; when the global rate is the bottleneck, chats with
+      the most queued go first (each is still held to its own rate), so
+      a long multi-part reply and a large fan-out finish together
+    - a queued edit of a message is replaced by a newer edit of the same
+      message; the superseded caller gets the newer call's result
+    - RetryAfter pauses the chat for the time Telegram asks and the
+      request is retried, up to `max_retries` times (or the per-call
+      rate_limit_args)
+
+    Requests without a chat (getMe, setWebhook, answerCallbackQuery...)
+    only count against the global rate and go ahead of chat traffic.
+    """
+
+    def __init__(self, global_rate: float = 30, chat_rate: float = 1.0,
+                 group_rate: float = 20 / 60, burst: float = 3, max_retries: int = 3):
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.burst = burst
+        self.max_retries = max_retries
+        # Paced rather than bursty, so no one-second window goes over the limit
+        self._global = TokenBucket(global_rate, 1)
+        self._lanes: Dict[Any, _Lane] = {}
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._deliveries = set()
+        self.in_flight = 0
+        self.sent = 0
+        self.merged = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def initialize(self) -> None:
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._dispatcher
+            self._dispatcher = None
+        for lane in self._lanes.values():
+            for request in lane.queue:
+                for future in request.futures:
+                    future.cancel()
+        self._lanes.clear()
+
+    async def process_request(self, callback: Callable[..., Coroutine], args: Any,
+                              kwargs: Dict[str, Any], endpoint: str, data: Dict[str, Any],
+                              rate_limit_args: Optional[int]) -> Any:
+        chat_id = data.get("chat_id")
+        with contextlib.suppress(ValueError, TypeError):
+            chat_id = int(chat_id)
+        retries = self.max_retries if rate_limit_args is None else rate_limit_args
+
+        if chat_id is None:
+            lane = _Lane(None)
+            self._lanes[object()] = lane
+        else:
+            lane = self._lanes.get(chat_id)
+            if lane is None:
+                group = isinstance(chat_id, str) or chat_id < 0
+                rate = self.group_rate if group else self.chat_rate
+                lane = self._lanes[chat_id] = _Lane(TokenBucket(rate, self.burst))
+
+        merge_key = None
+        if endpoint in MERGEABLE and data.get("message_id") is not None:
+            merge_key = (endpoint, data["message_id"])
+            for queued in lane.queue:
+                if queued.merge_key == merge_key:
+                    future = asyncio.get_running_loop().create_future()
+                    queued.futures.append(future)
+                    queued.callback, queued.args, queued.kwargs = callback, args, kwargs
+                    self.merged += 1
+                    return await future
+
+        request = _Request(callback, args, kwargs, endpoint, merge_key, retries)
+        lane.queue.append(request)
+        self._wakeup.set()
+        return await request.futures[-1]
+
+    def stats(self) -> Dict[str, int]:
+        depths = [len(lane.queue) for lane in self._lanes.values()]
+        return {
+            "queued": sum(depths),
+            "chats_waiting": sum(1 for depth in depths if depth),
+            "max_chat_depth": max(depths, default=0),
+            "in_flight": self.in_flight,
+            "sent": self.sent,
+            "merged": self.merged,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+    async def _dispatch(self) -> None:
+        """Start the head request of every lane whose chat and the global rate allow it"""
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            wait = None
+            # Chatless requests (callback answers...) first, as users are watching
+            # a spinner; then the deepest queues, since their chat rate makes
+            # them the slowest to drain. Ties keep round-robin order.
+            lanes = sorted(self._lanes.items(),
+                           key=lambda item: (item[1].bucket is not None, -len(item[1].queue)))
+            for key, lane in lanes:
+                if lane.busy:
+                    continue
+                if not lane.queue:
+                    del self._lanes[key]
+                    continue
+                if lane.paused_until > now:
+                    wait = min(wait or float("inf"), lane.paused_until - now)
+                    continue
+
+                lane_wait = lane.bucket.take(1) if lane.bucket else 0.0
+                if lane_wait:
+                    wait = min(wait or float("inf"), lane_wait)
+                    continue
+                global_wait = self._global.take(1)
+                if global_wait:
+                    if lane.bucket:
+                        lane.bucket.refund(1)
+                    wait = min(wait or float("inf"), global_wait)
+                    break
+
+                lane.busy = True
+                # Round-robin: a served chat goes to the back of the line
+                del self._lanes[key]
+                self._lanes[key] = lane
+                task = asyncio.create_task(self._deliver(lane))
+                self._deliveries.add(task)
+                task.add_done_callback(self._deliveries.discard)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, lane: _Lane) -> None:
+        request = lane.queue.popleft()
+        self.in_flight += 1
+        try:
+            result = await request.callback(*request.args, **request.kwargs)
+        except RetryAfter as e:
+            if request.retries > 0:
+                request.retries -= 1
+                self.retried += 1
+                lane.queue.appendleft(request)
+                lane.paused_until = time.monotonic() + float(e.retry_after) + 0.1
+                logger.info(f"Telegram flood control on {request.endpoint}, retrying in {e.retry_after}s")
+            else:
+                self._fail(request, e)
+        except Exception as e:
+            self._fail(request, e)
+        else:
+            self.sent += 1
+            for future in request.futures:
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.in_flight -= 1
+            lane.busy = False
+            self._wakeup.set()
+
+    def _fail(self, request: _Request, error: Exception) -> None:
+        self.failed += 1
+        for future in request.futures:
+            if not future.done():
+                future.set_exception(error)
@@ -0,0 +1,144 @@
+"""
+Compact Gemini prompts built from analysis results
+"""
+
+import hashlib
+import re
+from decimal import Decimal
+from typing import Dict, List
+
+from analysis_engine.result_model import AnalysisResult
+
+INSIGHT_INSTRUCTIONS = """SEN PROMETHEUS AI ULTRA'SIN - En gelişmiş finansal analiz sistemi.
+Aşağıdaki analiz özetini (anahtar=değer, yüzdeler %) geliştir:
+1. Warren Buffett'in değer yatırımı perspektifinden değerlendir
+2. George Soros'un makro zamanlama teorisini uygula
+3. Jim Simons'ın matematiksel modelleme yaklaşımını ekle
+4. Ray Dalio'nun All-Weather risk yönetimini dahil et
+5. Paul Tudor Jones'un makro+teknik sentezini yap
+Özellikle şunlara odaklan: asimetrik risk/ödül fırsatları, piyasa
+refleksivitesi, olası kara kuğu senaryoları, optimal pozisyon büyüklüğü.
+Analizi Türkçe olarak geliştir."""
+
+BATCH_INSTRUCTIONS = """SEN PROMETHEUS AI ULTRA'SIN - En gelişmiş finansal analiz sistemi.
+Aşağıda birden fazla sembolün analiz özeti var (anahtar=değer, yüzdeler %).
+Her sembol için en fazla 4 cümlelik, Türkçe bir içgörü yaz: asimetrik
+risk/ödül, piyasa rejimi ve en önemli risk. Her sembolün yanıtını tek
+başına bir satırdaki "### SEMBOL" başlığıyla başlat, başka başlık kullanma
+ve sembolleri verilen sırayla yanıtla."""
+
+# "### BTC", also tolerating "## **BTC**:" style drift in model output
+_SECTION = re.compile(r"^[ \t]*#{2,4}[ \t]*\**[ \t]*([A-Za-z0-9.\-/=^]+)[ \t]*\**[ \t]*:?[ \t]*$", re.MULTILINE)
+
+
+def _num(value: float, digits: int = 4) -> str:
+    """Round to `digits` significant digits, without exponent or trailing zeros"""
+    if value is None:
+        return "-"
+    text = f"{float(value):.{digits}g}"
+    if "e" in text:
+        # 4.301e+04 -> 43010, 1.234e-05 -> 0.00001234
+        text = format(Decimal(text), "f")
+    return text
+
+
+def _pct(value: float) -> str:
+    return "-" if value is None else f"{float(value):.1f}"
+
+
+def encode_summary(result: AnalysisResult) -> str:
+    """
+    Dense one-fact-per-key summary of an analysis for the model
+
+    Only decision-relevant fields are kept (signal, technicals, regime,
+    risk plan, tail risk), as `key=value` pairs grouped per line. Prices
+    keep 4 significant digits and percentages one decimal, which saves
+    tokens and lets nearly identical market states share a fingerprint.
+    Timestamps are left out for the same reason, and so are the lines of
+    layers the analysis type did not run (e.g. the risk plan of a quick scan).
+    """
+    technical, risk, signal = result.technical, result.risk, result.signal
+    structure = result.layers.get("market_structure", {})
+    wyckoff = structure.get("wyckoff_analysis", {})
+    sentiment = result.layers.get("sentiment_analysis", {})
+
+    lines: List[str] = [
+        f"sym={result.symbol} type={result.analysis_type} px={_num(result.current_price)} "
+        f"chg24h={_pct(result.price_change_24h)}",
+        f"signal={signal.decision} conf={int(round(signal.confidence_score))} "
+        f"risk={signal.risk_level} horizon={signal.time_horizon}",
+    ]
+    if "technical_indicators" in result.layers:
+        line = (
+            f"rsi={technical.rsi:.0f}/{technical.rsi_signal} macd={technical.macd_signal} "
+            f"cross={'golden' if technical.golden_cross else 'death' if technical.death_cross else 'none'} "
+            f"adx={technical.trend_strength} "
+            f"patterns={technical.active_patterns} fib={technical.fibonacci_level or '-'}"
+        )
+        if sentiment:
+            line += f" sentiment={technical.sentiment}/{_num(sentiment.get('score'), 2)}"
+        lines.append(line)
+    if structure:
+        lines.append(f"trend={technical.market_trend} regime={structure.get('market_regime', '-')} "
+                     f"phase={wyckoff.get('phase', '-')}")
+
+    if "risk_management" in result.layers:
+        stops = risk.stop_loss_levels
+        plan = f"atr={_pct(risk.atr_percent)} stop={_num(stops.get('technical'))}"
+        if result.current_price and stops.get("technical"):
+            plan += f"({_pct((stops['technical'] / result.current_price - 1) * 100)})"
+        target = risk.best_target
+        if target:
+            plan += f" target={target.type}:{_num(target.price)}({_pct(target.distance_percent)})"
+            if target.hit_probability is not None:
+                plan += f" p_hit={target.hit_probability:.0f}"
+            if target.expected_bars:
+                plan += f" bars={target.expected_bars:.0f}"
+        plan += f" rr={risk.best_rr_ratio:.1f}"
+        lines.append(plan)
+
+        lines.append(
+            f"var95={_pct(risk.var_95)} cvar95={_pct(risk.cvar_95)} mdd={_pct(risk.maximum_drawdown)} "
+            f"position={_num(risk.position_value)} stop_pct={_pct(risk.stop_percent)}"
+        )
+    if signal.signals:
+        lines.append("signals=" + "; ".join(signal.signals))
+    if risk.risk_factors:
+        lines.append("risks=" + "; ".join(risk.risk_factors))
+    return "\n".join(lines)
+
+
+def fingerprint(summary: str) -> str:
+    """Stable cache key of an encoded summary"""
+    return hashlib.blake2b(summary.encode(), digest_size=12).hexdigest()
+
+
+def build_insight_prompt(summary: str) -> str:
+    return f"{INSIGHT_INSTRUCTIONS}\n\n{summary}"
+
+
+def build_batch_prompt(summaries: Dict[str, str]) -> str:
+    """One prompt asking for a `### SYMBOL` section per encoded summary"""
+    blocks = "\n\n".join(f"[{symbol}]\n{summary}" for symbol, summary in summaries.items())
+    return f"{BATCH_INSTRUCTIONS}\n\n{blocks}"
+
+
+def split_batch_response(text: str, symbols: List[str]) -> Dict[str, str]:
+    """
+    Per-symbol sections of a batched answer
+
+    Headers that name none of `symbols` are ignored (their text stays
+    with the previous section); symbols without a non-empty section are
+    left out, so callers can tell which ones the model skipped.
+    """
+    wanted = {symbol.upper(): symbol for symbol in symbols}
+    headers = [(m, wanted.get(m.group(1).upper())) for m in _SECTION.finditer(text)]
+    headers = [(m, symbol) for m, symbol in headers if symbol is not None]
+
+    sections: Dict[str, str] = {}
+    for i, (match, symbol) in enumerate(headers):
+        end = headers[i + 1][0].start() if i + 1 < len(headers) else len(text)
+        body = text[match.end():end].strip()
+        if body and symbol not in sections:
+            sections[symbol] = body
+    return sections
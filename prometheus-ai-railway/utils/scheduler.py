@@ -0,0 +1,307 @@
+"""
+Bounded priority scheduling and per-user rate limiting for analyses
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.cache import CacheBackend, pack, unpack
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first, shorter jobs ahead of longer ones. Quick (price action,
+# indicators, structure) and risk (indicators, Fibonacci, risk) analyses
+# run 3 of the 7 layers and take about 2/3 of a full analysis's time (see
+# ANALYSIS_LAYERS and benchmark.py); quick scans are the interactive ones.
+PRIORITIES = {"quick": 0, "risk": 1, "full": 2}
+
+# Tokens an analysis costs from its user's bucket, its time relative to a
+# quick one rounded up
+COSTS = {"quick": 1, "risk": 1, "full": 2}
+
+
+class RateLimited(Exception):
+    """The user's token bucket cannot pay for the request yet"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limited, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, cost: float) -> float:
+        """Spend `cost` tokens; 0 on success, else seconds until affordable"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def refund(self, cost: float) -> None:
+        """Give back tokens taken for something that did not happen"""
+        self.tokens = min(self.capacity, self.tokens + cost)
+
+
+class SharedTokenBuckets:
+    """
+    Per-user token buckets kept in a cache backend
+
+    With a shared backend (SQLite volume, Redis) every worker charges the
+    same bucket, so a user's quota does not grow with the number of
+    workers Telegram spreads updates over. Each bucket is a (tokens,
+    updated) pair in the "quotas" namespace, expiring once it would have
+    refilled anyway. Charging is read-modify-write, not atomic: requests of
+    one user reaching different workers within the same round trip can
+    both be admitted.
+    """
+
+    def __init__(self, cache: CacheBackend, rate: float, capacity: float):
+        self.cache = cache
+        self.rate = rate
+        self.capacity = capacity
+
+    async def take(self, user_id: int, cost: float) -> float:
+        """Spend `cost` tokens; 0 on success, else seconds until affordable"""
+        key = str(user_id)
+        data = await self.cache.get("quotas", key)
+        # Wall-clock time, as buckets are shared across processes and hosts
+        now = time.time()
+        tokens = self.capacity
+        if data is not None:
+            stored, updated = unpack(data)
+            tokens = min(self.capacity, stored + max(now - updated, 0.0) * self.rate)
+        if tokens < cost:
+            return (cost - tokens) / self.rate
+        await self.cache.set("quotas", key, pack([tokens - cost, now]), self.capacity / self.rate)
+        return 0.0
+
+
+class Job:
+    """One queued analysis request and the future its callers await"""
+
+    __slots__ = ("key", "user_id", "priority", "seq", "enqueued", "future", "started")
+
+    def __init__(self, key: Tuple[str, str], user_id: int, priority: int, seq: int):
+        self.key = key
+        self.user_id = user_id
+        self.priority = priority
+        self.seq = seq
+        self.enqueued = time.monotonic()
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.started = asyncio.Event()
+
+    def rank(self, now: float, aging: float) -> Tuple[float, int]:
+        """Effective priority; every `aging` seconds waited is worth one level"""
+        return self.priority - (now - self.enqueued) / aging, self.seq
+
+
+class AnalysisScheduler:
+    """
+    Bounded worker pool fed from a priority queue
+
+    At most `workers` analyses run at once. The workers are coroutines, so
+    `worker` has to hand its CPU-bound part to an executor with at least
+    `workers` threads (app.py's analysis_pool); work done on the event
+    loop itself would run one job at a time. Waiting jobs are ordered by
+    analysis type (quick, risk, full) with aging so full analyses are not
+    starved under a stream of quick ones. Admission is refused instead of
+    queueing without limit:
+    - asyncio.QueueFull when `max_queue` jobs are already waiting
+    - RateLimited when the user's token bucket is empty or the user
+      already has `max_pending` jobs queued or running
+
+    Identical requests (same symbol and type) share one queued job.
+
+    Token buckets live in `cache` when one is given (see
+    SharedTokenBuckets), otherwise in this process. The queue, the pending
+    limit and job sharing are always per process: they bound the load on
+    this worker, not the user's overall quota.
+    """
+
+    def __init__(self, worker: Callable[[str, str], Awaitable[Any]], workers: int = 4,
+                 max_queue: int = 100, tokens_per_minute: float = 6, burst: float = 9,
+                 max_pending: int = 3, aging: float = 20.0, exempt: List[int] = None,
+                 cache: CacheBackend = None):
+        self.worker = worker
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_pending = max_pending
+        self.aging = aging
+        self.exempt = set(exempt or [])
+        self._rate = tokens_per_minute / 60
+        self._burst = burst
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._shared = SharedTokenBuckets(cache, self._rate, burst) if cache is not None else None
+        self._waiting: List[Job] = []
+        self._jobs: Dict[Tuple[str, str], Job] = {}
+        self._pending: Dict[int, int] = {}
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        """Spawn the workers on the running loop"""
+        self._wakeup = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, user_id: int, symbol: str, analysis_type: str) -> Job:
+        """
+        Queue an analysis for a user, or join an identical queued/running one
+
+        Raises:
+            asyncio.QueueFull: The queue is at capacity
+            RateLimited: The user is over their rate or pending limit
+        """
+        key = (symbol, analysis_type)
+        if self._pending.get(user_id, 0) >= self.max_pending:
+            self.rejected += 1
+            raise RateLimited(self.aging)
+
+        if key not in self._jobs and len(self._waiting) >= self.max_queue:
+            self.rejected += 1
+            raise asyncio.QueueFull()
+
+        await self._charge(user_id, COSTS.get(analysis_type, 1))
+
+        job = self._jobs.get(key)
+        if job is None:
+            job = self._enqueue(key, user_id)
+            async with self._wakeup:
+                self._wakeup.notify()
+
+        self._pending[user_id] = self._pending.get(user_id, 0) + 1
+        job.future.add_done_callback(lambda _: self._release(user_id))
+        return job
+
+    async def submit_many(self, user_id: int, symbols: List[str], analysis_type: str) -> List[Job]:
+        """
+        Queue one analysis per symbol as a single request, e.g. a scan
+
+        The group counts once against the user's pending limit but pays
+        the token cost of every symbol. Symbols already queued or running
+        are joined as in submit().
+
+        Raises:
+            asyncio.QueueFull: The new jobs do not fit in the queue
+            RateLimited: The user is over their rate or pending limit
+        """
+        keys = list(dict.fromkeys((symbol, analysis_type) for symbol in symbols))
+        if self._pending.get(user_id, 0) >= self.max_pending:
+            self.rejected += 1
+            raise RateLimited(self.aging)
+
+        new = sum(1 for key in keys if key not in self._jobs)
+        if len(self._waiting) + new > self.max_queue:
+            self.rejected += 1
+            raise asyncio.QueueFull()
+
+        await self._charge(user_id, COSTS.get(analysis_type, 1) * len(keys))
+
+        new = sum(1 for key in keys if key not in self._jobs)
+        jobs = [self._jobs.get(key) or self._enqueue(key, user_id) for key in keys]
+        async with self._wakeup:
+            self._wakeup.notify(new)
+
+        self._pending[user_id] = self._pending.get(user_id, 0) + 1
+        group = asyncio.gather(*(job.future for job in jobs), return_exceptions=True)
+        group.add_done_callback(lambda _: self._release(user_id))
+        return jobs
+
+    def position(self, job: Job) -> int:
+        """Jobs that will start before this one (0 once it is running)"""
+        if job.started.is_set():
+            return 0
+        now = time.monotonic()
+        rank = job.rank(now, self.aging)
+        return sum(1 for other in self._waiting if other.rank(now, self.aging) < rank)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": len(self._waiting),
+            "running": self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "users_pending": sum(1 for n in self._pending.values() if n),
+        }
+
+    async def _charge(self, user_id: int, cost: float) -> None:
+        """Take `cost` from the user's bucket or raise RateLimited"""
+        if user_id in self.exempt:
+            return
+        if self._shared is not None:
+            wait = await self._shared.take(user_id, cost)
+        else:
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = self._buckets[user_id] = TokenBucket(self._rate, self._burst)
+            wait = bucket.take(cost)
+        if wait:
+            self.rejected += 1
+            raise RateLimited(wait)
+
+    def _enqueue(self, key: Tuple[str, str], user_id: int) -> Job:
+        job = Job(key, user_id, PRIORITIES.get(key[1], 1), next(self._seq))
+        self._jobs[key] = job
+        self._waiting.append(job)
+        return job
+
+    def _release(self, user_id: int) -> None:
+        remaining = self._pending.get(user_id, 1) - 1
+        if remaining:
+            self._pending[user_id] = remaining
+        else:
+            self._pending.pop(user_id, None)
+
+    def _next(self) -> Job:
+        now = time.monotonic()
+        job = min(self._waiting, key=lambda j: j.rank(now, self.aging))
+        self._waiting.remove(job)
+        return job
+
+    async def _work(self) -> None:
+        while True:
+            async with self._wakeup:
+                await self._wakeup.wait_for(lambda: self._waiting)
+                job = self._next()
+
+            job.started.set()
+            self.running += 1
+            try:
+                result = await self.worker(*job.key)
+                if not job.future.done():
+                    job.future.set_result(result)
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"Scheduled analysis {job.key} failed: {e}")
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self.running -= 1
+                self.completed += 1
+                self._jobs.pop(job.key, None)
@@ -0,0 +1,95 @@
+"""
+Progressive delivery of streamed model output to Telegram chats
+"""
+
+import asyncio
+from typing import AsyncIterator, List, Tuple
+
+# Telegram rejects messages over 4096 characters
+MESSAGE_LIMIT = 4000
+
+
+class TextStream:
+    """
+    Text that grows chunk by chunk, followed by any number of readers
+
+    One producer appends and finally closes; every reader gets throttled
+    snapshots of the whole text so far, so several chats can mirror a
+    single model call.
+    """
+
+    def __init__(self, text: str = "", done: bool = False):
+        self.text = text
+        self.done = done
+        self._changed = asyncio.Event()
+        self._closed = asyncio.Event()
+        if done:
+            self._closed.set()
+
+    def append(self, chunk: str) -> None:
+        self.text += chunk
+        self._wake()
+
+    def close(self) -> None:
+        self.done = True
+        self._closed.set()
+        self._wake()
+
+    def _wake(self) -> None:
+        # Readers wait on the current event; a fresh one serves the next change
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def snapshots(self, interval: float) -> AsyncIterator[Tuple[str, bool]]:
+        """
+        (text so far, finished) at most every `interval` seconds
+
+        The current text is yielded at once (empty before the first chunk,
+        so readers can show a placeholder), the first chunk as soon as it
+        arrives, and the complete text always last, without waiting out
+        the interval.
+        """
+        shown = None
+        while True:
+            done = self.done
+            if self.text != shown or done:
+                shown = self.text
+                yield shown, done
+            if done:
+                return
+            if self.text == shown:
+                await self._changed.wait()
+            if not shown:
+                continue
+            try:
+                await asyncio.wait_for(self._closed.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def paginate(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    return [text[i:i + limit] for i in range(0, len(text), limit)] or [""]
+
+
+async def stream_to_chat(stream: TextStream, anchor, header: str, interval: float,
+                         limit: int = MESSAGE_LIMIT) -> None:
+    """
+    Mirror a stream into replies to `anchor`, editing them as text arrives
+
+    The first snapshot is sent as a new message and later ones edit it in
+    place, at most once per `interval` so the chat stays under Telegram's
+    edit limits. Text beyond `limit` continues in further messages. Model
+    output is sent as plain text because a half-received Markdown entity
+    would make Telegram reject the whole edit.
+    """
+    messages = []
+    shown: List[str] = []
+    async for text, done in stream.snapshots(interval):
+        pages = paginate(header + text + ("" if done else " ▌"), limit)
+        for i, page in enumerate(pages):
+            if i == len(messages):
+                messages.append(await anchor.reply_text(page))
+                shown.append(page)
+            elif page != shown[i]:
+                await messages[i].edit_text(page)
+                shown[i] = page